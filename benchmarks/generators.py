@@ -0,0 +1,136 @@
+import os
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Share of journal rows per 2-digit account group, taken from the bundled 2019-2023 journals.
+ACCOUNT_GROUP_WEIGHTS = {
+    '13': 0.262, '20': 0.158, '60': 0.157, '43': 0.095, '50': 0.092, '47': 0.087, '27': 0.044,
+    '52': 0.013, '45': 0.013, '53': 0.012, '55': 0.012, '46': 0.010, '24': 0.010, '22': 0.009,
+    '51': 0.008, '02': 0.001, '01': 0.001, '04': 0.001, '41': 0.002, '42': 0.002, '48': 0.002,
+    '54': 0.002, '56': 0.002, '57': 0.001, '61': 0.002, '64': 0.002, '66': 0.002,
+}
+CUSTOMER_PREFIXES = ('200', '201', '204', '205')
+
+# AOP codes referenced by the formula registry and the notebook charts.
+AOP_CODES = (
+    '0002', '0009', '0018', '0030', '0031', '0034', '0038', '0045', '0048', '0401', '0403', '0415',
+    '0416', '0420', '0431', '0432', '0442', '0455', '1001', '1002', '1005', '1013', '1014', '1020',
+    '1025', '1026', '1052', '1053', '1055', '1056', '9005',
+)
+
+
+def account_pool(seed: int = 0, accounts_per_group: int = 40, customers: int = 5000) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Deterministic pool of account codes with the probability of each one.
+
+    Every 2-digit group gets `accounts_per_group` 5-digit accounts. Customer groups
+    (200/201/204/205) also get `customers` sub-ledger accounts with a '-' suffix.
+    """
+    rng = np.random.default_rng(seed)
+    accounts, weights = [], []
+
+    for group, weight in ACCOUNT_GROUP_WEIGHTS.items():
+        suffixes = rng.choice(1000, size=accounts_per_group, replace=False)
+        group_accounts = [f"{group}{suffix:03d}" for suffix in suffixes]
+        accounts.extend(group_accounts)
+        weights.extend([weight / accounts_per_group] * accounts_per_group)
+
+    customer_accounts = [f"{CUSTOMER_PREFIXES[i % 4]}00-{i:05d}" for i in range(customers)]
+    customer_weight = ACCOUNT_GROUP_WEIGHTS['20'] / 2
+    accounts.extend(customer_accounts)
+    weights.extend([customer_weight / customers] * customers)
+
+    weights = np.asarray(weights)
+    return np.asarray(accounts), weights / weights.sum()
+
+
+def generate_journal(rows: int, years: tuple = (2019, 2020, 2021, 2022, 2023), seed: int = 0,
+                     pool: Optional[tuple[np.ndarray, np.ndarray]] = None, span: tuple = (0.0, 1.0)) -> pd.DataFrame:
+    """
+    Deterministic synthetic journal with the columns date, account, debit and credit.
+
+    Every row is either a debit or a credit, with log-normal amounts. Dates are
+    spread uniformly over the share `span` of the given years, sorted.
+
+    Parameters:
+    - pool: Accounts and their probabilities from `account_pool`. Default is `account_pool(seed)`.
+    - span: Start and end of the date range as shares of the whole period. Default is all of it.
+    """
+    rng = np.random.default_rng(seed)
+    accounts, weights = account_pool(seed) if pool is None else pool
+
+    start = np.datetime64(f"{min(years)}-01-01")
+    days = int((np.datetime64(f"{max(years) + 1}-01-01") - start) / np.timedelta64(1, 'D'))
+    offsets = np.floor(rng.uniform(span[0] * days, span[1] * days, size=rows)).astype(np.int64)
+    dates = start + np.minimum(offsets, days - 1).astype('timedelta64[D]')
+
+    amounts = np.round(rng.lognormal(mean=9.0, sigma=1.6, size=rows), 2)
+    is_debit = rng.random(rows) < 0.52
+
+    return pd.DataFrame({
+        'date': pd.to_datetime(np.sort(dates)),
+        'account': accounts[rng.choice(len(accounts), size=rows, p=weights)],
+        'debit': np.where(is_debit, amounts, 0.0),
+        'credit': np.where(is_debit, 0.0, amounts),
+    })
+
+
+def generate_journal_chunks(rows: int, chunk_rows: int = 5_000_000, seed: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Yield a journal of `rows` rows in chunks, for sizes that do not fit in memory at once.
+
+    Every chunk draws from the same account pool and covers the next slice of the
+    date range, so the concatenated chunks are one journal sorted by date.
+    """
+    pool = account_pool(seed)
+    for chunk, start in enumerate(range(0, rows, chunk_rows)):
+        end = min(start + chunk_rows, rows)
+        yield generate_journal(end - start, seed=seed + chunk, pool=pool, span=(start / rows, end / rows))
+
+
+def write_journal_csv(path: str, rows: int, chunk_rows: int = 5_000_000, seed: int = 0) -> str:
+    """Write a synthetic journal CSV with 'M/D/YYYY' dates, like the source exports, chunk by chunk."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    for chunk, df in enumerate(generate_journal_chunks(rows, chunk_rows, seed)):
+        df = df.assign(date=df['date'].dt.month.astype(str) + '/' + df['date'].dt.day.astype(str) + '/' + df['date'].dt.year.astype(str))
+        df.to_csv(path, mode='w' if chunk == 0 else 'a', header=chunk == 0, index=False)
+    return path
+
+
+def generate_filings(companies: int, periods: tuple = ('year_1', 'year_2', 'year_3', 'year_4', 'year_5'),
+                     seed: int = 0) -> pd.DataFrame:
+    """
+    Deterministic stacked AOP filings (company, AOP, year, value) for `companies` companies.
+
+    Values are positive integers in thousands of RSD, scaled per company so that
+    company sizes span several orders of magnitude.
+    """
+    rng = np.random.default_rng(seed)
+    scale = rng.lognormal(mean=11.0, sigma=1.5, size=(companies, 1, 1))
+    values = np.rint(scale * rng.uniform(0.01, 1.0, size=(companies, len(AOP_CODES), len(periods)))).astype(np.int64)
+
+    index = pd.MultiIndex.from_product(
+        [[f"company_{i}" for i in range(companies)], AOP_CODES, periods], names=['company', 'AOP', 'year']
+    )
+    return pd.DataFrame({'value': values.ravel()}, index=index).reset_index()
+
+
+def generate_report(filings: pd.DataFrame, company: str) -> pd.DataFrame:
+    """Wide single-company report (AOP, description, one column per period) from stacked filings."""
+    report = filings[filings['company'] == company].pivot(index='AOP', columns='year', values='value').reset_index()
+    report.columns.name = None
+    report.insert(1, 'description', report['AOP'])
+    return report
+
+
+def generate_competitors(filings: pd.DataFrame, year: str, competitors: int = 5) -> pd.DataFrame:
+    """Wide competitors report (AOP, description, one column per competitor) for one period."""
+    names = filings['company'].drop_duplicates().iloc[1:competitors + 1]
+    subset = filings[filings['company'].isin(names) & (filings['year'] == year)]
+    report = subset.pivot(index='AOP', columns='company', values='value')[list(names)].reset_index()
+    report.columns.name = None
+    report.insert(1, 'description', report['AOP'])
+    return report
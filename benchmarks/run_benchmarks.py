@@ -0,0 +1,201 @@
+"""
+Benchmarks for the ledger, report and conversion entry points on deterministic synthetic data.
+
+    python benchmarks/run_benchmarks.py --journal-rows 10000000 --companies 100000 --output bench_output.json
+    python benchmarks/run_benchmarks.py --compare baseline.json bench_output.json
+
+Each benchmark records the min/mean wall time and the peak Python heap as JSON,
+together with the git commit, so runs on different commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from components import AOPCache, ComponentsFR, ComponentsLedger, RatioAnalysis  # noqa: E402
+from utilities import Utilities  # noqa: E402
+from visualization import FinancialDataVisualization  # noqa: E402
+
+from generators import (  # noqa: E402
+    generate_competitors, generate_filings, generate_journal, generate_report, write_journal_csv,
+)
+
+
+PREFIX_QUERIES = ['02', '13', '24', '200', ['200', '201', '204', '205']]
+
+
+def label(prefix: str | list) -> str:
+    return prefix if isinstance(prefix, str) else '+'.join(prefix)
+
+
+def measure(name: str, func: Callable, size: int, repeats: int) -> dict:
+    """
+    Time `func` over `repeats` runs, then record its peak Python heap in one extra traced run.
+
+    Timing runs are not traced, so tracemalloc overhead does not distort them.
+    Allocations made outside the Python allocator (e.g. inside DuckDB) are not counted.
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "size": size,
+        "repeats": repeats,
+        "min_seconds": min(timings),
+        "mean_seconds": float(np.mean(timings)),
+        "peak_memory_bytes": peak_memory,
+    }
+    print(f"{name:<60} {size:>12,} rows  {result['min_seconds']:>9.4f} s  {peak_memory / 2**20:>9.1f} MiB")
+    return result
+
+
+def ledger_benchmarks(journal: pd.DataFrame, repeats: int) -> list[dict]:
+    size = len(journal)
+    results = [measure("ComponentsLedger.account_index", lambda: ComponentsLedger(journal)._build_account_index(), size, repeats)]
+
+    ledger = ComponentsLedger(journal)
+    ledger._build_account_index()
+    for prefix in PREFIX_QUERIES:
+        results.append(measure(f"ComponentsLedger.get_account_data[{label(prefix)}]", lambda: ledger.get_account_data(prefix), size, repeats))
+        results.append(measure(f"ComponentsLedger.sum_account_data_by_month[{label(prefix)}]", lambda: ledger.sum_account_data_by_month(prefix), size, repeats))
+
+    results.append(measure("ComponentsLedger.build_cube", lambda: ComponentsLedger(journal, build_cube=True), size, repeats))
+
+    cube_ledger = ComponentsLedger(journal, build_cube=True)
+    for prefix in PREFIX_QUERIES:
+        results.append(measure(
+            f"ComponentsLedger.sum_account_data_by_period[{label(prefix)},week,cube]",
+            lambda: cube_ledger.sum_account_data_by_period(prefix, 'week'), size, repeats,
+        ))
+
+    results.append(measure(
+        "ComponentsLedger.calculate_percentage_changes_from_100",
+        lambda: ComponentsLedger.calculate_percentage_changes_from_100(
+            pd.DataFrame({'debit': journal['debit'].to_numpy()[:1000] + 1}), 'debit'
+        ),
+        1000, repeats,
+    ))
+    return results
+
+
+def report_benchmarks(filings: pd.DataFrame, repeats: int) -> list[dict]:
+    company = filings['company'].iloc[0]
+    report = generate_report(filings, company)
+    competitors = generate_competitors(filings, report.columns[-1])
+    results = [measure("ComponentsFR.__init__", lambda: ComponentsFR(report), len(report), repeats)]
+
+    # One analysis for all ratios; its private cache is cleared in every run, so each call evaluates the report.
+    cache = AOPCache()
+    analysis = RatioAnalysis(report, ComponentsFR, cache=cache)
+    for name in analysis.comp_obj.registry.ratios:
+        ratio = getattr(analysis, name, None) or (lambda name=name: analysis.ratio(name))
+        results.append(measure(
+            f"RatioAnalysis.{name}", lambda: (cache.invalidate(), ratio()), len(report), repeats,
+        ))
+
+    results.append(measure(
+        "RatioAnalysis.ratio_table[stacked]", lambda: RatioAnalysis(filings, ComponentsFR).ratio_table(), len(filings), repeats,
+    ))
+    results.append(measure(
+        "FinancialDataVisualization.aggregate_data_for_comparative_visualization",
+        lambda: FinancialDataVisualization.aggregate_data_for_comparative_visualization(
+            report, competitors, '1001', list(report.columns[2:])
+        ),
+        len(report), repeats,
+    ))
+    return results
+
+
+def conversion_benchmarks(rows: int, repeats: int) -> list[dict]:
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = write_journal_csv(os.path.join(directory, "financial_journal.csv"), rows)
+        return [
+            measure("Utilities.convert_csv_to_parquet", lambda: Utilities.convert_csv_to_parquet(csv_path), rows, repeats),
+            measure(
+                "Utilities.convert_journal_csvs_to_parquet",
+                lambda: Utilities.convert_journal_csvs_to_parquet(csv_path, os.path.join(directory, "partitioned")),
+                rows, repeats,
+            ),
+        ]
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def compare(baseline_path: str, current_path: str) -> None:
+    """Print the min-time and peak-memory ratio (current / baseline) of every benchmark present in both files."""
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = {result["name"]: result for result in json.load(file)["results"]}
+    with open(current_path, "r", encoding="utf-8") as file:
+        current = {result["name"]: result for result in json.load(file)["results"]}
+
+    for name, result in current.items():
+        if name in baseline:
+            time_ratio = result["min_seconds"] / max(baseline[name]["min_seconds"], 1e-12)
+            memory_ratio = result["peak_memory_bytes"] / max(baseline[name]["peak_memory_bytes"], 1)
+            print(f"{name:<60} time x{time_ratio:>7.2f}  memory x{memory_ratio:>7.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ledger, report and conversion entry points on synthetic data.")
+    parser.add_argument("--journal-rows", type=int, default=1_000_000, help="Rows in the synthetic journal.")
+    parser.add_argument("--companies", type=int, default=10_000, help="Companies in the synthetic filings.")
+    parser.add_argument("--csv-rows", type=int, default=1_000_000, help="Rows in the CSV conversion benchmark.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data.")
+    parser.add_argument("--output", default="bench_output.json", help="JSON results file.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two results files and exit.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    journal = generate_journal(args.journal_rows, seed=args.seed)
+    filings = generate_filings(args.companies, seed=args.seed)
+
+    results = ledger_benchmarks(journal, args.repeats)
+    results += report_benchmarks(filings, args.repeats)
+    results += conversion_benchmarks(args.csv_rows, args.repeats)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({"environment": environment(), "parameters": vars(args), "results": results}, file, indent=4)
+
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
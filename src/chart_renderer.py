@@ -0,0 +1,297 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Literal, Optional
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+COMPANY_COLOR = 'MediumSeaGreen'
+COMPETITOR_COLOR = 'DarkGray'
+LAST_BAR_COLORS = {'g': (107/255, 179/255, 139/255, 1), 'r': 'IndianRed'}
+
+# Fixed SVG ids and no timestamps, so equal charts give byte-identical files.
+SVG_HASH_SALT = 'financial-ledger-analysis'
+
+
+def _figure(figsize: tuple) -> tuple[Figure, list]:
+    """Figure on its own Agg canvas, outside pyplot's figure manager."""
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure, list(figure.subplots(1, 2))
+
+
+def _fix_layout(figure: Figure, *axes) -> None:
+    """Compute the layout once, with placeholder titles and axis labels so their space is reserved."""
+    for ax in axes:
+        ax.set_title(ax.get_title() or ' ', fontsize=10)
+        ax.set_ylabel(ax.get_ylabel() or ' ', fontsize=9)
+    figure.tight_layout()
+
+
+def _rescale(*axes) -> None:
+    for ax in axes:
+        ax.relim()
+        ax.autoscale_view()
+
+
+class ComparativeTemplate:
+    """Layout of `FinancialDataVisualization.comparative_analysis_visualization`."""
+
+    def __init__(self, labels: dict, periods: int) -> None:
+        self.figure, (self.history_ax, self.competitors_ax) = _figure((16, 4))
+
+        self.line, = self.history_ax.plot(np.arange(periods), np.zeros(periods), marker='o', color=COMPANY_COLOR, label=labels['company'])
+        self.history_ax.grid(True, linestyle='--', alpha=0.6)
+        self.history_ax.legend()
+
+        self.bars = self.competitors_ax.bar(labels['bar_labels'], np.zeros(6), color=[COMPETITOR_COLOR] * 5 + [COMPANY_COLOR])
+        self.competitors_ax.set_title(labels['last_year_comparison'], fontsize=10)
+        self.competitors_ax.tick_params(axis='x', rotation=45)
+        self.competitors_ax.grid(axis='y', linestyle='--', alpha=0.6)
+        _fix_layout(self.figure, self.history_ax, self.competitors_ax)
+
+    def update(self, company: np.ndarray, competitors: np.ndarray, variable: str, years: list) -> None:
+        self.line.set_data(years, company.ravel())
+        self.history_ax.set_xticks(years)
+        self.history_ax.set_xlabel(variable, fontsize=8)
+        self.history_ax.set_ylabel(variable, fontsize=8)
+
+        for bar, value in zip(self.bars, competitors.ravel()):
+            bar.set_height(value)
+        self.competitors_ax.set_ylabel(variable, fontsize=8)
+        _rescale(self.history_ax, self.competitors_ax)
+
+
+class RevenueTemplate:
+    """Layout of `FinancialDataVisualization.comparative_analysis_visualization_with_revenue`."""
+
+    def __init__(self, labels: dict, periods: int) -> None:
+        self.labels = labels
+        self.figure, (self.history_ax, self.competitors_ax) = _figure((16, 4))
+
+        self.history_bars = self.history_ax.bar(np.arange(periods), np.zeros(periods), color='CadetBlue', alpha=0.7, label=' ')
+        self.history_line, = self.history_ax.plot(np.arange(periods), np.zeros(periods), marker='o', color='IndianRed', label=labels['revenue'])
+        self.history_ax.set_xlabel(labels['year'], fontsize=10)
+        self.history_ax.set_ylabel(labels['relative_value'], fontsize=10)
+        self.history_legend = self.history_ax.legend()
+        self.history_ax.grid(axis='y', linestyle='--', alpha=0.6)
+
+        positions = np.arange(len(labels['bar_labels']))
+        self.competitor_bars = self.competitors_ax.bar(positions, np.zeros(len(positions)), color=[COMPETITOR_COLOR] * 5 + [COMPANY_COLOR], alpha=0.7, label=' ')
+        self.competitor_line, = self.competitors_ax.plot(positions, np.zeros(len(positions)), marker='o', color='IndianRed', label=labels['revenue'])
+        self.competitors_ax.set_xlabel(labels['year'], fontsize=10)
+        self.competitors_legend = self.competitors_ax.legend()
+        self.competitors_ax.grid(axis='y', linestyle='--', alpha=0.6)
+        self.competitors_ax.set_xticks(positions)
+        self.competitors_ax.set_xticklabels(labels['bar_labels'], rotation=45)
+        _fix_layout(self.figure, self.history_ax, self.competitors_ax)
+
+    @staticmethod
+    def _normalize(rows: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return rows / rows.max(axis=1, keepdims=True)
+
+    def update(self, company: np.ndarray, competitors: np.ndarray, variable: str, years: list) -> None:
+        # Rows are (variable, revenue). As in FinancialDataVisualization, the competitor
+        # bars show the second row and the competitor line the first one.
+        company = self._normalize(company.reshape(2, -1))
+        competitors = self._normalize(competitors.reshape(2, -1))
+
+        for bar, year, value in zip(self.history_bars, years, company[0]):
+            bar.set_x(year - bar.get_width() / 2)
+            bar.set_height(value)
+        self.history_line.set_data(years, company[1])
+        self.history_ax.set_xticks(years)
+        self.history_ax.set_title(self.labels['revenue_history'].format(variable=variable), fontsize=10)
+        self.history_legend.get_texts()[1].set_text(variable)
+
+        for bar, value in zip(self.competitor_bars, competitors[1]):
+            bar.set_height(value)
+        self.competitor_line.set_ydata(competitors[0])
+        self.competitors_ax.set_title(self.labels['revenue_competitors'].format(variable=variable), fontsize=10)
+        self.competitors_legend.get_texts()[1].set_text(variable)
+        _rescale(self.history_ax, self.competitors_ax)
+
+
+class RatioTemplate:
+    """Layout of `FinancialDataVisualization.barplot_ratio_analysis`."""
+
+    def __init__(self, labels: dict, periods: int) -> None:
+        self.labels = labels
+        self.figure, (self.history_ax, self.competitors_ax) = _figure((10, 3.5))
+
+        self.history_bars = self.history_ax.bar(np.arange(periods), np.zeros(periods), width=0.8, color=(133/255, 145/255, 155/255, 1))
+        self.history_ax.set_xticks(np.arange(periods))
+        self.history_ax.set_xlabel(labels['year'], fontsize=9)
+
+        positions = np.arange(len(labels['bar_labels']))
+        self.competitor_bars = self.competitors_ax.bar(positions, np.zeros(len(positions)), width=0.8, color='Silver')
+        self.competitors_ax.set_xlabel(labels['competitors_company'], fontsize=9)
+        self.competitors_ax.set_xticks(positions)
+        self.competitors_ax.set_xticklabels(labels['bar_labels'], rotation=45)
+        _fix_layout(self.figure, self.history_ax, self.competitors_ax)
+
+    def update(self, company: np.ndarray, competitors: np.ndarray, variable: str, years: list,
+               last_bar_color: Literal['g', 'r'] = 'g') -> None:
+        if last_bar_color not in LAST_BAR_COLORS:
+            raise ValueError("Use 'g' or 'r' only")
+
+        for bar, value in zip(self.history_bars, company.ravel()):
+            bar.set_height(value)
+        self.history_ax.set_xticklabels([str(year) for year in years])
+        self.history_ax.set_title(self.labels['ratio_history'].format(ratio=variable), fontsize=10)
+        self.history_ax.set_ylabel(variable, fontsize=9)
+
+        for bar, value in zip(self.competitor_bars, competitors.ravel()):
+            bar.set_height(value)
+        self.competitor_bars[-1].set_facecolor(LAST_BAR_COLORS[last_bar_color])
+        self.competitors_ax.set_title(self.labels['ratio_competitors'].format(ratio=variable), fontsize=10)
+        self.competitors_ax.set_ylabel(variable, fontsize=9)
+        _rescale(self.history_ax, self.competitors_ax)
+
+
+TEMPLATES = {
+    'comparative': ComparativeTemplate,
+    'comparative_with_revenue': RevenueTemplate,
+    'ratio': RatioTemplate,
+}
+
+
+class ChartRenderer:
+    def __init__(self, labels: dict, format: Literal['png', 'svg'] = 'png', dpi: int = 100) -> None:
+        """
+        Headless renderer for the FinancialDataVisualization charts.
+
+        Figures live on their own Agg canvases, never in pyplot. One template per chart
+        kind and number of periods is built once; later charts only update the data,
+        texts and limits of its artists. Output is deterministic: PNG and SVG files
+        carry no timestamps or software tags.
+
+        Parameters:
+        - labels: Chart texts, `FinancialDataVisualization.LABELS` from visualization.py or visualization_eng.py.
+        - format: Output format ('png' or 'svg'). Default is 'png'.
+        - dpi: Resolution of PNG output. Default is 100.
+        """
+        if format not in ['png', 'svg']:
+            raise ValueError("The argument 'format' must be 'png' or 'svg'.")
+        self.labels = labels
+        self.format = format
+        self.dpi = dpi
+        self.timings = []
+        self._templates = {}
+
+    def _template(self, kind: str, periods: int):
+        if kind not in TEMPLATES:
+            raise ValueError(f"Unknown chart kind {kind}. Use one of {list(TEMPLATES)}.")
+        key = (kind, periods)
+        if key not in self._templates:
+            self._templates[key] = TEMPLATES[kind](self.labels, periods)
+        return self._templates[key]
+
+    def render(self, kind: str, company, competitors, variable: str, years: list,
+               name: Optional[str] = None, output_path: Optional[str] = None, **options) -> bytes | str:
+        """
+        Render one chart.
+
+        Parameters:
+        - kind: 'comparative', 'comparative_with_revenue' or 'ratio'.
+        - company: Company values per period (two rows, variable and revenue, for 'comparative_with_revenue').
+        - competitors: Values of the five competitors and the company (two rows for 'comparative_with_revenue').
+        - variable: Name of the charted variable or ratio.
+        - years: Period labels.
+        - name: Name recorded with the render time. Default is `kind`.
+        - output_path: File to write. If None, the image is returned as bytes.
+        - options: Kind-specific options, e.g. last_bar_color='r' for 'ratio'.
+
+        Returns:
+        - Image bytes, or `output_path` when given.
+        """
+        start = time.perf_counter()
+        years = list(years)
+        template = self._template(kind, len(years))
+        template.update(np.asarray(company, dtype=float), np.asarray(competitors, dtype=float), variable, years, **options)
+
+        buffer = io.BytesIO()
+        metadata = {'Software': None} if self.format == 'png' else {'Date': None, 'Creator': None}
+        with matplotlib.rc_context({'svg.hashsalt': SVG_HASH_SALT}):
+            template.figure.savefig(buffer, format=self.format, dpi=self.dpi, metadata=metadata)
+        image = buffer.getvalue()
+
+        if output_path is not None:
+            with open(output_path, "wb") as file:
+                file.write(image)
+
+        self.timings.append({'name': name or kind, 'kind': kind, 'seconds': time.perf_counter() - start, 'bytes': len(image)})
+        return image if output_path is None else output_path
+
+    def render_batch(self, jobs: list[dict], output_dir: Optional[str] = None, max_workers: Optional[int] = None,
+                     chunk_size: int = 20) -> tuple[dict, pd.DataFrame]:
+        """
+        Render many charts across a process pool; each worker reuses its templates for all its charts.
+
+        Parameters:
+        - jobs: Dicts with 'name' (unique, also the file name) and the arguments of `render`.
+        - output_dir: Directory for '<name>.<format>' files. If None, images are returned as bytes.
+        - max_workers: Worker processes. Default is the number of CPUs; 1 renders in this process.
+        - chunk_size: Charts sent to a worker at once. Default is 20.
+
+        Returns:
+        - Tuple of (dictionary of name -> bytes or file path, DataFrame of per-chart render times).
+        """
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        settings = (self.labels, self.format, self.dpi, output_dir)
+
+        if max_workers == 1:
+            results = [result for chunk in chunks for result in _render_chunk(settings, chunk, self)]
+        else:
+            results = []
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_render_chunk, settings, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    results.extend(future.result())
+            self.timings.extend(timing for _, _, timing in results)
+
+        outputs = {name: output for name, output, _ in results}
+        timings = pd.DataFrame([timing for _, _, timing in results], columns=['name', 'kind', 'seconds', 'bytes'])
+        return outputs, timings.sort_values('name', ignore_index=True)
+
+
+_WORKER_RENDERERS = {}
+
+
+def _render_chunk(settings: tuple, jobs: list[dict], renderer: Optional[ChartRenderer] = None) -> list[tuple]:
+    """Render a chunk of jobs with the worker's renderer, which keeps its templates between chunks."""
+    labels, format, dpi, output_dir = settings
+    if renderer is None:
+        key = (repr(labels), format, dpi)
+        if key not in _WORKER_RENDERERS:
+            _WORKER_RENDERERS[key] = ChartRenderer(labels, format, dpi)
+        renderer = _WORKER_RENDERERS[key]
+
+    results = []
+    for job in jobs:
+        job = dict(job)
+        name = job.pop('name')
+        output_path = None if output_dir is None else os.path.join(output_dir, f"{name}.{format}")
+        output = renderer.render(name=name, output_path=output_path, **job)
+        results.append((name, output, renderer.timings[-1]))
+    return results
+
+
+# USAGE
+# from visualization_eng import FinancialDataVisualization
+# renderer = ChartRenderer(FinancialDataVisualization.LABELS)
+# jobs = [
+#     {"name": "company_current_ratio", "kind": "ratio", "company": [2.29, 2.28, 1.9, 1.5, 1.7],
+#      "competitors": [1.2, 1.5, 0.9, 2.1, 1.1, 1.7], "variable": "current ratio", "years": [2019, 2020, 2021, 2022, 2023]},
+# ]
+# outputs, timings = renderer.render_batch(jobs, output_dir="report/charts")
@@ -1,91 +1,615 @@
-from typing import Optional, Any, Literal, List, Type
-
+import ast
+import hashlib
+import operator
+import re
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Optional, Any, Literal, List, Type, Callable
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+
+
+COMPONENT_FORMULAS = {
+    'zalihe': '[0031]',
+    'obrtna_imovina': '[0030]',
+    'kupci': '[0038]',
+    'kapital': '[0401] - [0403] - [0455]',
+    'kratkorocne_obaveze': '[0431]',
+    'ukupne_obaveze': '[0420] + [0431] + [0432]',
+    'ukupna_imovina': '[0002] + [0030]',
+    'poslovna_imovina': '[0002] - [0018] + [0030] - [0048]',
+    'dugorocne_obaveze': '[0420]',
+    'poslovni_dobitak': '[1025]',
+    'neto_dobit': '[1055] - [1056] + [1052] - [1053]',
+    'prihod_od_prodaje': '[1001]',
+    'prodaja': '[1002] + [1005]',
+    'nabavna_vrednost_prodate_robe': '[1014]',
+    'obaveze_bez_rezervisanja': '[0415] - [0416]',
+    'ebitda': '[1025] - [1026] + [1020]',
+    'prosecne_zalihe': '(zalihe + lead(zalihe)) // 2',
+    'prosecne_zalihe_robe': '([0034] + lead([0034])) // 2',
+    'prosecni_kupci': '([0034] + lead([0034])) // 2',
+}
+
+RATIO_FORMULAS = {
+    'current_ratio': 'obrtna_imovina / kratkorocne_obaveze',
+    'quick_ratio': '(obrtna_imovina - zalihe) / kratkorocne_obaveze',
+    'total_debt_ratio': 'ukupne_obaveze / ukupna_imovina',
+    'long_term_debt_ratio': 'dugorocne_obaveze / ukupna_imovina',
+    'gross_profit_margin': 'poslovni_dobitak / prihod_od_prodaje',
+    'net_profit_margin': 'neto_dobit / prihod_od_prodaje',
+    'capitalisation_ratio': 'obaveze_bez_rezervisanja / (dugorocne_obaveze + kratkorocne_obaveze + kapital)',
+    'return_on_bussines_assets': 'poslovni_dobitak / poslovna_imovina',
+    'return_on_assets': 'neto_dobit / prihod_od_prodaje',
+    'return_on_equity': 'neto_dobit / kapital',
+    'debt_to_equity': '([0420] + [0431]) / ([0401] - [0403] + [0455])',
+    'long_term_financial_stability': '([0002] + [0031]) / (kapital + [0415])',
+    'EBITDA_margin': 'ebitda / prihod_od_prodaje',
+    'broj_zaposlenih': '[9005]',
+    'inventory_turnover': 'prihod_od_prodaje / prosecne_zalihe',
+    'goods_turnover': 'nabavna_vrednost_prodate_robe / prosecne_zalihe_robe',
+    'account_receivable_turnover': 'prodaja / prosecni_kupci',
+}
+
+
+class EvaluationPlan:
+    """
+    Deduplicated list of array operations produced by `FormulaRegistry.compile`.
+
+    Every step is evaluated exactly once per call, so a subexpression shared by
+    several formulas (e.g. `kapital`) costs one array operation in total.
+    """
+    _BINARY = {
+        'add': operator.add,
+        'sub': operator.sub,
+        'mul': operator.mul,
+        'div': operator.truediv,
+        'floordiv': operator.floordiv,
+    }
+
+    def __init__(self, steps: list[tuple], outputs: dict[str, int]) -> None:
+        self.steps = steps
+        self.outputs = outputs
+        self.aop_codes = [args[0] for op, args in steps if op == 'aop']
+
+        step_codes = []
+        for op, args in steps:
+            if op == 'aop':
+                step_codes.append(frozenset(args))
+            elif op == 'const':
+                step_codes.append(frozenset())
+            else:
+                step_codes.append(frozenset().union(*(step_codes[arg] for arg in args)))
+        self.dependencies = {name: step_codes[slot] for name, slot in outputs.items()}
+        self._key = (tuple(steps), tuple(sorted(outputs.items())))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, EvaluationPlan) and self._key == other._key
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    @staticmethod
+    def _lead(values: np.ndarray) -> np.ndarray:
+        """
+        Value of the following period along the last axis; NaN for the last period.
+
+        A scalar (a constant, or NaN for a missing code) has no period axis and is returned as is.
+        """
+        if np.ndim(values) == 0:
+            return np.float64(values)
+        result = np.full(np.shape(values), np.nan)
+        result[..., :-1] = values[..., 1:]
+        return result
+
+    def evaluate(self, fetch: Callable[[str], np.ndarray], missing: Optional[set] = None) -> dict[str, np.ndarray]:
+        """
+        Run the plan.
+
+        Parameters:
+        - fetch: Callable returning the array of values for an AOP code, raising ValueError for an unknown code.
+        - missing: Optional set that receives the codes `fetch` did not find.
+
+        Returns:
+        - Dictionary with formula names as keys and arrays shaped like `fetch` output as values.
+          Formulas that use a missing code are NaN; the others are unaffected.
+        """
+        slots = []
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for op, args in self.steps:
+                if op == 'aop':
+                    try:
+                        value = fetch(args[0])
+                    except ValueError:
+                        value = np.nan
+                        if missing is not None:
+                            missing.add(args[0])
+                elif op == 'const':
+                    value = args[0]
+                elif op == 'neg':
+                    value = -slots[args[0]]
+                elif op == 'lead':
+                    value = self._lead(slots[args[0]])
+                else:
+                    value = self._BINARY[op](slots[args[0]], slots[args[1]])
+                slots.append(value)
+
+        return {name: slots[slot] for name, slot in self.outputs.items()}
+
+
+class FormulaRegistry:
+    """
+    Named component and ratio formulas over AOP codes.
+
+    Expressions use AOP codes in brackets (`[0401]`), names of other registered
+    formulas, numeric constants, `+ - * / //`, parentheses and `lead(x)` for the
+    value of the following period. All formulas are compiled together into one
+    `EvaluationPlan` with common subexpressions eliminated.
+    """
+    _AOP_PATTERN = re.compile(r'\[(\d+)\]')
+    _OPERATORS = {ast.Add: 'add', ast.Sub: 'sub', ast.Mult: 'mul', ast.Div: 'div', ast.FloorDiv: 'floordiv'}
+    _COMMUTATIVE = {'add', 'mul'}
+
+    def __init__(self, components: Optional[dict] = None, ratios: Optional[dict] = None) -> None:
+        self.formulas = {}
+        self.ratios = []
+        self._trees = {}
+        self._plan = None
+
+        for name, expression in (components or {}).items():
+            self.register(name, expression, 'component')
+        for name, expression in (ratios or {}).items():
+            self.register(name, expression, 'ratio')
+
+    def copy(self) -> "FormulaRegistry":
+        """Independent registry with the same formulas; registering on it does not affect this one."""
+        registry = FormulaRegistry()
+        registry.formulas = dict(self.formulas)
+        registry.ratios = list(self.ratios)
+        registry._trees = dict(self._trees)
+        registry._plan = self._plan
+        return registry
+
+    def fingerprint(self) -> str:
+        """Hash of the registered formulas and which of them are ratios, e.g. for keys of persisted results."""
+        payload = repr((sorted(self.formulas.items()), sorted(self.ratios)))
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def register(self, name: str, expression: str, kind: Literal['component', 'ratio'] = 'ratio') -> None:
+        """
+        Add or replace a formula.
+
+        Parameters:
+        - name: Formula name, a valid Python identifier.
+        - expression: Formula over AOP codes and other formula names, e.g. '[0045] / kratkorocne_obaveze'.
+        - kind: 'ratio' formulas are reported by `RatioAnalysis.ratio_table`, 'component' formulas are not.
+        """
+        if kind not in ['component', 'ratio']:
+            raise ValueError("The argument 'kind' must be 'component' or 'ratio'.")
+        if not name.isidentifier():
+            raise ValueError(f"Formula name {name} must be a valid identifier.")
+
+        source = self._AOP_PATTERN.sub(r'_aop_\1', expression)
+        try:
+            tree = ast.parse(source, mode='eval').body
+        except SyntaxError as error:
+            raise ValueError(f"Formula {name} could not be parsed: {expression}") from error
+
+        self.formulas[name] = expression
+        self._trees[name] = tree
+        if kind == 'ratio' and name not in self.ratios:
+            self.ratios.append(name)
+        elif kind == 'component' and name in self.ratios:
+            self.ratios.remove(name)
+        self._plan = None
+
+    def compile(self) -> EvaluationPlan:
+        """Compile every registered formula into one deduplicated evaluation plan (cached until the next `register`)."""
+        if self._plan is not None:
+            return self._plan
+
+        steps, keys, outputs = [], {}, {}
+
+        def add_step(op: str, args: tuple) -> int:
+            key = (op, args)
+            if key not in keys:
+                keys[key] = len(steps)
+                steps.append(key)
+            return keys[key]
+
+        def visit(node: ast.AST, name: str, resolving: tuple) -> int:
+            if isinstance(node, ast.Name):
+                if node.id.startswith('_aop_'):
+                    return add_step('aop', (node.id[len('_aop_'):],))
+                if node.id not in self._trees:
+                    raise ValueError(f"Formula {name} refers to unknown name {node.id}.")
+                return resolve(node.id, resolving)
+            if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+                return add_step('const', (node.value,))
+            if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+                operand = visit(node.operand, name, resolving)
+                return operand if isinstance(node.op, ast.UAdd) else add_step('neg', (operand,))
+            if isinstance(node, ast.BinOp) and type(node.op) in self._OPERATORS:
+                op = self._OPERATORS[type(node.op)]
+                operands = (visit(node.left, name, resolving), visit(node.right, name, resolving))
+                return add_step(op, tuple(sorted(operands)) if op in self._COMMUTATIVE else operands)
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'lead'
+                    and len(node.args) == 1 and not node.keywords):
+                return add_step('lead', (visit(node.args[0], name, resolving),))
+            raise ValueError(f"Unsupported expression in formula {name}: {self.formulas[name]}")
+
+        def resolve(name: str, resolving: tuple = ()) -> int:
+            if name in outputs:
+                return outputs[name]
+            if name in resolving:
+                raise ValueError(f"Formula {name} refers to itself.")
+            outputs[name] = visit(self._trees[name], name, resolving + (name,))
+            return outputs[name]
+
+        for name in self._trees:
+            resolve(name)
+
+        self._plan = EvaluationPlan(steps, outputs)
+        return self._plan
+
+
+FORMULA_REGISTRY = FormulaRegistry(COMPONENT_FORMULAS, RATIO_FORMULAS)
+
+
+class AOPCache:
+    def __init__(self, max_bytes: int = 256 * 2**20) -> None:
+        """
+        LRU cache of AOP values and evaluated plans bounded by memory, shareable across ComponentsFR instances.
+
+        Keys start with the fingerprint of the report they were computed from, so
+        instances over equal data share entries and changed data never reads stale ones.
+        Entries are sized by their NumPy buffers plus their Python containers, so a
+        few plans over large stacked filings weigh as much as many single AOP values.
+
+        Parameters:
+        - max_bytes: Maximum size of the cached values; the least recently used entries are
+          evicted first, and a value larger than this is not cached. Default is 256 MiB.
+        """
+        if max_bytes < 1:
+            raise ValueError("The argument 'max_bytes' must be at least 1.")
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: tuple) -> bool:
+        """Membership test that does not count as a lookup or refresh the entry."""
+        return key in self._entries
+
+    def get(self, key: tuple, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    @staticmethod
+    def _nbytes(value: Any) -> int:
+        """Approximate memory of a cached value: array buffers plus the containers holding them."""
+        if isinstance(value, np.ndarray):
+            return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(AOPCache._nbytes(item) for item in value.values())
+        if isinstance(value, (tuple, list, set, frozenset)):
+            return sys.getsizeof(value) + sum(AOPCache._nbytes(item) for item in value)
+        return sys.getsizeof(value)
+
+    def put(self, key: tuple, value: Any) -> None:
+        size = self._nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def invalidate(self, fingerprint: Optional[str] = None) -> None:
+        """
+        Drop cached entries.
+
+        Parameters:
+        - fingerprint: Drop only the entries of this dataset fingerprint. If None, drop everything.
+        """
+        with self._lock:
+            if fingerprint is None:
+                self._entries.clear()
+                self.bytes = 0
+            else:
+                for key in [key for key in self._entries if key[0] == fingerprint]:
+                    self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else None,
+        }
+
+
+AOP_CACHE = AOPCache()
 
 
 class ComponentsFR:
-    def __init__(self, data: pd.DataFrame) -> None:
+    def __init__(self, data: pd.DataFrame, registry: Optional[FormulaRegistry] = None,
+                 cache: Optional[AOPCache] = None) -> None:
+        self.registry = registry if registry is not None else FORMULA_REGISTRY.copy()
+        self.cache = cache if cache is not None else AOP_CACHE
         self.data = data
-        self.cache = {}
 
-    def _get_aop_value(self, AOP: str, year: int) -> int:
-        key = (AOP, year)
-        if key in self.cache:
-            return self.cache[key]
-        
-        # year_column = f"year_{year_index}"
-        value = self.data.loc[self.data['AOP'] == AOP, year].values[0]
-        self.cache[key] = value
+    @property
+    def data(self) -> pd.DataFrame:
+        return self._data
+
+    @data.setter
+    def data(self, data: pd.DataFrame) -> None:
+        """Assigning a frame rebuilds the matrix, also when it has the same columns and shape."""
+        self._data = data
+        self._build_matrix()
+
+    def _fingerprint(self) -> str:
+        """Content hash of the built matrix and its AOP, company and period labels, independent of the frame's identity."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((self.aop_index, self.companies, self.periods, self.matrix.dtype.str, self.matrix.shape)).encode())
+        values = pd.util.hash_array(self.matrix.ravel()) if self.matrix.dtype == object else self.matrix
+        digest.update(np.ascontiguousarray(values).data)
+        return digest.hexdigest()
+
+    def refresh(self) -> None:
+        """
+        Rebuild the matrix now, after editing `self.data` in place (values, columns or period labels).
+
+        Lookups do not re-check the frame, so in-place edits are only seen after `refresh`
+        or after assigning a frame to `self.data`.
+        """
+        self._build_matrix()
+
+    def _cache_key(self, *parts: Any) -> tuple:
+        return (self.data_fingerprint, *parts)
+
+    @staticmethod
+    def stack_filings(data: pd.DataFrame, company: Optional[str] = None, year: Optional[Any] = None) -> pd.DataFrame:
+        """
+        Melt a wide AOP report into the stacked (company, AOP, year, value) layout.
+
+        Parameters:
+        - data: Wide report with 'AOP', 'description' and one value column per period or per company.
+        - company: Company name, when the value columns are periods (e.g. financial_reports).
+        - year: Period label, when the value columns are companies (e.g. competitors_fr).
+
+        Returns:
+        - DataFrame with columns 'company', 'AOP', 'year' and 'value'. Several stacked
+          reports can be combined with `pd.concat` and passed to `ComponentsFR`.
+        """
+        if (company is None) == (year is None):
+            raise ValueError("Pass exactly one of 'company' or 'year'.")
+
+        value_columns = [column for column in data.columns if column not in ('AOP', 'description')]
+        var_name = 'year' if company is not None else 'company'
+        stacked = data.melt(id_vars='AOP', value_vars=value_columns, var_name=var_name, value_name='value')
+
+        if company is not None:
+            stacked['company'] = company
+        else:
+            stacked['year'] = year
+
+        return stacked[['company', 'AOP', 'year', 'value']]
+
+    def _build_matrix(self) -> None:
+        """
+        Build a dense AOP x period matrix once, with O(1) code and period lookups.
+
+        Every period column (everything except 'AOP' and 'description') becomes one
+        matrix column. Duplicate AOP codes resolve to their first row, matching the
+        previous `.values[0]` lookup. The matrix is read-only so row views can be
+        handed out without copying.
+
+        Stacked filings (columns 'company', 'AOP', 'year', 'value') build an
+        AOP x company x period tensor instead, so every component and ratio is
+        computed for all companies at once. Positions missing from a filing are NaN,
+        so components and ratios that need them are NaN for that company and period
+        instead of being computed from a fabricated 0.
+        """
+        if {'company', 'value'}.issubset(self.data.columns):
+            self._build_tensor()
+        else:
+            self._build_wide_matrix()
+
+        self.data_fingerprint = self._fingerprint()
+
+    def _build_wide_matrix(self) -> None:
+        self.companies = None
+        self.periods = [column for column in self.data.columns if column not in ('AOP', 'description')]
+        self.period_index = {period: i for i, period in enumerate(self.periods)}
+
+        self.aop_index = {}
+        for row, code in enumerate(self.data['AOP'].astype(str)):
+            self.aop_index.setdefault(code, row)
+
+        self.matrix = self.data[self.periods].to_numpy()
+        self.matrix.flags.writeable = False
+
+    def _build_tensor(self) -> None:
+        company_codes, companies = pd.factorize(self.data['company'])
+        aop_codes, aops = pd.factorize(self.data['AOP'].astype(str), sort=True)
+        period_codes, periods = pd.factorize(self.data['year'], sort=True)
+        values = self.data['value'].to_numpy()
+
+        self.companies = list(companies)
+        self.periods = list(periods)
+        self.period_index = {period: i for i, period in enumerate(self.periods)}
+        self.aop_index = {code: i for i, code in enumerate(aops)}
+
+        self.matrix = np.full((len(aops), len(companies), len(periods)), np.nan)
+        self.matrix[aop_codes, company_codes, period_codes] = values
+        self.matrix.flags.writeable = False
+
+    def _get_aop_value(self, AOP: str, year: Optional[Any] = None) -> int | np.ndarray:
+        """
+        Look up an AOP position for one period, or for all periods at once.
+
+        Parameters:
+        - AOP: AOP code, e.g. '0031'.
+        - year: Period column label. If None, the whole row is returned.
+
+        Returns:
+        - Value for a single period (one per company for stacked filings), or an array
+          whose last axis is ordered like `self.periods`.
+        """
+        if year is None:
+            return self._row(AOP)
+        if AOP not in self.aop_index:
+            raise ValueError(f"AOP code {AOP} not found in financial report.")
+        row = self.aop_index[AOP]
+
+        key = self._cache_key(AOP, year)
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+
+        if year not in self.period_index:
+            raise ValueError(f"Period {year} not found in financial report.")
+        value = self.matrix[row, ..., self.period_index[year]]
+        self.cache.put(key, value)
         return value
-    
-    def zalihe(self, year_index: int) -> int:
-        return self._get_aop_value('0031', year_index)
-    
-    def obrtna_imovina(self, year_index: int) -> int:
-        return self._get_aop_value('0030', year_index)
-    
-    def kupci(self, year_index: int) -> int:
-        return self._get_aop_value('0038', year_index) 
-       
-    def kapital(self, year_index: int) -> int:
-        return self._get_aop_value('0401', year_index) - self._get_aop_value('0403', year_index) - self._get_aop_value('0455', year_index) 
-
-    def kratkorocne_obaveze(self, year_index: int) -> int:
-        return self._get_aop_value('0431', year_index)
-    
-    def ukupne_obaveze(self, year_index: int) -> int:
-        return self._get_aop_value('0420', year_index) + self._get_aop_value('0431', year_index) + self._get_aop_value('0432', year_index)
-    
-    def ukupna_imovina(self, year_index: int) -> int:
-        return self._get_aop_value('0002', year_index) + self._get_aop_value('0030', year_index)
-    
-    def poslovna_imovina(self, year_index: int) -> int:
-        return self._get_aop_value('0002', year_index) - self._get_aop_value('0018', year_index) + self._get_aop_value('0030', year_index) - self._get_aop_value('0048', year_index)
-    
-    def dugorocne_obaveze(self, year_index: int) -> int:
-        return self._get_aop_value('0420', year_index)
-
-    def poslovni_dobitak(self, year_index: int) -> int:
-        return self._get_aop_value('1025', year_index)
-    
-    def neto_dobit(self, year_index: int) -> int:
-        return self._get_aop_value('1055', year_index) - self._get_aop_value('1056', year_index) + self._get_aop_value('1052', year_index) - self._get_aop_value('1053', year_index)
-
-    def poslovni_dobitak(self, year_index: int) -> int:
-        return self._get_aop_value('1025', year_index)
-
-    def prihod_od_prodaje(self, year: int) -> int:
-        return self._get_aop_value('1001', year)
-    
-    def prodaja(self, year_index: int) -> int:
-        return self._get_aop_value('1002', year_index) + self._get_aop_value('1005', year_index)
-    
-    def nabavna_vrednost_prodate_robe(self, year_index: int) -> int:
-        return self._get_aop_value('1014', year_index)
-    
-    def obaveze_bez_rezervisanja(self, year_index: int) -> int:
-        return self._get_aop_value('0415', year_index) - self._get_aop_value('0416', year_index)
-
-    def ebitda(self, year_index: int) -> int:
-        return self._get_aop_value('1025', year_index) - self._get_aop_value('1026', year_index) + self._get_aop_value('1020', year_index)
-    
-    def prosecne_zalihe(self, year_index: int) -> int:
-        zalihe_curr = self._get_aop_value('0031', year_index)
-        zalihe_next = self._get_aop_value('0031', year_index + 1)
-        return (zalihe_curr + zalihe_next) // 2
-
-    def prosecne_zalihe_robe(self, year_index: int) -> int:
-        zalihe_curr = self._get_aop_value('0034', year_index)
-        zalihe_next = self._get_aop_value('0034', year_index + 1)
-        return (zalihe_curr + zalihe_next) // 2
-    
-    def prosecni_kupci(self, year_index: int) -> int:
-        kupci_curr = self._get_aop_value('0034', year_index)
-        kupci_next = self._get_aop_value('0034', year_index + 1)
-        return (kupci_curr + kupci_next) // 2
-    
-    def broj_zaposlenih(self, year_index: int) -> int:
-        return self._get_aop_value('9005', year_index)
+
+    def _row(self, AOP: str) -> np.ndarray:
+        """Matrix row of an AOP code."""
+        if AOP not in self.aop_index:
+            raise ValueError(f"AOP code {AOP} not found in financial report.")
+        return self.matrix[self.aop_index[AOP]]
+
+    def evaluate(self, name: Optional[str] = None) -> dict[str, np.ndarray] | np.ndarray:
+        """
+        Evaluate the registry's plan for every period (and company) in one pass.
+
+        The results are kept in the shared cache under the data fingerprint and the
+        compiled plan, so each component and ratio is read from memory after the first
+        call, also by other instances over the same data. Cached arrays are read-only.
+
+        An AOP code missing from the report only affects the formulas that use it:
+        they are NaN in the full result, and requesting one of them by name raises.
+
+        Parameters:
+        - name: Formula name. If None, all formulas are returned.
+
+        Returns:
+        - Array for one formula, or a dictionary of arrays keyed by formula name.
+        """
+        plan = self.registry.compile()
+        key = self._cache_key('evaluate', plan)
+        cached = self.cache.get(key)
+        if cached is None:
+            missing = set()
+            results = plan.evaluate(self._row, missing)
+            for values in results.values():
+                if isinstance(values, np.ndarray):
+                    values.flags.writeable = False
+            cached = (results, frozenset(missing))
+            self.cache.put(key, cached)
+        results, missing = cached
+
+        if name is None:
+            return results
+        if name not in results:
+            raise ValueError(f"Formula {name} not found in registry.")
+        absent = sorted(plan.dependencies[name] & missing)
+        if absent:
+            raise ValueError(f"AOP code {absent[0]} not found in financial report.")
+        return results[name]
+
+    def _component(self, name: str, year_index: Optional[Any] = None) -> int | np.ndarray:
+        values = self.evaluate(name)
+        if year_index is None:
+            return values
+        return values[..., self.period_index[year_index]]
+
+    def zalihe(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('zalihe', year_index)
+
+    def obrtna_imovina(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('obrtna_imovina', year_index)
+
+    def kupci(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('kupci', year_index)
+
+    def kapital(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('kapital', year_index)
+
+    def kratkorocne_obaveze(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('kratkorocne_obaveze', year_index)
+
+    def ukupne_obaveze(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('ukupne_obaveze', year_index)
+
+    def ukupna_imovina(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('ukupna_imovina', year_index)
+
+    def poslovna_imovina(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('poslovna_imovina', year_index)
+
+    def dugorocne_obaveze(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('dugorocne_obaveze', year_index)
+
+    def poslovni_dobitak(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('poslovni_dobitak', year_index)
+
+    def neto_dobit(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('neto_dobit', year_index)
+
+    def prihod_od_prodaje(self, year: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('prihod_od_prodaje', year)
+
+    def prodaja(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('prodaja', year_index)
+
+    def nabavna_vrednost_prodate_robe(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('nabavna_vrednost_prodate_robe', year_index)
+
+    def obaveze_bez_rezervisanja(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('obaveze_bez_rezervisanja', year_index)
+
+    def ebitda(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('ebitda', year_index)
+
+    def prosecne_zalihe(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('prosecne_zalihe', year_index)
+
+    def prosecne_zalihe_robe(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('prosecne_zalihe_robe', year_index)
+
+    def prosecni_kupci(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('prosecni_kupci', year_index)
+
+    def broj_zaposlenih(self, year_index: Optional[Any] = None) -> int | np.ndarray:
+        return self._component('broj_zaposlenih', year_index)
 
 
 # # USAGE ##
@@ -94,8 +618,796 @@ class ComponentsFR:
 # print(ComponentsFR(df).prihod_od_prodaje('year_1'))
 
 class ComponentsLedger:
-    def __init__(self, data: pd.DataFrame) -> None:
-        self.data = data
+    PREFIX_INDEX_DEPTH = 4
+    CUSTOMER_PREFIXES = ('200', '201', '204', '205')
+    VALUE_ADJUSTMENT_PREFIXES = ('2009', '2019', '2049', '2059')
+    CUSTOMER_SEGMENTS = {'domestic': ('200', '204'), 'foreign': ('201', '205')}
+
+    def __init__(self, data: pd.DataFrame, build_cube: bool = False, compact: bool = False) -> None:
+        """
+        Parameters:
+        - data: Journal with 'date', 'account', 'debit' and 'credit'.
+        - build_cube: Pre-aggregate the journal by account and period (see `build_cube`). Default is False.
+        - compact: Hold the journal in the layout of `compact_journal`. Sums and `get_account_data`
+          still report amounts in currency units. Default is False.
+        """
+        self.compact = compact
+        self.amount_scale = 100 if compact else 1
+        self.data = self.compact_journal(data) if compact else data
+
+        if build_cube:
+            self.build_cube()
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """The journal; batches added with `append` are concatenated on first access."""
+        if len(self._batches) > 1:
+            if self.compact:
+                categories = pd.Index(sorted(set().union(*(batch['account'].cat.categories for batch in self._batches))))
+                batches = [batch.assign(account=batch['account'].cat.set_categories(categories)) for batch in self._batches]
+                self._batches = [self._sort_by_account(pd.concat(batches, ignore_index=True))]
+            else:
+                self._batches = [pd.concat(self._batches, ignore_index=True)]
+        return self._batches[0]
+
+    @data.setter
+    def data(self, data: pd.DataFrame) -> None:
+        self._batches = [data]
+        self.cube = None
+        self.customer_activity = None
+        self._account_index = None
+        self._cube_accounts = None
+        self._cube_bounds = None
+        self.sealed_through = None
+        self.sealed_parts = []
+        self._all_customer_activity = None
+
+    @staticmethod
+    def _dates(dates: pd.Series) -> pd.Series:
+        """Journal dates as datetimes; Arrow date32 columns are cast in Arrow instead of element by element."""
+        if isinstance(dates.dtype, pd.ArrowDtype):
+            dates = dates.astype(pd.ArrowDtype(pa.timestamp('s'))).astype('datetime64[s]')
+        return pd.to_datetime(dates)
+
+    @staticmethod
+    def _sort_by_account(data: pd.DataFrame) -> pd.DataFrame:
+        order = np.lexsort((ComponentsLedger._dates(data['date']).to_numpy(), data['account'].cat.codes.to_numpy()))
+        return data.take(order).reset_index(drop=True)
+
+    @classmethod
+    def compact_journal(cls, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compact journal layout, several times smaller than object accounts and float amounts.
+
+        - account: categorical with sorted categories (see `account_hierarchy` for the prefix levels)
+        - debit, credit: int64 minor units (cents), so sums are exact
+        - date: day-resolution Arrow date32
+
+        Rows are sorted by account and date, so each account prefix is one contiguous
+        row range that `account_slice` returns without copying.
+
+        Parameters:
+        - data: Journal with 'date', 'account', 'debit' and 'credit'. Other columns are kept.
+
+        Returns:
+        - The compact journal with a reset index. A frame that is compact already is returned unchanged;
+          any other input is in currency units, integer amounts included.
+        """
+        if cls._is_compact(data):
+            return data
+
+        missing = [column for column in ('debit', 'credit') if data[column].isna().any()]
+        if missing:
+            raise ValueError(f"The columns {missing} have missing amounts; fill or drop them before compacting the journal.")
+
+        account = data['account']
+        if not isinstance(account.dtype, pd.CategoricalDtype):
+            account = account.astype(str).astype('category')
+        account = account.cat.set_categories(sorted(account.cat.categories.astype(str)))
+
+        def cents(column: str) -> np.ndarray:
+            if pd.api.types.is_integer_dtype(data[column]):
+                return data[column].to_numpy(dtype=np.int64) * 100
+            return np.rint(data[column].to_numpy(dtype=float) * 100).astype(np.int64)
+
+        compact = pd.DataFrame({
+            'date': cls._dates(data['date']).astype(pd.ArrowDtype(pa.date32())).array,
+            'account': account.array,
+            'debit': cents('debit'),
+            'credit': cents('credit'),
+        })
+        for column in data.columns:
+            if column not in compact.columns:
+                compact[column] = data[column].to_numpy()
+        return cls._sort_by_account(compact)
+
+    @staticmethod
+    def _is_compact(data: pd.DataFrame) -> bool:
+        account = data['account']
+        return (
+            isinstance(account.dtype, pd.CategoricalDtype) and account.cat.categories.is_monotonic_increasing
+            and data['debit'].dtype == np.int64 and data['credit'].dtype == np.int64
+            and data['date'].dtype == pd.ArrowDtype(pa.date32())
+        )
+
+    def save_arrow(self, path: str) -> str:
+        """
+        Write the journal as an uncompressed Arrow IPC (Feather v2) file for `open_arrow`.
+
+        Every column is written as a single chunk, so it can be memory-mapped without
+        copying. Compact ledgers are stored in the compact layout.
+
+        Returns:
+        - The path written.
+        """
+        table = pa.Table.from_pandas(self.data, preserve_index=False).combine_chunks()
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return path
+
+    @classmethod
+    def open_arrow(cls, path: str, build_cube: bool = False) -> "ComponentsLedger":
+        """
+        Open a journal written by `save_arrow` memory-mapped.
+
+        Numeric columns are NumPy views and other columns Arrow-backed, all over the
+        mapped file, so opening does not decode or copy the journal and processes on
+        the same host share it through the OS page cache. A compact file opens as a
+        compact ledger.
+
+        Parameters:
+        - path: Arrow IPC file written by `save_arrow`.
+        - build_cube: Pre-aggregate the journal (see `build_cube`). Default is False.
+        """
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+        columns = {}
+        for name, column in zip(table.column_names, table.columns):
+            array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+            if pa.types.is_dictionary(array.type):
+                columns[name] = pd.Categorical.from_codes(
+                    array.indices.to_numpy(zero_copy_only=False), categories=pd.Index(array.dictionary.to_pylist()), validate=False,
+                )
+            elif (pa.types.is_integer(array.type) or pa.types.is_floating(array.type)) and array.null_count == 0:
+                columns[name] = array.to_numpy(zero_copy_only=True)
+            else:
+                columns[name] = pd.arrays.ArrowExtensionArray(array)
+
+        data = pd.DataFrame(columns, copy=False)
+        return cls(data, build_cube=build_cube, compact=cls._is_compact(data))
+
+    def account_hierarchy(self) -> pd.DataFrame:
+        """
+        Prefix levels of every account code in the journal, parsed once per code instead of per row.
+
+        Returns:
+        - DataFrame indexed by account with 'class' (1 digit), 'group' (2 digits),
+          'synthetic' (3 digits), 'analytic' (code before '-') and 'subaccount' (after '-', or '').
+        """
+        self._ensure_account_index()
+
+        accounts = pd.Series(self._account_index['accounts'])
+        parts = accounts.str.partition('-')
+        return pd.DataFrame({
+            'class': accounts.str[:1].to_numpy(),
+            'group': accounts.str[:2].to_numpy(),
+            'synthetic': accounts.str[:3].to_numpy(),
+            'analytic': parts[0].to_numpy(),
+            'subaccount': parts[2].to_numpy(),
+        }, index=pd.Index(accounts, name='account'))
+
+    @classmethod
+    def _account_dictionary(cls, accounts: np.ndarray) -> dict:
+        """Sorted account codes with the code range of every 1- to PREFIX_INDEX_DEPTH-digit prefix."""
+        prefix_ranges = {}
+        for depth in range(1, cls.PREFIX_INDEX_DEPTH + 1):
+            prefixes, first_codes = np.unique(accounts.astype(f'<U{depth}'), return_index=True)
+            last_codes = np.append(first_codes[1:], len(accounts))
+            for prefix, first_code, last_code in zip(prefixes, first_codes, last_codes):
+                prefix_ranges[str(prefix)] = (int(first_code), int(last_code))
+
+        return {'accounts': accounts, 'prefix_ranges': prefix_ranges}
+
+    def _ensure_account_index(self) -> None:
+        """Build the account index, or rebuild it when the journal frame, its account column or its length changed."""
+        index = self._account_index
+        data = self.data
+        if (index is None or index['source'][0] is not data or index['source'][1] is not data['account'].array
+                or len(index['codes']) != len(data)):
+            self._build_account_index()
+
+    def _build_account_index(self) -> None:
+        """
+        Index the journal by account once, so prefix queries resolve to row ranges.
+
+        Accounts are dictionary-encoded with sorted categories and the row numbers are
+        ordered by account code. Every 1- to 4-digit prefix then covers one contiguous
+        range of codes, which is precomputed. Longer prefixes are found by binary
+        search over the sorted account codes.
+        """
+        account = self.data['account']
+        if isinstance(account.dtype, pd.CategoricalDtype) and account.cat.categories.is_monotonic_increasing:
+            codes, accounts = account.cat.codes.to_numpy(), account.cat.categories.astype(str)
+        else:
+            codes, accounts = pd.factorize(account.astype(str), sort=True)
+        row_order = np.argsort(codes, kind='stable')
+        code_bounds = np.searchsorted(codes[row_order], np.arange(len(accounts) + 1))
+
+        self._account_index = {
+            'source': (self.data, account.array),
+            'codes': codes,
+            'row_order': row_order,
+            'code_bounds': code_bounds,
+            **self._account_dictionary(np.asarray(accounts, dtype=str)),
+        }
+
+    def _prefix_code_range(self, prefix: str, dictionary: dict) -> tuple[int, int]:
+        """Range of sorted account codes covered by a prefix; empty if no account matches, all codes for ''."""
+        if prefix == '':
+            return 0, len(dictionary['accounts'])
+        if len(prefix) <= self.PREFIX_INDEX_DEPTH:
+            return dictionary['prefix_ranges'].get(prefix, (0, 0))
+
+        first_code = np.searchsorted(dictionary['accounts'], prefix, side='left')
+        last_code = np.searchsorted(dictionary['accounts'], prefix + chr(0x10FFFF), side='left')
+        return int(first_code), int(last_code)
+
+    def _positions(self, account: str | list, dictionary: dict, bounds: np.ndarray,
+                   order: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Positions of the entries whose account starts with any of the given prefixes.
+
+        Parameters:
+        - account: A string or list of account prefixes.
+        - dictionary: Account dictionary (see `_account_dictionary`) the entries' codes refer to.
+        - bounds: Offsets of each account code in the account-ordered entries (length = number of accounts + 1).
+        - order: Permutation from account order back to entry positions. None if the entries are already account-ordered.
+
+        Returns:
+        - Sorted array of entry positions.
+        """
+        if isinstance(account, str):
+            prefixes = [account]
+        elif isinstance(account, list):
+            prefixes = account
+        else:
+            raise ValueError("The 'account' parameter must be a string or a list of strings.")
+
+        code_ranges = sorted(self._prefix_code_range(str(prefix), dictionary) for prefix in prefixes)
+
+        slices = []
+        stop = 0
+        for first_code, last_code in code_ranges:
+            range_start, range_stop = max(int(bounds[first_code]), stop), int(bounds[last_code])
+            if range_start < range_stop:
+                slices.append(np.arange(range_start, range_stop) if order is None else order[range_start:range_stop])
+                stop = range_stop
+
+        if not slices:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(slices))
+
+    def _account_rows(self, account: str | list) -> np.ndarray:
+        """Sorted positions of the journal rows whose account starts with any of the given prefixes."""
+        self._ensure_account_index()
+
+        index = self._account_index
+        return self._positions(account, index, index['code_bounds'], index['row_order'])
+
+    def build_cube(self) -> pd.DataFrame:
+        """
+        Pre-aggregate debit and credit sums by account x year x month x ISO week.
+
+        The cube is built once and answers every prefix and period query in
+        `sum_account_data_by_period` and `sum_account_data_by_month` by rolling up
+        its rows instead of rescanning the journal. Weeks are ISO weeks within the
+        calendar year of the entry, as in the weekly notebook charts. Cells closed by
+        `seal` are held in `sealed_parts` and left out of the open cube.
+
+        Returns:
+        - The cube, sorted by account code, with columns 'code', 'year', 'month', 'week', 'debit', 'credit'.
+        """
+        self._ensure_account_index()
+
+        keys = pd.DataFrame({
+            'code': self._account_index['codes'],
+            **self._period_columns(self._dates(self.data['date'])),
+            'debit': self.data['debit'].to_numpy(),
+            'credit': self.data['credit'].to_numpy(),
+        })
+
+        dictionary = {key: self._account_index[key] for key in ('accounts', 'prefix_ranges')}
+        cube = keys.groupby(['code', 'year', 'month', 'week'], as_index=False, sort=True)[['debit', 'credit']].sum()
+        if self.sealed_parts:
+            cube = cube[~self._closed_cells(cube, self.sealed_through)].reset_index(drop=True)
+        self._set_cube(cube, dictionary)
+        return self.cube
+
+    @staticmethod
+    def _period_columns(dates: pd.Series) -> dict:
+        return {
+            'year': dates.dt.year.to_numpy(),
+            'month': dates.dt.month.to_numpy(),
+            'week': dates.dt.isocalendar().week.to_numpy(dtype=np.int64),
+        }
+
+    def _set_cube(self, cube: pd.DataFrame, dictionary: dict) -> None:
+        self.cube = cube
+        self._cube_accounts = dictionary
+        self._cube_bounds = np.searchsorted(cube['code'].to_numpy(), np.arange(len(dictionary['accounts']) + 1))
+
+    def _cube_parts(self) -> list[tuple[pd.DataFrame, dict, np.ndarray]]:
+        """(cube, account dictionary, code bounds) of every sealed part and of the open cube."""
+        parts = [(part['cube'], part['accounts'], part['bounds']) for part in self.sealed_parts]
+        return parts + [(self.cube, self._cube_accounts, self._cube_bounds)]
+
+    @staticmethod
+    def _extend_accounts(accounts: np.ndarray, new_accounts: np.ndarray) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Insert the unseen accounts of `new_accounts` into the sorted `accounts`.
+
+        Returns:
+        - The sorted accounts and the map from old to new codes, or None if no account is new.
+        """
+        new_accounts = np.unique(new_accounts)
+        positions = np.searchsorted(accounts, new_accounts)
+        known = positions < len(accounts)
+        known[known] = accounts[positions[known]] == new_accounts[known]
+        unseen = new_accounts[~known]
+        if len(unseen) == 0:
+            return accounts, None
+
+        accounts = accounts.astype(np.result_type(accounts, unseen))
+        return np.insert(accounts, positions[~known], unseen), np.arange(len(accounts)) + np.searchsorted(unseen, accounts)
+
+    @staticmethod
+    def _cell_keys(table: pd.DataFrame, codes: str) -> np.ndarray:
+        """One int64 per (code, year, month, week) cell, ordered like the sorted aggregate tables."""
+        columns = [table[column].to_numpy(dtype=np.int64) for column in (codes, 'year', 'month', 'week')]
+        return ((columns[0] * 10000 + columns[1]) * 13 + columns[2]) * 54 + columns[3]
+
+    @classmethod
+    def _merge_cells(cls, table: pd.DataFrame, delta: pd.DataFrame, codes: str, sums: list) -> pd.DataFrame:
+        """
+        Add `delta` to `table`, both sorted by (codes, year, month, week) with one row per cell.
+
+        Cells the table has are summed, new cells are inserted at their sorted position,
+        so the table is copied once but never regrouped.
+        """
+        table_keys = cls._cell_keys(table, codes)
+        delta_keys = cls._cell_keys(delta, codes)
+        positions = np.searchsorted(table_keys, delta_keys)
+        found = positions < len(table_keys)
+        found[found] = table_keys[positions[found]] == delta_keys[found]
+
+        merged = {}
+        for column in table.columns:
+            values = table[column].to_numpy()
+            added = delta[column].to_numpy()
+            if column in sums and found.any():
+                values = values.copy()
+                values[positions[found]] += added[found]
+            merged[column] = np.insert(values, positions[~found], added[~found])
+        return pd.DataFrame(merged)
+
+    def _merge_into_cube(self, entries: pd.DataFrame, dates: pd.Series) -> None:
+        """
+        Add entries to the open cube; only the entries are grouped.
+
+        New accounts are inserted into the account dictionary, and only then are the
+        cube's codes remapped. Sealed parts are not touched.
+        """
+        accounts = entries['account'].astype(str).to_numpy(dtype=str)
+        merged_accounts, code_map = self._extend_accounts(self._cube_accounts['accounts'], accounts)
+
+        cube, dictionary = self.cube, self._cube_accounts
+        if code_map is not None:
+            cube = cube.assign(code=code_map[cube['code'].to_numpy()])
+            dictionary = self._account_dictionary(merged_accounts)
+
+        delta = pd.DataFrame({
+            'code': np.searchsorted(merged_accounts, accounts),
+            **self._period_columns(dates),
+            'debit': entries['debit'].to_numpy(),
+            'credit': entries['credit'].to_numpy(),
+        }).groupby(['code', 'year', 'month', 'week'], as_index=False, sort=True)[['debit', 'credit']].sum()
+
+        self._set_cube(self._merge_cells(cube, delta, 'code', ['debit', 'credit']), dictionary)
+
+    def _merge_customer_activity(self, delta: pd.DataFrame) -> None:
+        """Add grouped customer entries (see `_customer_entries`) to the open customer activity."""
+        activity = self.customer_activity
+        accounts, code_map = self._extend_accounts(
+            activity['account'].cat.categories.to_numpy(dtype=str), delta['account'].cat.categories.to_numpy(dtype=str),
+        )
+
+        codes = activity['account'].cat.codes.to_numpy()
+        activity = activity.assign(account=codes if code_map is None else code_map[codes])
+        delta = delta.assign(account=np.searchsorted(accounts, delta['account'].astype(str).to_numpy(dtype=str)))
+
+        merged = self._merge_cells(activity, delta, 'account', ['invoices', 'debit'])
+        merged['account'] = pd.Categorical.from_codes(merged['account'].to_numpy(), categories=accounts)
+        self.customer_activity = merged
+        self._all_customer_activity = None
+
+    @staticmethod
+    def _group_customer_activity(activity: pd.DataFrame) -> pd.DataFrame:
+        grouped = activity.groupby(['account', 'year', 'month', 'week'], as_index=False, sort=True, observed=True)[['invoices', 'debit']].sum()
+        grouped['account'] = grouped['account'].astype(str).astype('category')
+        return grouped
+
+    @classmethod
+    def _is_customer(cls, accounts: pd.Index) -> np.ndarray:
+        """Analytic accounts (containing '-') under CUSTOMER_PREFIXES, without the value adjustments (2009, 2019, 2049, 2059)."""
+        accounts = accounts.astype(str)
+        return np.asarray(
+            accounts.str.startswith(cls.CUSTOMER_PREFIXES) & ~accounts.str.startswith(cls.VALUE_ADJUSTMENT_PREFIXES)
+            & accounts.str.contains('-', regex=False), dtype=bool,
+        )
+
+    def _customer_entries(self, entries: pd.DataFrame, dates: pd.Series) -> pd.DataFrame:
+        """Invoice count and debit per customer account and week, for the analytic customer accounts of the entries."""
+        codes, accounts = pd.factorize(entries['account'], sort=True)
+        accounts = pd.Index(accounts).astype(str)
+        is_customer = np.append(self._is_customer(accounts), False)
+        mask = is_customer[codes] & (entries['debit'] > 0).to_numpy()
+
+        activity = pd.DataFrame({
+            'account': pd.Categorical.from_codes(codes[mask], categories=accounts),
+            **{column: values[mask] for column, values in self._period_columns(dates).items()},
+            'invoices': 1,
+            'debit': entries['debit'].to_numpy()[mask] / self.amount_scale,
+        })
+        return self._group_customer_activity(activity)
+
+    def build_customer_activity(self) -> pd.DataFrame:
+        """
+        Maintain invoice counts and debit per customer and ISO week, updated by `append`.
+
+        Customers are the analytic accounts (containing '-') under CUSTOMER_PREFIXES
+        with a debit entry, except the value adjustments under VALUE_ADJUSTMENT_PREFIXES. The prefix test runs once per distinct account, and the
+        customer analytics below work on this table instead of the journal rows.
+        Cells closed by `seal` are held in `sealed_parts` and left out.
+
+        Returns:
+        - DataFrame with columns 'account' (categorical), 'year', 'month', 'week', 'invoices' and 'debit'.
+        """
+        activity = self._customer_entries(self.data, self._dates(self.data['date']))
+        if self.sealed_parts:
+            activity = activity[~self._closed_cells(activity, self.sealed_through)].reset_index(drop=True)
+        self.customer_activity = activity
+        self._all_customer_activity = None
+        return self.customer_activity
+
+    def _customer_activity(self) -> pd.DataFrame:
+        """Customer activity of the sealed parts and the open periods, combined once per change."""
+        if self.customer_activity is None:
+            self.build_customer_activity()
+        if not self.sealed_parts:
+            return self.customer_activity
+
+        if self._all_customer_activity is None:
+            frames = [part['customer_activity'] for part in self.sealed_parts] + [self.customer_activity]
+            activity = pd.concat([frame.drop(columns='account') for frame in frames], ignore_index=True)
+            activity.insert(0, 'account', union_categoricals([frame['account'] for frame in frames], sort_categories=True))
+            self._all_customer_activity = activity
+        return self._all_customer_activity
+
+    def _customer_frame(self, segment: Optional[str] = None, customers: Optional[Any] = None) -> pd.DataFrame:
+        activity = self._customer_activity()
+        if segment is not None:
+            if segment not in self.CUSTOMER_SEGMENTS:
+                raise ValueError(f"The argument 'segment' must be one of {list(self.CUSTOMER_SEGMENTS)}.")
+            in_segment = activity['account'].cat.categories.str.startswith(self.CUSTOMER_SEGMENTS[segment])
+            activity = activity[in_segment[activity['account'].cat.codes.to_numpy()]]
+        if customers is not None:
+            activity = activity[activity['account'].isin(list(customers))]
+        return activity
+
+    @staticmethod
+    def _period_mask(activity: pd.DataFrame, period: int | tuple) -> np.ndarray:
+        if isinstance(period, tuple):
+            year, month = period
+            return ((activity['year'] == year) & (activity['month'] == month)).to_numpy()
+        return (activity['year'] == period).to_numpy()
+
+    def customers(self, year: int, month: Optional[int] = None) -> set:
+        """Set of customer accounts invoiced in a year, or in one month of it."""
+        activity = self._customer_frame()
+        return set(activity.loc[self._period_mask(activity, year if month is None else (year, month)), 'account'])
+
+    def compare_customers(self, current: int | tuple, previous: int | tuple, segment: Optional[str] = None) -> dict:
+        """
+        New, returning and lost customers between any two periods.
+
+        Parameters:
+        - current: A year (e.g. 2023) or a (year, month) tuple.
+        - previous: The period compared against, in the same form.
+        - segment: Optional customer segment from CUSTOMER_SEGMENTS ('domestic' or 'foreign').
+
+        Returns:
+        - Dictionary with sorted arrays of account codes: 'new' (only in current),
+          'returning' (in both) and 'lost' (only in previous).
+        """
+        activity = self._customer_frame(segment)
+        codes = activity['account'].cat.codes.to_numpy()
+        accounts = activity['account'].cat.categories.to_numpy()
+
+        in_current = np.zeros(len(accounts), dtype=bool)
+        in_current[codes[self._period_mask(activity, current)]] = True
+        in_previous = np.zeros(len(accounts), dtype=bool)
+        in_previous[codes[self._period_mask(activity, previous)]] = True
+
+        return {
+            'new': accounts[in_current & ~in_previous],
+            'returning': accounts[in_current & in_previous],
+            'lost': accounts[in_previous & ~in_current],
+        }
+
+    def customer_cohorts(self, by: Literal['year', 'month'] = 'year', segment: Optional[str] = None) -> pd.DataFrame:
+        """
+        Cohort retention: share of the customers first invoiced in a period who are invoiced again n periods later.
+
+        Parameters:
+        - by: Cohort and period length ('year' or 'month'). Default is 'year'.
+        - segment: Optional customer segment from CUSTOMER_SEGMENTS.
+
+        Returns:
+        - DataFrame indexed by cohort ('YYYY' or 'YYYY-MM') with the cohort size in
+          'customers' and the retention for 0, 1, 2, ... periods after the first invoice
+          (NaN for periods after the end of the journal).
+        """
+        if by not in ['year', 'month']:
+            raise ValueError("The argument 'by' must be 'year' or 'month'.")
+
+        activity = self._customer_frame(segment)
+        codes = activity['account'].cat.codes.to_numpy().astype(np.int64)
+        periods = activity['year'].to_numpy(dtype=np.int64)
+        if by == 'month':
+            periods = periods * 12 + activity['month'].to_numpy(dtype=np.int64) - 1
+        if len(periods) == 0:
+            return pd.DataFrame(columns=['customers'])
+
+        first_period = periods.min()
+        span = periods.max() - first_period + 1
+        active = np.unique(codes * span + (periods - first_period))
+        customer, period = active // span, active % span
+
+        first = np.full(len(activity['account'].cat.categories), span, dtype=np.int64)
+        np.minimum.at(first, customer, period)
+
+        counts = np.zeros((span, span), dtype=np.int64)
+        np.add.at(counts, (first[customer], period - first[customer]), 1)
+        sizes = counts[:, 0]
+        cohorts = first_period + np.arange(span)
+
+        if by == 'year':
+            labels = cohorts.astype(str)
+        else:
+            labels = [f"{cohort // 12}-{cohort % 12 + 1:02d}" for cohort in cohorts]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            retention = counts / sizes[:, None]
+        retention[np.add.outer(np.arange(span), np.arange(span)) >= span] = np.nan
+        table = pd.DataFrame(retention, index=pd.Index(labels, name='cohort'), columns=range(span))
+        table.insert(0, 'customers', sizes)
+        return table[sizes > 0]
+
+    def customer_account_frequency(self, by: Literal['month', 'week'] = 'month', year: Optional[int] = None,
+                                   segment: Optional[str] = None, customers: Optional[Any] = None) -> pd.DataFrame:
+        """
+        Invoice frequency and value of every customer per month or ISO week, as in the notebook's account statistics.
+
+        Parameters:
+        - by: Period ('month' or 'week'). Default is 'month'.
+        - year: Optional year to restrict to. Default is every year with customer invoices.
+        - segment: Optional customer segment from CUSTOMER_SEGMENTS.
+        - customers: Optional account codes to restrict to, e.g. `compare_customers(...)['returning']`.
+
+        Returns:
+        - DataFrame with 'account', 'year', the period, 'invoices' (the customer's invoice
+          frequency in the period), 'debit' and 'avg_value' (debit per invoice), one row per
+          customer and period with invoices, ordered by account, year and period.
+        """
+        if by not in ['month', 'week']:
+            raise ValueError("The argument 'by' must be 'month' or 'week'.")
+
+        activity = self._customer_frame(segment, customers)
+        if year is not None:
+            activity = activity[activity['year'] == year]
+
+        result = activity.groupby(['account', 'year', by], as_index=False, sort=True, observed=True)[['invoices', 'debit']].sum()
+        result['account'] = result['account'].astype(str)
+        result['avg_value'] = result['debit'] / result['invoices']
+        return result
+
+    def customer_frequency(self, by: Literal['month', 'week'] = 'month', year: Optional[int] = None,
+                           segment: Optional[str] = None, customers: Optional[Any] = None) -> pd.DataFrame:
+        """
+        Invoice frequency and value per month or ISO week on a dense, zero-filled axis.
+
+        The per-customer rows of `customer_account_frequency` are rolled up, so each
+        customer counts once per period.
+
+        Parameters:
+        - by: Period ('month' or 'week'). Default is 'month'.
+        - year: Optional year to restrict to. Default is every year with customer invoices.
+        - segment: Optional customer segment from CUSTOMER_SEGMENTS.
+        - customers: Optional account codes to restrict to, e.g. `compare_customers(...)['returning']`.
+
+        Returns:
+        - DataFrame with 'year', the period (months 1-12 or weeks 1-53 for every year),
+          'invoices', 'customers' (distinct), 'debit', 'avg_value' (debit per invoice) and
+          'invoices_per_customer'. Periods without invoices are 0.
+        """
+        accounts = self.customer_account_frequency(by, year, segment, customers)
+        grouped = accounts.groupby(['year', by]).agg(
+            invoices=('invoices', 'sum'), customers=('account', 'size'), debit=('debit', 'sum'),
+        )
+
+        if year is not None:
+            years = [year]
+        else:
+            years = range(accounts['year'].min(), accounts['year'].max() + 1) if len(accounts) else []
+        grid = pd.MultiIndex.from_product([years, range(1, 13 if by == 'month' else 54)], names=['year', by])
+        result = grouped.reindex(grid, fill_value=0).reset_index()
+
+        invoices = result['invoices'].to_numpy(dtype=float)
+        customer_counts = result['customers'].to_numpy(dtype=float)
+        result['avg_value'] = np.divide(result['debit'].to_numpy(dtype=float), invoices, out=np.zeros(len(result)), where=invoices > 0)
+        result['invoices_per_customer'] = np.divide(invoices, customer_counts, out=np.zeros(len(result)), where=customer_counts > 0)
+        return result
+
+    @staticmethod
+    def _closed_cells(aggregates: pd.DataFrame, through: pd.Timestamp) -> np.ndarray:
+        """
+        Rows of an aggregate table whose (year, month, week) cell ends on or before `through`.
+
+        A cell ends on the earlier of its month's last day and its ISO week's Sunday. The
+        week and month around `through` stay open while they also hold later dates.
+        """
+        periods = [aggregates[column].to_numpy(dtype=np.int64) for column in ('year', 'month', 'week')]
+        cells, inverse = np.unique((periods[0] * 13 + periods[1]) * 54 + periods[2], return_inverse=True)
+
+        closed = np.zeros(len(cells), dtype=bool)
+        for position, cell in enumerate(cells):
+            year, rest = divmod(int(cell), 13 * 54)
+            month, week = divmod(rest, 54)
+            iso_year = year - (month == 1 and week >= 52) + (month == 12 and week == 1)
+            month_end = pd.Timestamp(year, month, 1) + pd.offsets.MonthEnd(0)
+            week_end = pd.Timestamp(date.fromisocalendar(iso_year, week, 7))
+            closed[position] = min(month_end, week_end) <= through
+        return closed[inverse.ravel()]
+
+    @staticmethod
+    def _freeze(frame: pd.DataFrame) -> pd.DataFrame:
+        """Copy of an aggregate table on read-only arrays, so writes to it raise instead of changing it."""
+        columns = {}
+        for name, column in frame.items():
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                codes = column.cat.codes.to_numpy().copy()
+                codes.flags.writeable = False
+                columns[name] = pd.Categorical.from_codes(codes, dtype=column.dtype)
+            else:
+                values = column.to_numpy().copy()
+                values.flags.writeable = False
+                columns[name] = values
+        return pd.DataFrame(columns, copy=False)
+
+    def seal(self, through: str | pd.Timestamp) -> None:
+        """
+        Close every period up to and including a date; `append` rejects entries dated in them.
+
+        The cube and customer activity cells that end by `through` move from the open
+        aggregates into a new read-only entry of `sealed_parts` ('through', 'cube',
+        'accounts', 'bounds', 'customer_activity'). Later appends and rebuilds only change
+        the open aggregates; queries combine both. Both aggregates are built first if needed.
+
+        Parameters:
+        - through: Last sealed date, e.g. '2023-12-31'. Sealed periods cannot be reopened.
+        """
+        through = pd.Timestamp(through)
+        if self.sealed_through is not None and through < self.sealed_through:
+            raise ValueError(f"Periods through {self.sealed_through.date()} are already sealed and cannot be reopened.")
+
+        if self.cube is None:
+            self.build_cube()
+        if self.customer_activity is None:
+            self.build_customer_activity()
+
+        cube_closed = self._closed_cells(self.cube, through)
+        activity_closed = self._closed_cells(self.customer_activity, through)
+        if cube_closed.any() or activity_closed.any():
+            cube = self._freeze(self.cube[cube_closed])
+            bounds = np.searchsorted(cube['code'].to_numpy(), np.arange(len(self._cube_accounts['accounts']) + 1))
+            bounds.flags.writeable = False
+            self.sealed_parts.append({
+                'through': through,
+                'cube': cube,
+                'accounts': self._cube_accounts,
+                'bounds': bounds,
+                'customer_activity': self._freeze(self.customer_activity[activity_closed]),
+            })
+            self._set_cube(self.cube[~cube_closed].reset_index(drop=True), self._cube_accounts)
+            self.customer_activity = self.customer_activity[~activity_closed].reset_index(drop=True)
+            self._all_customer_activity = None
+        self.sealed_through = through
+
+    def append(self, entries: pd.DataFrame) -> None:
+        """
+        Add new journal entries, e.g. a new year or a daily delta, without recomputing history.
+
+        Only the new entries are grouped; their cells are added to the open cube and
+        customer activity, if built, and sealed parts are left as they are. The journal
+        rows are concatenated lazily, and the account index is rebuilt only when a query
+        needs the rows again.
+
+        Parameters:
+        - entries: Journal entries with 'date', 'account', 'debit' and 'credit'.
+        """
+        if entries.empty:
+            return
+
+        if self.compact:
+            entries = self.compact_journal(entries)
+
+        dates = self._dates(entries['date'])
+        if self.sealed_through is not None and dates.min() <= self.sealed_through:
+            raise ValueError(f"Entries dated through {self.sealed_through.date()} are sealed and cannot be appended.")
+        if not self.compact and pd.api.types.is_datetime64_any_dtype(self._batches[0]['date']):
+            entries = entries.assign(date=dates)
+
+        if self.cube is not None:
+            self._merge_into_cube(entries, dates)
+        if self.customer_activity is not None:
+            self._merge_customer_activity(self._customer_entries(entries, dates))
+
+        self._batches.append(entries)
+        self._account_index = None
+
+    def sum_account_data_by_period(self, account: str | list, by: Literal['year', 'month', 'week'] = 'month',
+                                   debit_or_credit: str = 'all', year: Optional[int] = None) -> pd.DataFrame:
+        """
+        Summarize debit and/or credit by year, month or ISO week for account prefix(es).
+
+        Uses the pre-aggregated cube and its sealed parts when built, otherwise the journal rows.
+
+        Parameters:
+        - account: A string or list of account prefixes to filter by.
+        - by: Period to group by ('year', 'month' or 'week'). Default is 'month'.
+        - debit_or_credit: The column to sum ('debit', 'credit', or 'all' for both). Default is 'all'.
+        - year: Optional calendar year to restrict the result to.
+
+        Returns:
+        - DataFrame with 'year', the period column (unless by='year') and the summed columns.
+        """
+        if debit_or_credit not in ['debit', 'credit', 'all']:
+            raise ValueError("The argument 'debit_or_credit' must be 'debit', 'credit', or 'all'.")
+        if by not in ['year', 'month', 'week']:
+            raise ValueError("The argument 'by' must be 'year', 'month', or 'week'.")
+
+        cols_to_sum = ['debit', 'credit'] if debit_or_credit == 'all' else [debit_or_credit]
+        group_by = ['year'] if by == 'year' else ['year', by]
+
+        if self.cube is not None:
+            selections = [cube.iloc[self._positions(account, dictionary, bounds)] for cube, dictionary, bounds in self._cube_parts()]
+            entries = selections[0] if len(selections) == 1 else pd.concat(selections, ignore_index=True)
+        else:
+            rows = self.data.iloc[self._account_rows(account)]
+            dates = self._dates(rows['date'])
+            entries = pd.DataFrame({'year': dates.dt.year.to_numpy()})
+            if by != 'year':
+                entries[by] = dates.dt.month.to_numpy() if by == 'month' else dates.dt.isocalendar().week.to_numpy(dtype=np.int64)
+            for column in cols_to_sum:
+                entries[column] = rows[column].to_numpy()
+
+        if year is not None:
+            entries = entries[entries['year'] == year]
+
+        result = entries.groupby(group_by, as_index=False)[cols_to_sum].sum()
+        if self.amount_scale != 1:
+            result[cols_to_sum] = result[cols_to_sum] / self.amount_scale
+        return result
 
     def get_account_data(self, account: str | list, debit_or_credit: str = 'all') -> pd.DataFrame:
         """
@@ -108,19 +1420,10 @@ class ComponentsLedger:
         Returns:
         - Filtered DataFrame with only the relevant columns.
         """
-        df = self.data
-
         if debit_or_credit not in ['debit', 'credit', 'all']:
             raise ValueError("The argument 'debit_or_credit' must be 'debit', 'credit', or 'all'.")
 
-        df['account'] = df['account'].astype(str)
-
-        if isinstance(account, str):
-            filtered_data = df[df['account'].str.startswith(account)]
-        elif isinstance(account, list):
-            filtered_data = df[df['account'].str.startswith(tuple(account))]
-        else:
-            raise ValueError("The 'account' parameter must be a string or a list of strings.")
+        filtered_data = self.data.iloc[self._account_rows(account)]
 
         if debit_or_credit == 'debit':
             filtered_data = filtered_data[['date', 'account', 'debit']]
@@ -129,8 +1432,33 @@ class ComponentsLedger:
         else:
             filtered_data = filtered_data[['date', 'account', 'debit', 'credit']]
 
+        if self.amount_scale != 1:
+            amounts = [column for column in ('debit', 'credit') if column in filtered_data.columns]
+            filtered_data = filtered_data.assign(**{column: filtered_data[column] / self.amount_scale for column in amounts})
+
         return filtered_data
 
+    def account_slice(self, account: str | list) -> pd.DataFrame:
+        """
+        Journal rows of account prefix(es) as a zero-copy slice of `self.data`.
+
+        The rows must be contiguous, which holds for any prefix of a compact ledger
+        (rows sorted by account). Amounts are as stored, i.e. in cents for a compact ledger.
+
+        Parameters:
+        - account: A string or list of account prefixes.
+
+        Returns:
+        - Positional slice of `self.data`, sharing its memory.
+        """
+        positions = self._account_rows(account)
+        if len(positions) == 0:
+            return self.data.iloc[0:0]
+        start, stop = int(positions[0]), int(positions[-1]) + 1
+        if stop - start != len(positions):
+            raise ValueError("The account rows are not contiguous; use a compact ledger or get_account_data.")
+        return self.data.iloc[start:stop]
+
     def sum_account_data_by_month(self, account: str | list, debit_or_credit: str = 'all') -> dict:
         """
         Summarize data by month and year, optionally filtering by account(s) and debit or credit.
@@ -142,36 +1470,11 @@ class ComponentsLedger:
         Returns:
         - Dictionary with 'month-year' as keys and sums as values.
         """
-        df = self.data.copy()
-
         if debit_or_credit not in ['debit', 'credit', 'all']:
             raise ValueError("The argument 'debit_or_credit' must be 'debit', 'credit', or 'all'.")
 
-        df['account'] = df['account'].astype(str)
-
-        if isinstance(account, str):
-            filtered_data = df[df['account'].str.startswith(account)]
-        elif isinstance(account, list):
-            filtered_data = df[df['account'].str.startswith(tuple(account))]
-        else:
-            raise ValueError("The 'account' parameter must be a string or a list of strings.")
-
-        filtered_data['year'] = filtered_data['date'].dt.year
-        filtered_data['month'] = filtered_data['date'].dt.month
-
-        if debit_or_credit == 'debit':
-            filtered_data = filtered_data[['year', 'month', 'debit']]
-        elif debit_or_credit == 'credit':
-            filtered_data = filtered_data[['year', 'month', 'credit']]
-        else:
-            filtered_data = filtered_data[['year', 'month', 'debit', 'credit']]
-
-        cols_to_sum = ['debit', 'credit']
-        cols_in_data = [col for col in cols_to_sum if col in filtered_data.columns]
-        grouped_data = (
-            filtered_data.groupby(['year', 'month'], as_index=False)[cols_in_data]
-            .sum()
-        )
+        cols_in_data = ['debit', 'credit'] if debit_or_credit == 'all' else [debit_or_credit]
+        grouped_data = self.sum_account_data_by_period(account, 'month', debit_or_credit)
 
         grouped_data['month_year'] = grouped_data['year'].astype(str) + '-' + grouped_data['month'].astype(str).str.zfill(2)
 
@@ -184,15 +1487,23 @@ class ComponentsLedger:
         return df[df['date'].dt.year == year]
 
     @staticmethod
-    def calculate_percentage_changes_from_100(df, column):
-        percentage_changes = [100.0]
-        
-        for i in range(1, len(df)):
-            change = ((df[column].iloc[i] - df[column].iloc[i - 1]) / df[column].iloc[i - 1]) * 100
-            percentage_changes.append(round(change, 2))
-        
-        df[f'{column}_pct_change'] = percentage_changes
-        return df
+    def calculate_percentage_changes_from_100(df: pd.DataFrame, column: str) -> pd.DataFrame:
+        """
+        Add '<column>_pct_change': 100.0 in the first row, then the change in percent against the previous row.
+
+        Changes are rounded to 2 decimals; a change against zero or NaN is NaN. The input
+        frame is not modified. time_series.py has the same transforms for many series at once.
+
+        Returns:
+        - Copy of the DataFrame with the added column.
+        """
+        values = df[column].to_numpy(dtype=float)
+        previous = np.concatenate(([np.nan], values[:-1]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes = np.where(previous != 0, (values - previous) / previous * 100, np.nan)
+        changes[:1] = 100.0
+
+        return df.assign(**{f'{column}_pct_change': np.round(changes, 2)})
 
 
 
@@ -230,277 +1541,155 @@ class ComponentsLedger:
 # print(class_inst.sum_account_data_by_month('02', 'credit'))
 
 class RatioAnalysis:
-    def __init__(self, data: pd.DataFrame, fr_component_obj: Type[object] = None):
+    def __init__(self, data: pd.DataFrame, fr_component_obj: Type[object] = None, cache: Optional[AOPCache] = None):
         self.df = data
-        self.comp_obj = fr_component_obj(data)
+        if isinstance(fr_component_obj, ComponentsFR):
+            self.comp_obj = fr_component_obj
+        else:
+            self.comp_obj = fr_component_obj(data) if cache is None else fr_component_obj(data, cache=cache)
+
+    @staticmethod
+    def _format(values: np.ndarray, as_array: bool) -> list | np.ndarray:
+        """Round to 2 decimals and list the periods from last to first, unless the raw array is requested."""
+        if as_array:
+            return values
+        return np.round(values, 2)[..., ::-1].tolist()
+
+    def ratio(self, name: str, as_array: bool = False) -> list[float] | np.ndarray:
+        """
+        Any ratio from the formula registry, including custom ones added with `FormulaRegistry.register`.
+
+        Parameters:
+        - name: Ratio name.
+        - as_array: Return the raw array (periods from first to last) instead of a rounded, reversed list.
+        """
+        return self._format(self.comp_obj.evaluate(name), as_array)
+
+    def ratio_table(self) -> pd.DataFrame:
+        """
+        Compute every registered ratio for every company and period in one evaluation plan.
+
+        Returns:
+        - DataFrame with one column per ratio, indexed by period, or by (company, period)
+          for stacked filings. Periods run from first to last and values are not rounded.
+          Turnover ratios, which need the following period, are NaN for the last period.
+        """
+        periods = self.comp_obj.periods
+        companies = self.comp_obj.companies
+        results = self.comp_obj.evaluate()
+        shape = self.comp_obj.matrix.shape[1:]
+
+        columns = {
+            name: np.broadcast_to(np.asarray(results[name], dtype=float), shape).ravel()
+            for name in self.comp_obj.registry.ratios
+        }
+
+        if companies is None:
+            index = pd.Index(periods, name='year')
+        else:
+            index = pd.MultiIndex.from_product([companies, periods], names=['company', 'year'])
+
+        return pd.DataFrame(columns, index=index)
    
-    def current_ratio(self) -> list[float]:
+    def current_ratio(self, as_array: bool = False) -> list[float]:
         """Koeficijent likvidnosti za koga važi generalno pravilo da obrtna imovina 
         treba da bude bar 2 puta veća od kratkoročnih obaveza da bi se smatralo da je 
         likvidnost dobra.
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            obrtna_imovina = self.comp_obj.obrtna_imovina(year)
-            kratkorocne_obaveze = self.comp_obj.kratkorocne_obaveze(year)
-            ratio_results.append(round(float(obrtna_imovina / kratkorocne_obaveze), 2))
-
-        ratio_results.reverse()
+        return self.ratio('current_ratio', as_array)
 
-        return ratio_results
-    
-    def quick_ratio(self) -> list[float]:
+    def quick_ratio(self, as_array: bool = False) -> list[float]:
         """Pokrivenost kratkoročno pozajmljenog kapitala gotovinom, lako unovčivim 
         hartijama od vrednosti i kratkoročnim potraživanjima. Utvrđivanje normale je 
         u korelaciji sa brzinom dospeća kratrkoročnih obaveza. Pokazatelj ne bi trebalo 
         da bude ispod 1.
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            obrtna_imovina = self.comp_obj.obrtna_imovina(year)
-            zalihe = self.comp_obj.zalihe(year)
-            kratkorocne_obaveze = self.comp_obj.kratkorocne_obaveze(year)
-
-            ratio_results.append(round(float((obrtna_imovina - zalihe) / kratkorocne_obaveze), 2))
-
-        ratio_results.reverse()
+        return self.ratio('quick_ratio', as_array)
 
-        return ratio_results
-    
-
-    def total_debt_ratio(self) -> list[float]:
-        pass
+    def total_debt_ratio(self, as_array: bool = False) -> list[float]:
         """Racio pokazuje stepen pokrivenosti obaveza ukupnom 
         imovinom
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            ukupne_obaveze = self.comp_obj.ukupne_obaveze(year)
-            ukupna_imovina = self.comp_obj.ukupna_imovina(year)
-
-            ratio_results.append(round(float(ukupne_obaveze / ukupna_imovina), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
+        return self.ratio('total_debt_ratio', as_array)
 
-    def long_term_debt_ratio(self) -> list[float]:
+    def long_term_debt_ratio(self, as_array: bool = False) -> list[float]:
         """Racio pokazuje stepen pokrivenosti dugoročnih 
         obaveza ukupnom imovinom.
         """
-        ratio_results = []
+        return self.ratio('long_term_debt_ratio', as_array)
 
-        for year in self.df.columns[2:]:
-            dugorocne_obaveze = self.comp_obj.dugorocne_obaveze(year)
-            ukupna_imovina = self.comp_obj.ukupna_imovina(year)
-
-            ratio_results.append(round(float(dugorocne_obaveze / ukupna_imovina), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def gross_profit_margin(self) -> list[float]:
+    def gross_profit_margin(self, as_array: bool = False) -> list[float]:
         # """Stopa sposobnosti prihoda da odbacuju poslovni dobitak."""
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            poslovni_dobitak = self.comp_obj.poslovni_dobitak(year)
-            prihodi_od_prodaje = self.comp_obj.prihod_od_prodaje(year)
+        return self.ratio('gross_profit_margin', as_array)
 
-            ratio_results.append(round(float(poslovni_dobitak / prihodi_od_prodaje), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def net_profit_margin(self) -> list[float]:
+    def net_profit_margin(self, as_array: bool = False) -> list[float]:
         """Racio pokazuje neto prinosnu snagu prihoda 
         od prodaje.
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            neto_dobit = self.comp_obj.neto_dobit(year)
-            prihodi_od_prodaje = prihodi_od_prodaje = self.comp_obj.prihod_od_prodaje(year)
-
-            ratio_results.append(round(float(neto_dobit / prihodi_od_prodaje), 2))
-
-        ratio_results.reverse()
+        return self.ratio('net_profit_margin', as_array)
 
-        return ratio_results
-    
-    def capitalisation_ratio(self) -> list[float]:
+    def capitalisation_ratio(self, as_array: bool = False) -> list[float]:
         """Pokazuje učešće pozajmljenog kapitala u ukupnom kapitalu. 
         Pokazatelj veći od 1, znači da se preduzeće prezaduženo. 
         Pokazatelj između 0 i 0,5 znači da se sredstva pretežno finansiraju 
         iz sopostvenih kapitala, a pokazatelj između 0,5 i 1 označava 
         povećano finansiranje iz pozajmljenog kapitala.
         """
-        ratio_results = []
+        return self.ratio('capitalisation_ratio', as_array)
 
-        for year in self.df.columns[2:]:
-            obaveze_bez_rezervisanja = self.comp_obj.obaveze_bez_rezervisanja(year)
-            measure_2 = self.comp_obj._get_aop_value('0420', year) + self.components_class_obj._get_aop_value('0431', year) + self.components_class_obj._get_aop_value('0401', year) - self.components_class_obj._get_aop_value('0403', year) - self.components_class_obj._get_aop_value('0455', year)
-            ratio_results.append(round(float(obaveze_bez_rezervisanja / measure_2), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def return_on_bussines_assets(self) -> list[float]:
+    def return_on_bussines_assets(self, as_array: bool = False) -> list[float]:
         """Stopa bruto prinosa na poslovnu imovinu 
         (bez dugoročnih i kratkoročnih plasmana)."""
+        return self.ratio('return_on_bussines_assets', as_array)
 
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            poslovna_dobit = self.comp_obj.poslovni_dobitak(year)
-            poslovna_imovina = self.comp_obj.poslovna_imovina(year)
-            ratio_results.append(round(float(poslovna_dobit / poslovna_imovina), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def return_on_assets(self) -> list[float]:
+    def return_on_assets(self, as_array: bool = False) -> list[float]:
         """Indikator profitabilnosti preduzeća u odnosu na ukupnu imovinu."""
+        return self.ratio('return_on_assets', as_array)
 
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            neto_dobit = self.comp_obj.neto_dobit(year)
-            prihodi_od_prodaje = self.comp_obj.prihod_od_prodaje(year)
-            ratio_results.append(round(float(neto_dobit / prihodi_od_prodaje), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def return_on_equity(self) -> list[float]:
+    def return_on_equity(self, as_array: bool = False) -> list[float]:
         """Mera profitabilnosti preduzeća u odnosu na sopstveni kapital."""
+        return self.ratio('return_on_equity', as_array)
 
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            neto_dobit = self.comp_obj.neto_dobit(year)
-            kapital = self.comp_obj.kapital(year)
-            ratio_results.append(round(float(neto_dobit / kapital), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def debt_to_equity(self) -> list[float]:
+    def debt_to_equity(self, as_array: bool = False) -> list[float]:
         """Pokazuje kvotu pozajmljenog kapitala u odnosu na sopstveni kapital. 
         Pokazatelj manji od 1, znači da se sredstva finansiraju sopstvenim kapitalom, 
         a pokazatelj iznad 1, označava povećano finansiranje iz pozajmljenog kapitala.
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            measure_1 = self.comp_obj._get_aop_value('0420', year) + self.comp_obj._get_aop_value('0431', year)
-            measure_2 = self.comp_obj._get_aop_value('0401', year) - self.comp_obj._get_aop_value('0403', year)  + self.comp_obj._get_aop_value('0455', year)
-            ratio_results.append(round(float(measure_1 / measure_2), 2))
-
-        ratio_results.reverse()
+        return self.ratio('debt_to_equity', as_array)
 
-        return ratio_results
-
-    def long_term_financial_stability(self) -> list[float]:
+    def long_term_financial_stability(self, as_array: bool = False) -> list[float]:
         """Pokazuje pokrivenost dugoročno vezane imovine 
         dugoronim izvorima, što je pokazatelj udaljeniji 
         od "1" prema "0", pokazatelj je bolji.
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            measure_1 = self.comp_obj._get_aop_value('0002', year) + self.comp_obj._get_aop_value('0031', year)
-            measure_2 = self.comp_obj._get_aop_value('0401', year) - self.comp_obj._get_aop_value('0403', year) - self.comp_obj._get_aop_value('0455', year) + self.comp_obj._get_aop_value('0415', year)
-
-            ratio_results.append(round(float(measure_1 / measure_2), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def EBITDA_margin(self) -> list[float]:
+        return self.ratio('long_term_financial_stability', as_array)
 
-        ratio_results = []
+    def EBITDA_margin(self, as_array: bool = False) -> list[float]:
+        return self.ratio('EBITDA_margin', as_array)
 
-        for year in self.df.columns[2:]:
-            ebitda = self.comp_obj.ebitda(year)        
-            prihodi_od_prodaje = prihodi_od_prodaje = self.comp_obj.prihod_od_prodaje(year)
-
-            ratio_results.append(round(float(ebitda / prihodi_od_prodaje), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def broj_zaposlenih(self) -> list[int]:
+    def broj_zaposlenih(self, as_array: bool = False) -> list[int]:
         """Mera sposobnosti preduzeća da ostvaruje
         dobitak iz poslovnih aktivnosti.
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:]:
-            broj_zaposlenih = self.comp_obj.broj_zaposlenih(year)
-
-            ratio_results.append(round(int(broj_zaposlenih), 2))
+        return self.ratio('broj_zaposlenih', as_array)
 
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def inventory_turnover(self) -> list[float]:
+    def inventory_turnover(self, as_array: bool = False) -> list[float]:
         """Pokazuje koliko puta se obrnu ukupne zalihe u toku godine - efikasnost 
         ukupnih zaliha.
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:-2]:
-            prihod_od_prodaje = self.comp_obj.prihod_od_prodaje(year)
-            prosecne_zalihe = self.comp_obj.prosecne_zalihe(year)
-            ratio_results.append(round(float(prihod_od_prodaje/prosecne_zalihe), 2))
+        return self._format(self.comp_obj.evaluate('inventory_turnover')[..., :-2], as_array)
 
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def goods_turnover(self) -> list[float]:
+    def goods_turnover(self, as_array: bool = False) -> list[float]:
         """Pokazuje koliko puta se obrnu zalihe robe u toku godine  - efikasnost 
         zalihama robe. Dani vezivanja = 365/KO. 
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:-2]:
-            nabavna_vrednost_prodate_robe = self.comp_obj.nabavna_vrednost_prodate_robe(year)
-            prosecne_zalihe_robe = self.comp_obj.prosecne_zalihe_robe(year)
-            ratio_results.append(round(float(nabavna_vrednost_prodate_robe/prosecne_zalihe_robe), 2))
+        return self._format(self.comp_obj.evaluate('goods_turnover')[..., :-2], as_array)
 
-        ratio_results.reverse()
-
-        return ratio_results
-
-    def account_receivable_turnover(self) -> list[float]:
+    def account_receivable_turnover(self, as_array: bool = False) -> list[float]:
         """Obrt - efikasnost imovine u potraživanja od kupaca. Dani 
         vezivanja = 365/KO. 
         """
-        ratio_results = []
-
-        for year in self.df.columns[2:-2]:
-            prodaja = self.comp_obj.prodaja(year)
-            prosecni_kupci = self.comp_obj.prosecni_kupci(year)
-            ratio_results.append(round(float(prodaja/prosecni_kupci), 2))
-
-        ratio_results.reverse()
-
-        return ratio_results
+        return self._format(self.comp_obj.evaluate('account_receivable_turnover')[..., :-2], as_array)
 
 
 # df_fr = pd.read_parquet(r"data\parquet\financial_reports.parquet")
@@ -0,0 +1,188 @@
+import functools
+import glob
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Callable, Literal, Optional
+
+import pandas as pd
+
+from components import FORMULA_REGISTRY, ComponentsFR, RatioAnalysis
+from journal import JournalDataset
+
+
+# Bump when a cached computation changes its output without a change to the modules below.
+CACHE_VERSION = 1
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """`CACHE_VERSION` and a hash of the source of the modules computing cached results, once per process."""
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for module in (inspect.getmodule(ComponentsFR), inspect.getmodule(JournalDataset), sys.modules[__name__]):
+        digest.update(inspect.getsource(module).encode())
+    return f"{CACHE_VERSION}-{digest.hexdigest()[:16]}"
+
+
+class ComputationCache:
+    def __init__(self, directory: str = "data/cache") -> None:
+        """
+        Persistent cache of computed tables, keyed by the content hash of the input files, the
+        parameters, the formula registry and the code that computes them.
+
+        Each result is stored as `<directory>/<key>.parquet`. An SQLite index in the same
+        directory remembers file hashes by (path, size, mtime), so unchanged inputs are
+        not re-read to be hashed, and lists the cached entries. Changing an input file,
+        registering a formula on `FORMULA_REGISTRY` or editing the computing modules
+        changes the key, so stale results are never returned.
+
+        Parameters:
+        - directory: Cache directory, created if missing. Default is 'data/cache'.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite"))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS file_hashes (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, name TEXT, inputs TEXT, params TEXT, created REAL)")
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self) -> "ComputationCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def file_hash(self, path: str) -> str:
+        """SHA-256 of a file's content, reused while its size and modification time are unchanged."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT size, mtime_ns, hash FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, digest.hexdigest()),
+        )
+        self.conn.commit()
+        return digest.hexdigest()
+
+    def key(self, name: str, inputs: list, params: dict) -> str:
+        """Cache key of a computation: its name, the hashes of its input files, its parameters, the registry and the code version."""
+        payload = json.dumps({
+            'name': name, 'inputs': sorted(self.file_hash(path) for path in inputs), 'params': params,
+            'registry': FORMULA_REGISTRY.fingerprint(), 'code': code_version(),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_or_compute(self, name: str, inputs: list, compute: Callable[[], pd.DataFrame], **params) -> pd.DataFrame:
+        """
+        Return the cached table for these inputs and parameters, or compute and store it.
+
+        Parameters:
+        - name: Name of the computation, part of the key.
+        - inputs: Paths of the files the computation reads.
+        - compute: Function returning the DataFrame when it is not cached.
+        - params: Parameters of the computation, part of the key (must be JSON-serializable).
+
+        Returns:
+        - The computed or cached DataFrame.
+        """
+        key = self.key(name, inputs, params)
+        path = os.path.join(self.directory, f"{key}.parquet")
+
+        if os.path.exists(path):
+            self.hits += 1
+            return pd.read_parquet(path)
+
+        self.misses += 1
+        result = compute()
+
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        result.to_parquet(temporary_path)
+        os.replace(temporary_path, path)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (key, name, json.dumps([os.path.abspath(path) for path in inputs]), json.dumps(params, sort_keys=True, default=str), time.time()),
+        )
+        self.conn.commit()
+        return result
+
+    def clear(self) -> None:
+        """Delete every cached result (file hashes are kept)."""
+        for (key,) in self.conn.execute("SELECT key FROM entries").fetchall():
+            path = os.path.join(self.directory, f"{key}.parquet")
+            if os.path.exists(path):
+                os.remove(path)
+        self.conn.execute("DELETE FROM entries")
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def ratio_table(self, report_path: str) -> pd.DataFrame:
+        """`RatioAnalysis.ratio_table` of a report Parquet file (wide or stacked), cached by the file's content."""
+        def compute() -> pd.DataFrame:
+            return RatioAnalysis(pd.read_parquet(report_path), ComponentsFR).ratio_table()
+
+        return self.get_or_compute('ratio_table', [report_path], compute)
+
+    def ledger_aggregate(self, journal_paths: str | list, account: str | list,
+                         by: Literal['year', 'month', 'week'] = 'month', debit_or_credit: str = 'all',
+                         exclude_opening_entries: bool = True, exclude_accounts: tuple = ('599', '699', '7')) -> pd.DataFrame:
+        """
+        `ComponentsLedger.sum_account_data_by_period` over journal files, cached per file.
+
+        Every file is aggregated and cached on its own, so when a new yearly journal is
+        added, or one year is corrected, only that file is recomputed. Journal rows are
+        filtered as in `JournalDataset`.
+
+        Parameters:
+        - journal_paths: A glob pattern, a path or a list of paths to journal Parquet files.
+        - account, by, debit_or_credit: As in `ComponentsLedger.sum_account_data_by_period`.
+        - exclude_opening_entries, exclude_accounts: As in `JournalDataset`.
+
+        Returns:
+        - DataFrame with 'year', the period column (unless by='year') and the summed columns.
+        """
+        patterns = [journal_paths] if isinstance(journal_paths, str) else list(journal_paths)
+        files = sorted(file for pattern in patterns for file in glob.glob(pattern, recursive=True))
+        if not files:
+            raise ValueError(f"No journal files found for {journal_paths}.")
+
+        params = {
+            'account': account, 'by': by, 'debit_or_credit': debit_or_credit,
+            'exclude_opening_entries': exclude_opening_entries, 'exclude_accounts': list(exclude_accounts),
+        }
+
+        def compute(file: str) -> Callable[[], pd.DataFrame]:
+            def aggregate() -> pd.DataFrame:
+                dataset = JournalDataset(file, exclude_opening_entries, exclude_accounts)
+                return dataset.ledger(account=account).sum_account_data_by_period(account, by, debit_or_credit)
+            return aggregate
+
+        parts = [self.get_or_compute('ledger_aggregate', [file], compute(file), **params) for file in files]
+
+        group_by = ['year'] if by == 'year' else ['year', by]
+        return pd.concat(parts, ignore_index=True).groupby(group_by, as_index=False).sum()
+
+
+# USAGE
+# with ComputationCache("data/cache") as cache:
+#     ratios = cache.ratio_table("data/parquet/financial_reports.parquet")
+#     monthly = cache.ledger_aggregate("data/parquet/financial_journal_*.parquet", ['13', '24'], 'month')
+#     print(cache.hits, cache.misses)
@@ -0,0 +1,250 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+_ACTIVE_PROFILER = None
+
+# Methods that resolve an index to row positions: the rows they return are the rows the calling methods touch.
+INDEXED_LOOKUPS = ('ComponentsLedger._positions',)
+
+
+def default_targets() -> list:
+    """Classes instrumented by `Profiler` when no targets are given."""
+    from components import ComponentsFR, ComponentsLedger, RatioAnalysis
+    from journal import JournalDataset
+    from utilities import ResultsStore, Utilities
+    from visualization import FinancialDataVisualization
+    from visualization_eng import FinancialDataVisualization as FinancialDataVisualizationEng
+
+    return [ComponentsFR, ComponentsLedger, RatioAnalysis, Utilities, ResultsStore, JournalDataset,
+            FinancialDataVisualization, FinancialDataVisualizationEng]
+
+
+def _rows(obj: Any) -> Optional[int]:
+    if isinstance(obj, (pd.DataFrame, pd.Series)) or (isinstance(obj, np.ndarray) and obj.ndim > 0):
+        return len(obj)
+    return None
+
+
+def _input_rows(args: tuple) -> Optional[int]:
+    """Rows of the frame a call works on: the instance's `data`/`df`, else the first DataFrame argument."""
+    if args:
+        for attribute in ('data', 'df'):
+            rows = _rows(getattr(args[0], attribute, None))
+            if rows is not None:
+                return rows
+    for arg in args:
+        rows = _rows(arg)
+        if rows is not None:
+            return rows
+    return None
+
+
+def _cache_lookup(name: str, args: tuple, kwargs: dict) -> Optional[bool]:
+    """Whether a ComponentsFR lookup is served from its AOPCache (None when the call does not use one)."""
+    instance = args[0] if args else None
+    if not hasattr(instance, '_cache_key'):
+        return None
+    if name.endswith('._get_aop_value'):
+        year = args[2] if len(args) > 2 else kwargs.get('year')
+        return None if year is None else instance._cache_key(args[1], year) in instance.cache
+    if name.endswith('.evaluate'):
+        return instance._cache_key('evaluate', instance.registry.compile()) in instance.cache
+    return None
+
+
+class Profiler:
+    def __init__(self, targets: Optional[list] = None) -> None:
+        """
+        Opt-in profiler for call counts, errors, wall time, rows and cache hit rates per method.
+
+        While active (`with Profiler() as profiler:`), the methods of the target classes
+        are wrapped; on exit the original methods are restored. When no profiler is
+        active nothing is wrapped, so instrumentation costs nothing.
+
+        'rows_in' counts the rows a call touches: the rows its index lookups resolved to
+        (see INDEXED_LOOKUPS), else the rows of the instance's frame or of its first
+        DataFrame argument. Calls that raise are recorded too, and counted in 'errors'.
+        Classes with the same name in different modules are labelled with their module.
+
+        Parameters:
+        - targets: Classes to instrument. Default is `default_targets()`.
+        """
+        self.targets = targets
+        self.stats = {}
+        self._originals = []
+        self._calls = threading.local()
+
+    def __enter__(self) -> "Profiler":
+        global _ACTIVE_PROFILER
+        if _ACTIVE_PROFILER is not None:
+            raise RuntimeError("Another Profiler is already active.")
+        _ACTIVE_PROFILER = self
+
+        targets = self.targets if self.targets is not None else default_targets()
+        names = [cls.__name__ for cls in targets]
+        for cls in targets:
+            self._instrument(cls, cls.__name__ if names.count(cls.__name__) == 1 else f"{cls.__module__}.{cls.__name__}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        global _ACTIVE_PROFILER
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals.clear()
+        _ACTIVE_PROFILER = None
+
+    def _instrument(self, cls: type, label: str) -> None:
+        for name, attribute in list(vars(cls).items()):
+            if name.startswith('__'):
+                continue
+
+            if isinstance(attribute, staticmethod):
+                wrapped = staticmethod(self._wrap(attribute.__func__, f"{label}.{name}"))
+            elif isinstance(attribute, classmethod):
+                wrapped = classmethod(self._wrap(attribute.__func__, f"{label}.{name}"))
+            elif callable(attribute):
+                wrapped = self._wrap(attribute, f"{label}.{name}")
+            else:
+                continue
+
+            self._originals.append((cls, name, attribute))
+            setattr(cls, name, wrapped)
+
+    def _wrap(self, func: Callable, name: str) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_hit = _cache_lookup(name, args, kwargs)
+            stack = self._call_stack()
+            stack.append(None)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                touched = stack.pop()
+                self.record(name, time.perf_counter() - start, _input_rows(args) if touched is None else touched,
+                            cache_hit=cache_hit, error=True)
+                raise
+
+            seconds = time.perf_counter() - start
+            touched = stack.pop()
+            if name in INDEXED_LOOKUPS:
+                touched = _rows(result)
+            if touched is not None and stack:
+                stack[-1] = (stack[-1] or 0) + touched
+            self.record(name, seconds, _input_rows(args) if touched is None else touched, _rows(result), cache_hit)
+            return result
+        return wrapper
+
+    def _call_stack(self) -> list:
+        """Rows touched by index lookups in each instrumented call in progress on this thread (None for none)."""
+        if not hasattr(self._calls, 'stack'):
+            self._calls.stack = []
+        return self._calls.stack
+
+    def record(self, name: str, seconds: float, rows_in: Optional[int] = None, rows_out: Optional[int] = None,
+               cache_hit: Optional[bool] = None, error: bool = False) -> None:
+        stat = self.stats.setdefault(name, {
+            'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+            'rows_in': 0, 'rows_out': 0, 'cache_hits': 0, 'cache_misses': 0,
+        })
+        stat['calls'] += 1
+        stat['errors'] += int(error)
+        stat['total_seconds'] += seconds
+        stat['max_seconds'] = max(stat['max_seconds'], seconds)
+        stat['rows_in'] += rows_in or 0
+        stat['rows_out'] += rows_out or 0
+        if cache_hit is True:
+            stat['cache_hits'] += 1
+        elif cache_hit is False:
+            stat['cache_misses'] += 1
+
+    @contextmanager
+    def section(self, name: str, rows: Optional[int] = None):
+        """Time an arbitrary block, e.g. a parquet read or a chart, under `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record(name, time.perf_counter() - start, rows_in=rows, error=True)
+            raise
+        self.record(name, time.perf_counter() - start, rows_in=rows)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Flat table of the recorded statistics, one row per method, slowest first.
+
+        Times are inclusive: a method's time contains the instrumented methods it calls.
+        """
+        columns = ['name', 'calls', 'errors', 'total_seconds', 'mean_seconds', 'max_seconds',
+                   'rows_in', 'rows_out', 'cache_hits', 'cache_misses', 'cache_hit_rate']
+        records = []
+        for name, stat in self.stats.items():
+            lookups = stat['cache_hits'] + stat['cache_misses']
+            records.append({
+                'name': name,
+                **stat,
+                'mean_seconds': stat['total_seconds'] / stat['calls'],
+                'cache_hit_rate': stat['cache_hits'] / lookups if lookups else None,
+            })
+        return pd.DataFrame(records, columns=columns).sort_values('total_seconds', ascending=False, ignore_index=True)
+
+    def to_json(self, path: Optional[str] = None, run_id: Optional[str] = None) -> str:
+        """
+        Export the statistics as JSON records, optionally tagged with a run id so runs can be aggregated.
+
+        Missing and non-finite values (e.g. the hit rate of a method without cache lookups) are written as null.
+
+        Returns:
+        - The JSON text, also written to `path` if given.
+        """
+        frame = self.to_frame().assign(run_id=run_id).astype(object)
+        finite = frame.map(lambda value: not isinstance(value, float) or np.isfinite(value))
+        records = frame.where(frame.notna() & finite, None).to_dict(orient='records')
+        text = json.dumps(records, indent=4, allow_nan=False)
+
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text)
+        return text
+
+
+def profile(name: Optional[str] = None) -> Callable:
+    """
+    Decorator recording calls of any function in the active profiler.
+
+    Without an active profiler the wrapper only checks a module global before calling the function.
+    """
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _ACTIVE_PROFILER is None:
+                return func(*args, **kwargs)
+            profiler = _ACTIVE_PROFILER
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                profiler.record(label, time.perf_counter() - start, _input_rows(args), error=True)
+                raise
+            profiler.record(label, time.perf_counter() - start, _input_rows(args), _rows(result))
+            return result
+        return wrapper
+    return decorator
+
+
+# USAGE
+# with Profiler() as profiler:
+#     with profiler.section("read_parquet"):
+#         df_fr = pd.read_parquet("data/parquet/financial_reports.parquet")
+#     RatioAnalysis(df_fr, ComponentsFR).ratio_table()
+# print(profiler.to_frame())
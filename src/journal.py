@@ -0,0 +1,219 @@
+import glob
+import os
+import re
+from typing import Optional
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from components import ComponentsLedger
+from journal_validator import JournalValidator
+
+
+JOURNAL_COLUMNS = ('date', 'account', 'debit', 'credit')
+
+# Journals converted with read_csv_auto keep dates as 'M/D/YYYY' or ISO strings, typed journals store DATE.
+# The expression is only used for text dates: on typed files the filters compare the raw column,
+# so DuckDB can prune row groups by their statistics.
+DATE_EXPRESSION = "COALESCE(TRY_CAST(date AS DATE), CAST(TRY_STRPTIME(CAST(date AS VARCHAR), '%m/%d/%Y') AS DATE))"
+DATE_TYPES = {'timestamp': 'TIMESTAMP', 'date': 'DATE'}
+
+
+class JournalDataset:
+    def __init__(self, paths: str | list = "data/parquet/financial_journal_*.parquet",
+                 exclude_opening_entries: bool = True, exclude_accounts: tuple = ('599', '699', '7')) -> None:
+        """
+        Lazy view over the yearly journal Parquet files.
+
+        Nothing is read at construction. Every query is one DuckDB scan over the
+        files that can contain matching rows, with the filters and the column
+        selection pushed into the Parquet reader.
+
+        Parameters:
+        - paths: A glob pattern, a path or a list of paths to journal Parquet files, e.g. a
+          year-partitioned directory as 'data/journal/**/*.parquet'.
+        - exclude_opening_entries: Drop January 1st opening entries. Default is True.
+        - exclude_accounts: Account prefixes always excluded (closing entries 599/699 and class 7 by default).
+        """
+        patterns = [paths] if isinstance(paths, str) else list(paths)
+        self.files = sorted(file for pattern in patterns for file in glob.glob(pattern, recursive=True))
+        if not self.files:
+            raise ValueError(f"No journal files found for {paths}.")
+
+        self.file_years = {file: self._year_from_path(file) for file in self.files}
+        self.file_date_types = {}
+        self.exclude_opening_entries = exclude_opening_entries
+        self.exclude_accounts = tuple(exclude_accounts)
+        self.connection = duckdb.connect()
+
+    @staticmethod
+    def _year_from_path(file: str) -> Optional[int]:
+        """Year of a file from a 'year=YYYY' partition directory or from its name."""
+        match = re.search(r'year=(\d{4})', file.replace('\\', '/')) or re.search(r'(\d{4})', os.path.basename(file))
+        return int(match.group(1)) if match else None
+
+    def _select_files(self, years: Optional[list]) -> list:
+        """Skip files whose name shows a year outside the requested ones."""
+        if years is None:
+            return self.files
+        return [file for file in self.files if self.file_years[file] is None or self.file_years[file] in years]
+
+    def _date_type(self, file: str) -> Optional[str]:
+        """SQL type of a file's stored 'date' column ('TIMESTAMP' or 'DATE'), None for text dates; read from the footer only."""
+        if file not in self.file_date_types:
+            date_type = pq.read_schema(file).field('date').type
+            if pa.types.is_timestamp(date_type) and date_type.tz is None:
+                self.file_date_types[file] = DATE_TYPES['timestamp']
+            elif pa.types.is_date(date_type):
+                self.file_date_types[file] = DATE_TYPES['date']
+            else:
+                self.file_date_types[file] = None
+        return self.file_date_types[file]
+
+    @staticmethod
+    def _date_conditions(date_type: Optional[str], years: Optional[list], start_date: Optional[str],
+                         end_date: Optional[str]) -> tuple[list, list]:
+        """
+        Date filters as half-open ranges on the raw column of typed files, or on the parsed text dates.
+
+        Ranges compare the stored column with constants of its own type, which DuckDB
+        pushes into the Parquet scan to skip row groups outside them.
+        """
+        date, cast = ('date', date_type) if date_type is not None else (DATE_EXPRESSION, 'DATE')
+        conditions, params = [], []
+
+        if years is not None:
+            ranges = [f"({date} >= CAST(? AS {cast}) AND {date} < CAST(? AS {cast}))" for _ in years]
+            conditions.append(f"({' OR '.join(ranges)})")
+            for year in years:
+                params.extend([f"{int(year)}-01-01", f"{int(year) + 1}-01-01"])
+        if start_date is not None:
+            conditions.append(f"{date} >= CAST(? AS {cast})")
+            params.append(str(pd.Timestamp(start_date).date()))
+        if end_date is not None:
+            conditions.append(f"{date} < CAST(? AS {cast})")
+            params.append(str((pd.Timestamp(end_date) + pd.Timedelta(days=1)).date()))
+        return conditions, params
+
+    def _build_query(self, columns: Optional[list], years: Optional[list], start_date: Optional[str],
+                     end_date: Optional[str], account: Optional[str | list]) -> tuple[str, list]:
+        columns = list(JOURNAL_COLUMNS) if columns is None else columns
+        unknown = [column for column in columns if column not in JOURNAL_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown journal columns: {unknown}. Use {list(JOURNAL_COLUMNS)}.")
+
+        groups = {}
+        for file in self._select_files(years):
+            groups.setdefault(self._date_type(file), []).append(file)
+
+        queries, params = [], []
+        for date_type, files in groups.items():
+            date = 'date' if date_type is not None else DATE_EXPRESSION
+            select = [f"CAST({date} AS DATE) AS date" if column == 'date' else column for column in columns]
+            conditions, group_params = self._date_conditions(date_type, years, start_date, end_date)
+
+            if self.exclude_opening_entries:
+                conditions.append(f"NOT (month({date}) = 1 AND day({date}) = 1)")
+            if self.exclude_accounts:
+                conditions.append(f"NOT ({' OR '.join('starts_with(account, ?)' for _ in self.exclude_accounts)})")
+                group_params.extend(self.exclude_accounts)
+            if account is not None:
+                prefixes = [account] if isinstance(account, str) else list(account)
+                conditions.append(f"({' OR '.join('starts_with(account, ?)' for _ in prefixes)})")
+                group_params.extend(prefixes)
+
+            query = f"SELECT {', '.join(select)} FROM read_parquet(?)"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            queries.append(query)
+            params.extend([files, *group_params])
+
+        return " UNION ALL ".join(queries), params
+
+    def query(self, columns: Optional[list] = None, years: Optional[list] = None, start_date: Optional[str] = None,
+              end_date: Optional[str] = None, account: Optional[str | list] = None) -> pd.DataFrame:
+        """
+        Materialize only the journal rows and columns matching the filters.
+
+        Parameters:
+        - columns: Journal columns to read. Default is all of 'date', 'account', 'debit', 'credit'.
+        - years: Calendar years to keep. Files named for other years are not opened.
+        - start_date: First date to keep (inclusive).
+        - end_date: Last date to keep (inclusive).
+        - account: A string or list of account prefixes to keep.
+
+        Returns:
+        - DataFrame with the selected columns; 'date' is parsed to datetime.
+        """
+        if years is not None and not self._select_files(years):
+            return pd.DataFrame(columns=list(JOURNAL_COLUMNS) if columns is None else columns)
+
+        query, params = self._build_query(columns, years, start_date, end_date, account)
+        df = self.connection.execute(query, params).df()
+
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+
+        return df
+
+    def count(self, years: Optional[list] = None, start_date: Optional[str] = None,
+              end_date: Optional[str] = None, account: Optional[str | list] = None) -> int:
+        """Number of journal rows matching the filters, without materializing them."""
+        if years is not None and not self._select_files(years):
+            return 0
+
+        query, params = self._build_query(['account'], years, start_date, end_date, account)
+        return self.connection.execute(f"SELECT count(*) FROM ({query})", params).fetchone()[0]
+
+    def ledger(self, years: Optional[list] = None, start_date: Optional[str] = None,
+               end_date: Optional[str] = None, account: Optional[str | list] = None,
+               build_cube: bool = False, compact: bool = False) -> ComponentsLedger:
+        """
+        ComponentsLedger over the rows matching the filters only.
+
+        Parameters:
+        - build_cube, compact: As in `ComponentsLedger`.
+
+        Returns:
+        - ComponentsLedger whose data holds the filtered journal with a reset index.
+        """
+        df = self.query(years=years, start_date=start_date, end_date=end_date, account=account)
+        return ComponentsLedger(df.reset_index(drop=True), build_cube=build_cube, compact=compact)
+
+    def write_arrow_cache(self, path: str, years: Optional[list] = None, start_date: Optional[str] = None,
+                          end_date: Optional[str] = None, account: Optional[str | list] = None,
+                          compact: bool = True) -> str:
+        """
+        Decode the matching journal rows once into an Arrow IPC file for `ComponentsLedger.open_arrow`.
+
+        Returns:
+        - The path written.
+        """
+        ledger = self.ledger(years=years, start_date=start_date, end_date=end_date, account=account, compact=compact)
+        return ledger.save_arrow(path)
+
+    def validate(self, **kwargs) -> dict[str, pd.DataFrame]:
+        """
+        Double-entry and trial-balance check of the files, streamed by `JournalValidator`.
+
+        The files are checked as stored, including the opening entries and accounts
+        that queries exclude, since those are part of the balance.
+
+        Parameters:
+        - kwargs: Passed to `JournalValidator`.
+
+        Returns:
+        - The validator's result.
+        """
+        return JournalValidator(**kwargs).validate(self.files)
+
+
+# USAGE
+# dataset = JournalDataset("data/parquet/financial_journal_*.parquet")
+# ledger = dataset.ledger(years=[2023], account=['13', '24', '200', '201', '204', '205'])
+# print(ledger.sum_account_data_by_period('13', 'week', year=2023))
+# print(dataset.validate()['summary'].T)
+# dataset.write_arrow_cache("data/journal.arrow")
+# ledger = ComponentsLedger.open_arrow("data/journal.arrow", build_cube=True)
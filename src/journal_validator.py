@@ -0,0 +1,287 @@
+import glob
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+
+ACCOUNT_PATTERN = r'^\d{3,6}(-[0-9A-Za-z]+( [0-9A-Za-z]+)*)?$'
+NO_DATE = np.iinfo(np.int64).min
+ISSUES = ('missing_values', 'invalid_date', 'negative_amount', 'debit_and_credit', 'invalid_account')
+
+
+class JournalValidator:
+    def __init__(self, batch_size: int = 1 << 20, tolerance: float = 0.0, max_examples: int = 10,
+                 class_depth: int = 1, amount_scale: Optional[int] = None) -> None:
+        """
+        Streaming double-entry check and trial balance of journals, with bounded memory.
+
+        Record batches are validated one at a time; only per-day totals, per-class
+        totals, issue counts and a few example rows are kept. Amounts are summed as
+        whole cents, so balances are exact. Account checks run on the dictionary of
+        each batch (a few thousand distinct accounts) and are mapped to the rows by
+        their indices, so the per-row work is integer arithmetic only.
+
+        Parameters:
+        - batch_size: Rows per record batch read from Parquet. Default is 1M.
+        - tolerance: Allowed |debit - credit| per day, period and in total. Default is 0.
+        - max_examples: Example rows kept per issue. Default is 10.
+        - class_depth: Account digits grouping the trial balance (1 = account class). Default is 1.
+        - amount_scale: Amount units per currency unit of the input, e.g. 100 for cents. Default
+          is taken from the schema of each batch: 100 for the compact layout of
+          `ComponentsLedger.compact_journal` (int64 amounts, date32 dates), otherwise 1.
+        """
+        self.batch_size = batch_size
+        self.tolerance = tolerance
+        self.max_examples = max_examples
+        self.class_depth = class_depth
+        self.amount_scale = amount_scale
+        self.reset()
+
+    def reset(self) -> None:
+        self.rows = 0
+        self.sources = []
+        self.origin = None
+        self.day_debit = np.zeros(0)
+        self.day_credit = np.zeros(0)
+        self.day_rows = np.zeros(0, dtype=np.int64)
+        self.undated = [0.0, 0.0, 0]
+        self.classes = {}
+        self.issue_counts = dict.fromkeys(ISSUES, 0)
+        self.examples = []
+        self.seconds = 0.0
+
+    def _scale(self, schema: pa.Schema) -> int:
+        """Amount units per currency unit: `amount_scale`, or 100 for the compact journal layout and 1 otherwise."""
+        if self.amount_scale is not None:
+            return self.amount_scale
+        compact = (
+            all(pa.types.is_integer(schema.field(column).type) for column in ('debit', 'credit'))
+            and pa.types.is_date32(schema.field('date').type)
+        )
+        return 100 if compact else 1
+
+    @staticmethod
+    def _cents(amounts: pa.Array, scale: int) -> np.ndarray:
+        """Amounts as whole cents, from `scale` units per currency unit; missing amounts are 0."""
+        return np.rint(amounts.fill_null(0).to_numpy().astype(np.float64) * (100 / scale))
+
+    @staticmethod
+    def _days(dates: pa.Array) -> np.ndarray:
+        """
+        Dates as days since 1970, `NO_DATE` where missing or unparseable.
+
+        Text dates (e.g. '6/30/2019' in older exports) are parsed once per distinct value.
+        """
+        if pa.types.is_string(dates.type) or pa.types.is_large_string(dates.type) or pa.types.is_dictionary(dates.type):
+            encoded = dates if pa.types.is_dictionary(dates.type) else pc.dictionary_encode(dates)
+            parsed = pd.to_datetime(encoded.dictionary.to_pandas(), errors='coerce', format='mixed')
+            dictionary_days = ((parsed - pd.Timestamp(0)) // pd.Timedelta(days=1)).fillna(NO_DATE).to_numpy(dtype=np.int64)
+            days = np.append(dictionary_days, NO_DATE)[encoded.indices.fill_null(len(dictionary_days)).to_numpy()]
+        else:
+            days = dates.cast(pa.date32()).cast(pa.int32()).cast(pa.int64()).fill_null(NO_DATE).to_numpy()
+        return days
+
+    def _add_days(self, days: np.ndarray, debit: np.ndarray, credit: np.ndarray) -> None:
+        """Add per-day totals, growing the day range (days since 1970) when a batch falls outside it."""
+        first, last = int(days.min()), int(days.max())
+        if self.origin is None:
+            self.origin = first
+        if first < self.origin or last - self.origin >= len(self.day_rows):
+            start = min(first, self.origin)
+            length = max(last, self.origin + len(self.day_rows) - 1) - start + 1
+            shift = self.origin - start
+            for name in ('day_debit', 'day_credit', 'day_rows'):
+                grown = np.zeros(length, dtype=getattr(self, name).dtype)
+                grown[shift:shift + len(getattr(self, name))] = getattr(self, name)
+                setattr(self, name, grown)
+            self.origin = start
+
+        positions = days - self.origin
+        length = len(self.day_rows)
+        self.day_debit += np.bincount(positions, weights=debit, minlength=length)
+        self.day_credit += np.bincount(positions, weights=credit, minlength=length)
+        self.day_rows += np.bincount(positions, minlength=length)
+
+    def _add_classes(self, accounts: pa.DictionaryArray, valid: np.ndarray, account_rows: np.ndarray,
+                     debit: np.ndarray, credit: np.ndarray) -> None:
+        """Add per-class totals; `account_rows` are the dictionary indices, `len(dictionary)` for rows without an account."""
+        prefixes = pc.utf8_slice_codeunits(accounts.dictionary, 0, self.class_depth).to_numpy(zero_copy_only=False)
+        prefixes = np.append(np.where(valid, prefixes, 'invalid'), 'missing')
+        class_codes, classes = pd.factorize(prefixes)
+
+        rows = class_codes[account_rows]
+        totals = [np.bincount(rows, weights=weights, minlength=len(classes)) for weights in (debit, credit)]
+        counts = np.bincount(rows, minlength=len(classes))
+
+        for i in np.flatnonzero(counts):
+            entry = self.classes.setdefault(classes[i], [0.0, 0.0, 0])
+            entry[0] += totals[0][i]
+            entry[1] += totals[1][i]
+            entry[2] += counts[i]
+
+    def _flag(self, issue: str, mask: np.ndarray, batch: pa.RecordBatch, source: str, offset: int) -> None:
+        count = int(mask.sum())
+        if count == 0:
+            return
+        self.issue_counts[issue] += count
+
+        kept = sum(example['issue'] == issue for example in self.examples)
+        if kept < self.max_examples:
+            positions = np.flatnonzero(mask)[:self.max_examples - kept]
+            sample = batch.take(pa.array(positions)).to_pandas()
+            sample['account'] = sample['account'].astype(str)
+            for position, row in zip(positions, sample.to_dict(orient='records')):
+                self.examples.append({'issue': issue, 'source': source, 'row': offset + int(position), **row})
+
+    def update(self, batch: pa.RecordBatch, source: str = '', offset: int = 0) -> None:
+        """
+        Validate one record batch with the columns 'date', 'account', 'debit' and 'credit'.
+
+        Parameters:
+        - batch: Arrow record batch.
+        - source: Name reported with example rows, e.g. the file path.
+        - offset: Row number of the batch's first row in its source.
+        """
+        start = time.perf_counter()
+        if len(batch) == 0:
+            return
+
+        accounts = batch.column('account')
+        if not pa.types.is_dictionary(accounts.type):
+            accounts = pc.dictionary_encode(accounts)
+        valid_accounts = pc.match_substring_regex(accounts.dictionary.cast(pa.string()), ACCOUNT_PATTERN).to_numpy(zero_copy_only=False)
+        account_rows = accounts.indices.fill_null(len(accounts.dictionary)).to_numpy()
+
+        dates = batch.column('date')
+        missing = (
+            dates.is_null().to_numpy(zero_copy_only=False) | accounts.is_null().to_numpy(zero_copy_only=False)
+            | batch.column('debit').is_null().to_numpy(zero_copy_only=False)
+            | batch.column('credit').is_null().to_numpy(zero_copy_only=False)
+        )
+        scale = self._scale(batch.schema)
+        debit = self._cents(batch.column('debit'), scale)
+        credit = self._cents(batch.column('credit'), scale)
+        days = self._days(dates)
+        dated = days != NO_DATE
+
+        self._flag('missing_values', missing, batch, source, offset)
+        self._flag('invalid_date', ~dated & ~missing, batch, source, offset)
+        self._flag('negative_amount', (debit < 0) | (credit < 0), batch, source, offset)
+        self._flag('debit_and_credit', (debit != 0) & (credit != 0), batch, source, offset)
+        self._flag('invalid_account', ~np.append(valid_accounts, True)[account_rows] & ~missing, batch, source, offset)
+
+        if dated.any():
+            self._add_days(days[dated], debit[dated], credit[dated])
+        if not dated.all():
+            self.undated[0] += debit[~dated].sum()
+            self.undated[1] += credit[~dated].sum()
+            self.undated[2] += int((~dated).sum())
+        self._add_classes(accounts, valid_accounts, account_rows, debit, credit)
+
+        self.rows += len(batch)
+        self.seconds += time.perf_counter() - start
+
+    def validate(self, paths: str | list = "data/parquet/financial_journal_*.parquet") -> dict[str, pd.DataFrame]:
+        """
+        Validate journal Parquet files batch by batch.
+
+        Parameters:
+        - paths: A glob pattern, a path or a list of paths.
+
+        Returns:
+        - The `result` of all files together.
+        """
+        patterns = [paths] if isinstance(paths, str) else list(paths)
+        files = sorted(file for pattern in patterns for file in glob.glob(pattern, recursive=True))
+        if not files:
+            raise ValueError(f"No journal files found for {paths}.")
+
+        for file in files:
+            self.validate_batches(
+                pq.ParquetFile(file, read_dictionary=['account']).iter_batches(
+                    batch_size=self.batch_size, columns=['date', 'account', 'debit', 'credit'],
+                ),
+                source=file,
+            )
+        return self.result()
+
+    def validate_batches(self, batches: Iterable[pa.RecordBatch], source: str = '') -> None:
+        """Validate a stream of record batches from one source, e.g. an ingestion job or an Arrow IPC reader."""
+        offset = 0
+        for batch in batches:
+            self.update(batch, source, offset)
+            offset += len(batch)
+        self.sources.append(source)
+
+    def _balance(self, frame: pd.DataFrame) -> pd.DataFrame:
+        frame['debit'] = frame['debit'] / 100
+        frame['credit'] = frame['credit'] / 100
+        frame['difference'] = (frame['debit'] - frame['credit']).round(2)
+        frame['balanced'] = frame['difference'].abs() <= self.tolerance
+        return frame
+
+    def result(self) -> dict[str, pd.DataFrame]:
+        """
+        Balances, trial balance and issues of everything validated so far.
+
+        Returns:
+        - Dictionary of DataFrames:
+          'summary': one row with rows, totals, difference, 'balanced' (every day, every
+          period and the total), unbalanced days and periods, issue counts and throughput.
+          Totals include the rows without a valid date, also counted in 'undated_rows'.
+          'days' and 'periods' (year, month): debit, credit, difference and balanced.
+          'trial_balance': debit, credit, balance and rows per account class ('invalid'
+          for unparseable accounts, 'missing' for rows without an account).
+          'issues': example rows per issue with their source and row number.
+        """
+        present = np.flatnonzero(self.day_rows)
+        dates = pd.to_datetime(self.origin + present, unit='D') if len(present) else pd.DatetimeIndex([])
+        days = self._balance(pd.DataFrame({
+            'date': dates, 'rows': self.day_rows[present],
+            'debit': self.day_debit[present], 'credit': self.day_credit[present],
+        }))
+
+        periods = days.assign(year=days['date'].dt.year, month=days['date'].dt.month)
+        periods = self._balance(periods.groupby(['year', 'month'], as_index=False)[['rows', 'debit', 'credit']].sum().assign(
+            debit=lambda frame: frame['debit'] * 100, credit=lambda frame: frame['credit'] * 100,
+        ))
+
+        trial_balance = pd.DataFrame(
+            [(name, debit / 100, credit / 100, rows) for name, (debit, credit, rows) in sorted(self.classes.items())],
+            columns=['account_class', 'debit', 'credit', 'rows'],
+        )
+        trial_balance['balance'] = (trial_balance['debit'] - trial_balance['credit']).round(2)
+
+        total_debit = (self.day_debit.sum() + self.undated[0]) / 100
+        total_credit = (self.day_credit.sum() + self.undated[1]) / 100
+        difference = round(total_debit - total_credit, 2)
+        summary = pd.DataFrame([{
+            'rows': self.rows,
+            'sources': len(self.sources),
+            'debit': total_debit,
+            'credit': total_credit,
+            'difference': difference,
+            'balanced': bool(days['balanced'].all() and periods['balanced'].all() and abs(difference) <= self.tolerance),
+            'unbalanced_days': int((~days['balanced']).sum()),
+            'unbalanced_periods': int((~periods['balanced']).sum()),
+            'undated_rows': self.undated[2],
+            **self.issue_counts,
+            'seconds': self.seconds,
+            'rows_per_second': self.rows / self.seconds if self.seconds else None,
+        }])
+
+        issues = pd.DataFrame(self.examples, columns=['issue', 'source', 'row', 'date', 'account', 'debit', 'credit'])
+        return {'summary': summary, 'days': days, 'periods': periods, 'trial_balance': trial_balance, 'issues': issues}
+
+
+# USAGE
+# validator = JournalValidator()
+# result = validator.validate("data/parquet/financial_journal_*.parquet")
+# print(result['summary'].T)
+# print(result['trial_balance'])
+# print(result['issues'])
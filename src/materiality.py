@@ -0,0 +1,253 @@
+from typing import Any, Literal, Optional, Type
+
+import numpy as np
+import pandas as pd
+
+from components import AOPCache, ComponentsFR, ComponentsLedger
+
+
+def top_k(values: np.ndarray, k: int, axis: int = 0) -> np.ndarray:
+    """
+    Positions of the k largest values along an axis, largest first, by partial sort.
+
+    `np.argpartition` selects the k largest in linear time; only those k are then sorted.
+
+    Parameters:
+    - values: Array to select from; NaN counts as the smallest value.
+    - k: Number of positions. Capped at the length of the axis.
+    - axis: Axis to select along. Default is 0.
+
+    Returns:
+    - Integer array with the input's shape, except `min(k, length)` along `axis`.
+    """
+    values = np.where(np.isnan(values), -np.inf, values)
+    length = values.shape[axis]
+    k = min(k, length)
+    if k <= 0:
+        return np.take(np.argsort(values, axis=axis), [], axis=axis)
+
+    candidates = np.argpartition(-values, k - 1, axis=axis) if k < length else np.argsort(-values, axis=axis, kind='stable')
+    candidates = np.take(candidates, np.arange(k), axis=axis)
+    order = np.argsort(-np.take_along_axis(values, candidates, axis=axis), axis=axis, kind='stable')
+    return np.take_along_axis(candidates, order, axis=axis)
+
+
+def _keep_top_k(flags: np.ndarray, values: np.ndarray, k: Optional[int], axis: int = 0) -> np.ndarray:
+    """Unflag everything but the k largest flagged values along `axis`."""
+    if k is None:
+        return flags
+    scores = np.where(flags, values, np.nan)
+    keep = np.zeros_like(flags)
+    np.put_along_axis(keep, top_k(scores, k, axis), True, axis=axis)
+    return flags & keep
+
+
+class MaterialityScreen:
+    def __init__(self, data: pd.DataFrame, factor: float = 0.05, basis: str = 'prihod_od_prodaje',
+                 company: Optional[Any] = None, fr_component_obj: Type[ComponentsFR] | ComponentsFR = ComponentsFR,
+                 cache: Optional[AOPCache] = None) -> None:
+        """
+        Materiality thresholds per company and year, and the material AOP positions, ledger accounts and customers.
+
+        The threshold is `factor` times the `basis` formula, by default 5% of the
+        revenue from sales (AOP 1001), as in the demo notebook. With stacked filings
+        every company of the portfolio is screened in the same array operations.
+
+        Parameters:
+        - data: Wide report of one company, or stacked filings ('company', 'AOP', 'year', 'value').
+        - factor: Share of the basis used as threshold. Default is 0.05.
+        - basis: Registered component or ratio the threshold is based on. Default is 'prihod_od_prodaje'.
+        - company: Name of the company of a wide report. Default is None.
+        - fr_component_obj: Components class, or a components object of `data` to reuse. Default is `ComponentsFR`.
+        - cache: AOPCache for the evaluated basis. Default is the shared cache.
+        """
+        if isinstance(fr_component_obj, ComponentsFR):
+            self.comp_obj = fr_component_obj
+        else:
+            self.comp_obj = fr_component_obj(data) if cache is None else fr_component_obj(data, cache=cache)
+        self.factor = factor
+        self.companies = self.comp_obj.companies if self.comp_obj.companies is not None else [company]
+        self.periods = self.comp_obj.periods
+
+        basis_values = np.asarray(self.comp_obj.evaluate(basis), dtype=float)
+        shape = (len(self.companies), len(self.periods))
+        self.threshold_matrix = np.round(np.broadcast_to(basis_values, shape) * factor, 2)
+
+        descriptions = {}
+        if 'description' in data.columns:
+            descriptions = data.drop_duplicates('AOP').set_index(data.drop_duplicates('AOP')['AOP'].astype(str))['description']
+        self.aop_codes = np.array(list(self.comp_obj.aop_index), dtype=object)
+        self.descriptions = pd.Series(self.aop_codes).map(descriptions).to_numpy()
+
+    def thresholds(self) -> pd.DataFrame:
+        """Threshold per company and year, columns 'company', 'year' and 'threshold'."""
+        index = pd.MultiIndex.from_product([self.companies, self.periods], names=['company', 'year'])
+        return pd.DataFrame({'threshold': self.threshold_matrix.ravel()}, index=index).reset_index()
+
+    def _values(self) -> np.ndarray:
+        """AOP x company x period values, with a company axis of length 1 for a wide report."""
+        matrix = self.comp_obj.matrix[list(self.comp_obj.aop_index.values())].astype(float)
+        return matrix[:, None, :] if matrix.ndim == 2 else matrix
+
+    def positions(self, top: Optional[int] = None, exclude_prefixes: tuple = ('1',),
+                  years: Optional[list] = None) -> pd.DataFrame:
+        """
+        AOP positions above the threshold of their company and year.
+
+        Parameters:
+        - top: Keep only the `top` largest material positions per company and year. Default is all.
+        - exclude_prefixes: AOP code prefixes not screened. Default is ('1',), the income
+          statement, so only balance sheet positions are flagged, as in the notebook.
+        - years: Periods to screen. Default is every period.
+
+        Returns:
+        - DataFrame with 'company', 'year', 'AOP', 'description', 'value' and 'threshold',
+          ordered by company, year and value (largest first).
+        """
+        values = self._values()
+        eligible = ~pd.Index(self.aop_codes.astype(str)).str.startswith(exclude_prefixes) if exclude_prefixes else np.ones(len(self.aop_codes), dtype=bool)
+        flags = (values > self.threshold_matrix[None]) & eligible[:, None, None]
+
+        if years is not None:
+            missing = [year for year in years if year not in self.comp_obj.period_index]
+            if missing:
+                raise ValueError(f"Periods {missing} not found in filings.")
+            period_mask = np.isin(np.arange(len(self.periods)), [self.comp_obj.period_index[year] for year in years])
+            flags &= period_mask[None, None, :]
+
+        flags = _keep_top_k(flags, values, top, axis=0)
+        aop, company, period = np.nonzero(flags)
+
+        result = pd.DataFrame({
+            'company': np.array(self.companies, dtype=object)[company],
+            'year': np.array(self.periods, dtype=object)[period],
+            'AOP': self.aop_codes[aop],
+            'description': self.descriptions[aop],
+            'value': values[aop, company, period],
+            'threshold': self.threshold_matrix[company, period],
+        })
+        order = np.lexsort((-result['value'].to_numpy(), period, company))
+        return result.take(order).reset_index(drop=True)
+
+    @staticmethod
+    def account_totals(journal: pd.DataFrame | ComponentsLedger) -> pd.DataFrame:
+        """
+        Debit and credit per account and year in one pass: `np.bincount` over the factorized (account, year) pairs.
+
+        Parameters:
+        - journal: Journal DataFrame (plain or compact layout) or a `ComponentsLedger`.
+
+        Returns:
+        - DataFrame with 'account', 'year', 'debit' and 'credit', in currency units.
+        """
+        if isinstance(journal, ComponentsLedger):
+            data, scale = journal.data, journal.amount_scale
+        else:
+            data, scale = journal, (100 if ComponentsLedger._is_compact(journal) else 1)
+
+        codes, accounts = pd.factorize(data['account'], sort=True)
+        years = ComponentsLedger._dates(data['date']).dt.year.to_numpy()
+        first_year = years.min() if len(years) else 0
+        year_count = (years.max() - first_year + 1) if len(years) else 0
+
+        cells = codes * year_count + (years - first_year)
+        size = len(accounts) * year_count
+        debit = np.bincount(cells, weights=data['debit'].to_numpy(dtype=float), minlength=size) / scale
+        credit = np.bincount(cells, weights=data['credit'].to_numpy(dtype=float), minlength=size) / scale
+        present = np.bincount(cells, minlength=size) > 0
+
+        cell = np.flatnonzero(present)
+        return pd.DataFrame({
+            'account': np.asarray(accounts, dtype=object)[cell // year_count] if year_count else np.array([], dtype=object),
+            'year': cell % year_count + first_year if year_count else np.array([], dtype=int),
+            'debit': debit[cell],
+            'credit': credit[cell],
+        })
+
+    def accounts(self, journals: pd.DataFrame | ComponentsLedger | dict, amount: Literal['debit', 'credit', 'max'] = 'debit',
+                 top: Optional[int] = None, period_map: Optional[dict] = None) -> pd.DataFrame:
+        """
+        Ledger accounts whose yearly debit, credit or larger of both exceeds the company's threshold.
+
+        Amounts are compared with the threshold as they are, as in the notebook; scale
+        one of them first if the filings and the journal use different units.
+
+        Parameters:
+        - journals: Journal of the company, or a dictionary of journals keyed by company name.
+        - amount: Compared amount: 'debit', 'credit' or 'max' of both. Default is 'debit'.
+        - top: Keep only the `top` largest material accounts per company and year. Default is all.
+        - period_map: Journal year -> report period, e.g. {2023: 'year_5'}. Default maps each year to itself.
+
+        Returns:
+        - DataFrame with 'company', 'year', 'account', 'debit', 'credit', 'threshold' and
+          'counterparty' (True for analytic customer accounts), ordered by company, year and amount.
+        """
+        if amount not in ['debit', 'credit', 'max']:
+            raise ValueError("The argument 'amount' must be 'debit', 'credit', or 'max'.")
+        if not isinstance(journals, dict):
+            journals = {self.companies[0]: journals}
+
+        thresholds = self.thresholds().set_index(['company', 'year'])['threshold']
+        tables = []
+        for company, journal in journals.items():
+            if company not in self.companies:
+                raise ValueError(f"Company {company} not found in filings.")
+            totals = self.account_totals(journal)
+            periods = totals['year'] if period_map is None else totals['year'].map(period_map)
+            totals['threshold'] = thresholds.reindex(pd.MultiIndex.from_arrays([np.full(len(totals), company, dtype=object), periods])).to_numpy()
+            tables.append(totals.assign(company=company))
+
+        totals = pd.concat(tables, ignore_index=True)
+        compared = totals[['debit', 'credit']].max(axis=1) if amount == 'max' else totals[amount]
+        flags = (compared > totals['threshold']).to_numpy()
+
+        if top is not None:
+            groups = totals.groupby(['company', 'year'], sort=False).ngroup().to_numpy()
+            flags = self._keep_top_k_per_group(flags, compared.to_numpy(), groups, top)
+
+        material = totals[flags].assign(_amount=compared[flags])
+        accounts = pd.Index(material['account'].unique()).astype(str)
+        is_customer = ComponentsLedger._is_customer(accounts)
+        material['counterparty'] = material['account'].astype(str).map(dict(zip(accounts, is_customer))).astype(bool)
+
+        material = material.sort_values(['company', 'year', '_amount'], ascending=[True, True, False], kind='stable')
+        return material[['company', 'year', 'account', 'debit', 'credit', 'threshold', 'counterparty']].reset_index(drop=True)
+
+    @staticmethod
+    def _keep_top_k_per_group(flags: np.ndarray, values: np.ndarray, groups: np.ndarray, k: int) -> np.ndarray:
+        """Keep the k largest flagged values per group: one lexsort, then the rank within each group."""
+        candidates = np.flatnonzero(flags)
+        order = candidates[np.lexsort((-values[candidates], groups[candidates]))]
+        group_of = groups[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(group_of)) + 1]
+        ranks = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+
+        keep = np.zeros_like(flags)
+        keep[order[ranks < k]] = True
+        return keep
+
+    def screen(self, journals: Optional[pd.DataFrame | ComponentsLedger | dict] = None, top: Optional[int] = None,
+               period_map: Optional[dict] = None) -> dict[str, pd.DataFrame]:
+        """
+        Full screening: thresholds, material positions and, with journals, material accounts and customers.
+
+        Returns:
+        - Dictionary with 'thresholds', 'positions' and, with journals, 'accounts' and
+          'counterparties' (the material analytic customer accounts).
+        """
+        result = {'thresholds': self.thresholds(), 'positions': self.positions(top)}
+        if journals is not None:
+            accounts = self.accounts(journals, top=top, period_map=period_map)
+            result['accounts'] = accounts
+            result['counterparties'] = accounts[accounts['counterparty']].reset_index(drop=True)
+        return result
+
+
+# USAGE
+# df_fr = pd.read_parquet("data/parquet/financial_reports.parquet")
+# df_fr.columns = ['AOP', 'description', 2019, 2020, 2021, 2022, 2023]
+# screen = MaterialityScreen(df_fr, company='Test')
+# print(screen.thresholds())
+# print(screen.positions(years=[2023]))
+# journal = JournalDataset().ledger(compact=True)
+# print(screen.screen(journal, top=10)['counterparties'])
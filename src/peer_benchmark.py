@@ -0,0 +1,185 @@
+import warnings
+from typing import Any, Optional, Type
+
+import numpy as np
+import pandas as pd
+
+from components import AOPCache, ComponentsFR
+
+
+STATISTICS = ['value', 'peers', 'p25', 'median', 'p75', 'mean', 'std', 'z_score', 'percentile_rank']
+
+
+def benchmark_tensor(values: np.ndarray, company: int, peer_mask: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Compare one company against its peers for every metric and period at once.
+
+    Non-finite values (missing positions, ratios divided by zero) are left out of the peer statistics.
+
+    Parameters:
+    - values: Array of shape (metrics, companies, periods).
+    - company: Position of the benchmarked company on the company axis.
+    - peer_mask: Boolean array over the company axis selecting the peers.
+
+    Returns:
+    - Dictionary of (metrics, periods) arrays keyed like `STATISTICS`. The percentile
+      rank is the share of peers below the company's value, counting ties as half, in
+      percent. The z-score uses the sample standard deviation and is NaN when it is 0.
+    """
+    values = np.asarray(values, dtype=float)
+    values = np.where(np.isfinite(values), values, np.nan)
+    value = values[:, company, :]
+    peers = values[:, peer_mask, :]
+
+    valid = ~np.isnan(peers)
+    counts = valid.sum(axis=1)
+    below = np.sum(peers < value[:, None, :], axis=1)
+    ties = np.sum(peers == value[:, None, :], axis=1)
+
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        p25, median, p75 = np.nanpercentile(peers, [25, 50, 75], axis=1)
+        mean = np.nanmean(peers, axis=1)
+        std = np.nanstd(peers, axis=1, ddof=1)
+        z_score = np.where(std > 0, (value - mean) / std, np.nan)
+        percentile_rank = np.where(counts > 0, (below + 0.5 * ties) / counts * 100, np.nan)
+
+    percentile_rank = np.where(np.isnan(value), np.nan, percentile_rank)
+    return {
+        'value': value, 'peers': counts, 'p25': p25, 'median': median, 'p75': p75,
+        'mean': mean, 'std': std, 'z_score': z_score, 'percentile_rank': percentile_rank,
+    }
+
+
+class PeerBenchmark:
+    def __init__(self, data: pd.DataFrame, company: Any, peers: Optional[list] = None,
+                 fr_component_obj: Type[ComponentsFR] = ComponentsFR, cache: Optional[AOPCache] = None) -> None:
+        """
+        Benchmark one company against a peer group of any size, for many AOP codes and ratios in one pass.
+
+        Works on stacked filings (see `ComponentsFR.stack_filings`), whose AOP x company x
+        period tensor is compared along the company axis, so the peer statistics of all
+        codes and periods come from a few array reductions.
+
+        Parameters:
+        - data: Stacked filings with columns 'company', 'AOP', 'year' and 'value'.
+        - company: Name of the benchmarked company.
+        - peers: Names of the peer companies. Default is every other company in `data`.
+        - fr_component_obj: Components class. Default is `ComponentsFR`.
+        - cache: AOPCache for the evaluated ratios. Default is the shared cache.
+        """
+        self.comp_obj = fr_component_obj(data) if cache is None else fr_component_obj(data, cache=cache)
+        if self.comp_obj.companies is None:
+            raise ValueError("PeerBenchmark needs stacked filings with 'company' and 'value' columns.")
+
+        companies = self.comp_obj.companies
+        if company not in companies:
+            raise ValueError(f"Company {company} not found in filings.")
+        self.company = company
+        self.company_position = companies.index(company)
+
+        if peers is None:
+            self.peer_mask = np.ones(len(companies), dtype=bool)
+        else:
+            missing = set(peers) - set(companies)
+            if missing:
+                raise ValueError(f"Peers {sorted(missing, key=str)} not found in filings.")
+            self.peer_mask = np.isin(np.array(companies, dtype=object), list(peers))
+        self.peer_mask[self.company_position] = False
+
+        if not self.peer_mask.any():
+            raise ValueError("The peer group is empty.")
+
+    @classmethod
+    def from_reports(cls, company_report: pd.DataFrame, competitors_report: pd.DataFrame,
+                     company: str = 'company', year: Optional[Any] = None, **kwargs) -> "PeerBenchmark":
+        """
+        Benchmark from the wide reports, e.g. financial_reports and competitors_fr.
+
+        The competitors filed a single period, so the other periods have no peers:
+        their positions are NaN, 'peers' is 0 and the peer statistics are NaN.
+
+        Parameters:
+        - company_report: Wide report of the company, one column per period.
+        - competitors_report: Wide report with one column per competitor, for a single period.
+        - company: Name given to the company. Default is 'company'.
+        - year: Period of the competitors' report. Default is the company report's last period.
+        - kwargs: Passed to `PeerBenchmark`.
+        """
+        if year is None:
+            year = [column for column in company_report.columns if column not in ('AOP', 'description')][-1]
+
+        stacked = pd.concat([
+            ComponentsFR.stack_filings(company_report, company=company),
+            ComponentsFR.stack_filings(competitors_report, year=year),
+        ], ignore_index=True)
+        return cls(stacked, company, **kwargs)
+
+    @property
+    def peers(self) -> list:
+        return [name for name, is_peer in zip(self.comp_obj.companies, self.peer_mask) if is_peer]
+
+    def _table(self, values: np.ndarray, labels: list, label_name: str, years: Optional[list]) -> pd.DataFrame:
+        periods = self.comp_obj.periods
+        if years is not None:
+            missing = [year for year in years if year not in self.comp_obj.period_index]
+            if missing:
+                raise ValueError(f"Periods {missing} not found in filings.")
+            values = values[..., [self.comp_obj.period_index[year] for year in years]]
+            periods = list(years)
+
+        statistics = benchmark_tensor(values, self.company_position, self.peer_mask)
+        index = pd.MultiIndex.from_product([labels, periods], names=[label_name, 'year'])
+        return pd.DataFrame({name: statistics[name].ravel() for name in STATISTICS}, index=index)
+
+    def aop_benchmark(self, codes: Optional[list] = None, years: Optional[list] = None) -> pd.DataFrame:
+        """
+        Peer statistics of AOP positions.
+
+        Parameters:
+        - codes: AOP codes. Default is every code in the filings.
+        - years: Periods. Default is every period.
+
+        Returns:
+        - DataFrame indexed by (AOP, year) with the company's value, the number of peers
+          with a value, the peer quartiles, mean and standard deviation, and the company's
+          z-score and percentile rank.
+        """
+        codes = list(self.comp_obj.aop_index) if codes is None else list(codes)
+        missing = [code for code in codes if code not in self.comp_obj.aop_index]
+        if missing:
+            raise ValueError(f"AOP codes {missing} not found in filings.")
+
+        rows = [self.comp_obj.aop_index[code] for code in codes]
+        return self._table(self.comp_obj.matrix[rows], codes, 'AOP', years)
+
+    def ratio_benchmark(self, ratios: Optional[list] = None, years: Optional[list] = None) -> pd.DataFrame:
+        """
+        Peer statistics of registered ratios, evaluated for all companies in one plan.
+
+        Parameters:
+        - ratios: Ratio names. Default is every ratio in the registry.
+        - years: Periods. Default is every period.
+
+        Returns:
+        - DataFrame indexed by (ratio, year) with the columns of `aop_benchmark`.
+        """
+        ratios = list(self.comp_obj.registry.ratios) if ratios is None else list(ratios)
+        results = self.comp_obj.evaluate()
+        missing = [name for name in ratios if name not in results]
+        if missing:
+            raise ValueError(f"Ratios {missing} not found in registry.")
+
+        shape = self.comp_obj.matrix.shape[1:]
+        values = np.stack([np.broadcast_to(np.asarray(results[name], dtype=float), shape) for name in ratios])
+        return self._table(values, ratios, 'ratio', years)
+
+
+# USAGE
+# df_fr = pd.read_parquet("data/parquet/financial_reports.parquet")
+# df_competitors = pd.read_parquet("data/parquet/competitors_fr.parquet")
+# benchmark = PeerBenchmark.from_reports(df_fr, df_competitors)
+# print(benchmark.aop_benchmark(['1001', '0002'], years=['year_5']))
+# print(benchmark.ratio_benchmark(years=['year_5']))
+# filings = pd.read_parquet("data/parquet/industry_filings.parquet")  # stacked: company, AOP, year, value
+# print(PeerBenchmark(filings, 'Company A').ratio_benchmark())
@@ -0,0 +1,533 @@
+import glob
+import hashlib
+import inspect
+import io
+import json
+import os
+import pickle
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+import pandas as pd
+
+from chart_renderer import ChartRenderer
+from components import FORMULA_REGISTRY, ComponentsFR, ComponentsLedger, RatioAnalysis
+from journal import JournalDataset
+from utilities import ResultsStore
+from visualization_eng import FinancialDataVisualization
+
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _source(obj: Any) -> bytes:
+    try:
+        return inspect.getsource(obj).encode()
+    except (OSError, TypeError):
+        return obj.__code__.co_code if inspect.isfunction(obj) else b''
+
+
+def _global_names(code: Any) -> set:
+    """Global names used by a code object and the functions nested in it."""
+    names, codes = set(), [code]
+    while codes:
+        code = codes.pop()
+        names.update(code.co_names)
+        codes.extend(const for const in code.co_consts if inspect.iscode(const))
+    return names
+
+
+def _own_globals(func: Callable) -> dict:
+    """
+    Globals of the function's own module it uses, directly or through other functions of that module.
+
+    Modules and objects defined in other modules are left out; `_dependencies` covers those.
+    """
+    own_module = inspect.getmodule(func)
+    used, pending = {}, [func]
+    while pending:
+        for name in _global_names(pending.pop().__code__):
+            if name in used or name not in func.__globals__:
+                continue
+            value = func.__globals__[name]
+            if inspect.ismodule(value) or inspect.getmodule(value) not in (None, own_module):
+                continue
+            used[name] = value
+            if inspect.isfunction(value):
+                pending.append(value)
+    return used
+
+
+def _dependencies(func: Callable) -> list:
+    """
+    Modules of this source tree a stage function depends on, e.g. components.py for `ratios`.
+
+    These are the modules defining the globals the function (or a function nested in it
+    or of its own module it calls) uses, and the modules of this tree that those import,
+    transitively.
+    """
+    own_module = inspect.getmodule(func)
+    functions = [func, *(value for value in _own_globals(func).values() if inspect.isfunction(value))]
+    pending = [
+        function.__globals__[name]
+        for function in functions for name in _global_names(function.__code__) if name in function.__globals__
+    ]
+    modules = {}
+    while pending:
+        module = pending.pop()
+        module = module if inspect.ismodule(module) else inspect.getmodule(module)
+        path = getattr(module, '__file__', None)
+        if (module is None or module is own_module or module.__name__ in modules or path is None
+                or os.path.dirname(os.path.abspath(path)) != SOURCE_DIR):
+            continue
+        modules[module.__name__] = module
+        pending.extend(value for value in vars(module).values() if inspect.ismodule(value) or inspect.isclass(value) or inspect.isfunction(value))
+    return [modules[name] for name in sorted(modules)]
+
+
+def _code_hash(func: Callable) -> str:
+    """
+    Hash of a stage function's source, of the globals of its own module it uses and of the
+    modules it depends on, so editing any of them makes the stage stale.
+
+    Functions and classes of the own module are hashed by their source, other globals
+    (e.g. `REPORT_RATIOS`) by their value.
+    """
+    digest = hashlib.sha256(_source(func))
+    for name, value in sorted(_own_globals(func).items()):
+        digest.update(name.encode())
+        if inspect.isfunction(value) or inspect.isclass(value):
+            digest.update(_source(value))
+        elif inspect.getmodule(value) is None:
+            digest.update(json.dumps(value, default=repr).encode())
+        else:
+            digest.update(_source(type(value)))
+    for module in _dependencies(func):
+        digest.update(module.__name__.encode())
+        digest.update(_source(module))
+    return digest.hexdigest()
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable, inputs: tuple = (), outputs: Optional[tuple] = None,
+                 files: tuple = (), targets: tuple = (), params: Optional[dict] = None) -> None:
+        """
+        One named step of a `Pipeline`.
+
+        Parameters:
+        - name: Stage name.
+        - func: Function called with the input artifacts and `params` as keyword arguments.
+          It returns the value of its single output, or a dict keyed by output name.
+        - inputs: Names of artifacts produced by other stages.
+        - outputs: Names of the artifacts it produces. Default is the stage name.
+        - files: Source files (paths or glob patterns) it reads; their content is part of the stage key.
+        - targets: Files it writes; the stage re-runs if one of them is missing.
+        - params: Parameters passed to `func`, part of the stage key (must be JSON-serializable).
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs) if outputs is not None else (name,)
+        self.files = tuple(files)
+        self.targets = tuple(targets)
+        self.params = params or {}
+
+
+class Pipeline:
+    def __init__(self, artifact_dir: str = "data/cache/pipeline", max_workers: Optional[int] = None) -> None:
+        """
+        Dependency-tracked pipeline of stages with content-hashed artifacts.
+
+        A stage's key is the hash of its code (with the globals and modules of this tree it
+        uses and, for stages using components.py, the formula registry), the artifact
+        format, parameters, source file contents and the content hashes of its input
+        artifacts. A stage whose key matches the last run and whose artifacts and target
+        files exist is skipped. Because keys use the content
+        of the inputs, a stage that re-runs but produces identical output does not make
+        its dependents stale. Artifacts are stored once per content hash in
+        `artifact_dir` (DataFrames with string column names as Parquet, anything else
+        pickled, so e.g. integer year columns round-trip), next to a manifest of the
+        last run; `prune` deletes the ones the manifest no longer refers to.
+
+        Stages whose inputs are ready run concurrently on a thread pool. pandas, numpy,
+        Arrow and DuckDB release the GIL in their heavy loops; chart rendering can use
+        `ChartRenderer.render_batch` for process-level parallelism.
+
+        Parameters:
+        - artifact_dir: Directory of artifacts and the manifest. Default is 'data/cache/pipeline'.
+        - max_workers: Threads running stages. Default is the executor's default.
+        """
+        self.artifact_dir = artifact_dir
+        self.max_workers = max_workers
+        self.stages = {}
+        self.producers = {}
+        os.makedirs(artifact_dir, exist_ok=True)
+
+        self.manifest_path = os.path.join(artifact_dir, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                self.manifest = json.load(file)
+        self._file_hashes = {}
+
+    def add(self, stage: Stage) -> Stage:
+        if stage.name in self.stages:
+            raise ValueError(f"Stage {stage.name} is already defined.")
+        for output in stage.outputs:
+            if output in self.producers:
+                raise ValueError(f"Artifact {output} is already produced by stage {self.producers[output]}.")
+        for output in stage.outputs:
+            self.producers[output] = stage.name
+        self.stages[stage.name] = stage
+        return stage
+
+    def stage(self, inputs: tuple = (), outputs: Optional[tuple] = None, files: tuple = (), targets: tuple = (),
+              name: Optional[str] = None, **params) -> Callable:
+        """Decorator registering a function as a stage; see `Stage` for the arguments."""
+        def decorator(func: Callable) -> Callable:
+            self.add(Stage(name or func.__name__, func, inputs, outputs, files, targets, params))
+            return func
+        return decorator
+
+    def _order(self, targets: Optional[list]) -> list:
+        """Stages needed for `targets` (stage names, default all) in dependency order; raises on cycles or unknown inputs."""
+        order, visiting, done = [], set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage {name} depends on itself.")
+            visiting.add(name)
+            for artifact in self.stages[name].inputs:
+                if artifact not in self.producers:
+                    raise ValueError(f"Stage {name} needs artifact {artifact}, which no stage produces.")
+                visit(self.producers[artifact])
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in (targets if targets is not None else self.stages):
+            if name not in self.stages:
+                raise ValueError(f"Stage {name} not found.")
+            visit(name)
+        return order
+
+    def _file_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if key not in self._file_hashes:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(block)
+            self._file_hashes[key] = digest.hexdigest()
+        return self._file_hashes[key]
+
+    def _key(self, stage: Stage, artifact_hashes: dict) -> str:
+        files = sorted(file for pattern in stage.files for file in glob.glob(pattern))
+        payload = json.dumps({
+            'code': _code_hash(stage.func),
+            'store': _code_hash(Pipeline._store),
+            'registry': FORMULA_REGISTRY.fingerprint() if inspect.getmodule(type(FORMULA_REGISTRY)) in _dependencies(stage.func) else None,
+            'params': stage.params,
+            'files': {os.path.abspath(file): self._file_hash(file) for file in files},
+            'inputs': {artifact: artifact_hashes[artifact] for artifact in stage.inputs},
+            'outputs': stage.outputs,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _artifact_path(self, content_hash: str, kind: str) -> str:
+        return os.path.join(self.artifact_dir, f"{content_hash}.{kind}")
+
+    def _store(self, value: Any) -> dict:
+        """Serialize an artifact, name it by its content hash and write it unless it already exists."""
+        buffer = io.BytesIO()
+        if isinstance(value, pd.DataFrame) and all(isinstance(column, str) for column in value.columns):
+            kind = 'parquet'
+            value.to_parquet(buffer)
+        else:
+            kind = 'pickle'
+            pickle.dump(value, buffer, protocol=5)
+
+        content = buffer.getvalue()
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self._artifact_path(content_hash, kind)
+        if not os.path.exists(path):
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as file:
+                file.write(content)
+            os.replace(temporary_path, path)
+        return {'hash': content_hash, 'kind': kind}
+
+    def load(self, artifact: str) -> Any:
+        """Read an artifact of the last run from the store."""
+        producer = self.producers.get(artifact)
+        entry = self.manifest.get(producer, {}).get('outputs', {}).get(artifact)
+        if entry is None:
+            raise ValueError(f"Artifact {artifact} has not been produced yet.")
+
+        path = self._artifact_path(entry['hash'], entry['kind'])
+        if entry['kind'] == 'parquet':
+            return pd.read_parquet(path)
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+    def prune(self) -> list:
+        """
+        Delete the stored artifacts the manifest no longer refers to, e.g. outputs of earlier runs.
+
+        Returns:
+        - List of the deleted paths.
+        """
+        referenced = {
+            self._artifact_path(output['hash'], output['kind'])
+            for entry in self.manifest.values() for output in entry['outputs'].values()
+        }
+        removed = []
+        for kind in ['parquet', 'pickle']:
+            for path in glob.glob(os.path.join(self.artifact_dir, f"*.{kind}")):
+                if path not in referenced:
+                    os.remove(path)
+                    removed.append(path)
+        return sorted(removed)
+
+    def _is_fresh(self, stage: Stage, key: str) -> bool:
+        entry = self.manifest.get(stage.name)
+        if entry is None or entry['key'] != key:
+            return False
+        artifacts_exist = all(
+            os.path.exists(self._artifact_path(output['hash'], output['kind'])) for output in entry['outputs'].values()
+        )
+        return artifacts_exist and all(os.path.exists(target) for target in stage.targets)
+
+    def _execute(self, stage: Stage, values: dict) -> tuple[dict, float]:
+        start = time.perf_counter()
+        result = stage.func(**{artifact: values[artifact] for artifact in stage.inputs}, **stage.params)
+        if len(stage.outputs) == 1:
+            result = {stage.outputs[0]: result}
+        missing = [output for output in stage.outputs if output not in result]
+        if missing:
+            raise ValueError(f"Stage {stage.name} did not return outputs {missing}.")
+        return {output: result[output] for output in stage.outputs}, time.perf_counter() - start
+
+    def _save_manifest(self) -> None:
+        temporary_path = f"{self.manifest_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, indent=4)
+        os.replace(temporary_path, self.manifest_path)
+
+    def run(self, targets: Optional[list] = None, force: bool = False) -> pd.DataFrame:
+        """
+        Run the stages needed for `targets`, skipping the fresh ones.
+
+        Parameters:
+        - targets: Stage names to bring up to date, with everything they depend on. Default is all stages.
+        - force: Re-run every stage even if it is fresh. Default is False.
+
+        Returns:
+        - DataFrame with one row per stage: 'stage', 'status' ('ran' or 'skipped'), 'seconds' and 'key'.
+        """
+        order = self._order(targets)
+        artifact_hashes, values, report = {}, {}, []
+        pending = list(order)
+        running = {}
+
+        def ready(name: str) -> bool:
+            return all(artifact in artifact_hashes for artifact in self.stages[name].inputs)
+
+        def load_inputs(stage: Stage) -> dict:
+            for artifact in stage.inputs:
+                if artifact not in values:
+                    values[artifact] = self.load(artifact)
+            return values
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in [name for name in pending if ready(name)]:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    key = self._key(stage, artifact_hashes)
+
+                    if not force and self._is_fresh(stage, key):
+                        artifact_hashes.update({output: entry['hash'] for output, entry in self.manifest[name]['outputs'].items()})
+                        report.append({'stage': name, 'status': 'skipped', 'seconds': 0.0, 'key': key})
+                        continue
+
+                    running[executor.submit(self._execute, stage, load_inputs(stage))] = (name, key)
+
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, key = running.pop(future)
+                    outputs, seconds = future.result()
+
+                    entries = {output: self._store(value) for output, value in outputs.items()}
+                    values.update(outputs)
+                    artifact_hashes.update({output: entry['hash'] for output, entry in entries.items()})
+                    self.manifest[name] = {'key': key, 'outputs': entries, 'seconds': seconds, 'finished': time.time()}
+                    self._save_manifest()
+                    report.append({'stage': name, 'status': 'ran', 'seconds': seconds, 'key': key})
+
+        return pd.DataFrame(report, columns=['stage', 'status', 'seconds', 'key'])
+
+
+# Company report stages, as in the demo notebook.
+
+def load_journal(journal_paths: str) -> pd.DataFrame:
+    """Journal without opening entries and closing accounts, in the compact layout."""
+    return ComponentsLedger.compact_journal(JournalDataset(journal_paths).query())
+
+
+def load_filings(report_path: str, competitors_path: str, years: list) -> dict:
+    filings = pd.read_parquet(report_path)
+    filings.columns = ['AOP', 'description', *years]
+    return {'filings': filings, 'competitors': pd.read_parquet(competitors_path)}
+
+
+def materiality(filings: pd.DataFrame, materiality_factor: float) -> dict:
+    """Materiality threshold (share of the last year's revenue) and the material balance sheet positions."""
+    threshold = round(float(filings.loc[filings['AOP'] == '1001'].iloc[0, -1]) * materiality_factor, 2)
+    material = filings[(filings.iloc[:, -1] > threshold) & (~filings['AOP'].str.startswith('1'))]
+    return {'materiality': threshold, 'material_positions': material['description'].str.upper().to_list()}
+
+
+def components(filings: pd.DataFrame) -> pd.DataFrame:
+    """Every registered component per year, with the expenses (1013) and profit (1055) positions."""
+    comp_obj = ComponentsFR(filings)
+    results = comp_obj.evaluate()
+    table = pd.DataFrame(
+        {name: results[name] for name in comp_obj.registry.formulas if name not in comp_obj.registry.ratios},
+        index=pd.Index(comp_obj.periods, name='year'),
+    )
+    table['rashodi'] = comp_obj._get_aop_value('1013')
+    table['dobit'] = comp_obj._get_aop_value('1055')
+    return table.reset_index()
+
+
+def ratios(filings: pd.DataFrame, competitors: pd.DataFrame) -> dict:
+    """
+    Ratios of the company per year, and of every competitor for the last year.
+
+    Competitors are stacked as one company each, so turnover ratios average a
+    competitor's own periods; with a single filed period they are NaN.
+    """
+    stacked = ComponentsFR.stack_filings(competitors, year=filings.columns[-1])
+    return {
+        'ratios': RatioAnalysis(filings, ComponentsFR).ratio_table().reset_index(),
+        'competitor_ratios': RatioAnalysis(stacked, ComponentsFR).ratio_table().reset_index(),
+    }
+
+
+def ledger_aggregates(journal: pd.DataFrame, year: int) -> pd.DataFrame:
+    """Weekly and monthly totals of inventory (13), cash (24) and customers for one year."""
+    ledger = ComponentsLedger(journal, build_cube=True)
+    groups = {'inventory': '13', 'cash': '24', 'customers': list(ComponentsLedger.CUSTOMER_PREFIXES)}
+
+    tables = []
+    for group, prefixes in groups.items():
+        for by in ['month', 'week']:
+            totals = ledger.sum_account_data_by_period(prefixes, by)
+            totals = totals[totals['year'] == year].rename(columns={by: 'period'})
+            tables.append(totals.assign(group=group, by=by))
+    return pd.concat(tables, ignore_index=True)[['group', 'by', 'year', 'period', 'debit', 'credit']]
+
+
+REPORT_CHARTS = {
+    '1001': 'Business revenue', '0009': 'Fixed assets', '0034': 'Inventory',
+    '0442': 'Operational liabilities', '0420': 'Loans and leasing', '9005': 'Employees',
+}
+REPORT_RATIOS = {
+    'current_ratio': 'g', 'quick_ratio': 'g', 'long_term_debt_ratio': 'g', 'debt_to_equity': 'g',
+    'gross_profit_margin': 'r', 'net_profit_margin': 'r', 'return_on_bussines_assets': 'r', 'return_on_equity': 'r',
+}
+
+
+def charts(filings: pd.DataFrame, competitors: pd.DataFrame, ratios: pd.DataFrame,
+           competitor_ratios: pd.DataFrame) -> dict[str, bytes]:
+    """PNG charts of the report, keyed by chart name."""
+    years = list(filings.columns[2:])
+    renderer = ChartRenderer(FinancialDataVisualization.LABELS)
+    aggregate = FinancialDataVisualization.aggregate_data_for_comparative_visualization
+    revenue_company, revenue_competitors = aggregate(filings, competitors, '1001', years)
+
+    output = {}
+    for code, variable in REPORT_CHARTS.items():
+        company, competition = aggregate(filings, competitors, code, years)
+        if code == '1001':
+            output[f"comparative_{code}"] = renderer.render('comparative', company, competition, variable, years)
+        else:
+            output[f"comparative_{code}"] = renderer.render(
+                'comparative_with_revenue', pd.concat([company, revenue_company]),
+                pd.concat([competition, revenue_competitors]).iloc[[1, 0]], variable, years,
+            )
+
+    for name, color in REPORT_RATIOS.items():
+        company = ratios[name].round(2).to_numpy()
+        competition = [*competitor_ratios[name].round(2).to_list(), company[-1]]
+        output[f"ratio_{name}"] = renderer.render('ratio', company, competition, name, years, last_bar_color=color)
+    return output
+
+
+def save_results(output_dir: str, materiality: dict, components: pd.DataFrame, ratios: pd.DataFrame,
+                 competitor_ratios: pd.DataFrame, ledger_aggregates: pd.DataFrame, charts: dict) -> list:
+    """Write the results to `<output_dir>/results.json` and the charts to `<output_dir>/charts`; returns the written paths."""
+    chart_dir = os.path.join(output_dir, "charts")
+    os.makedirs(chart_dir, exist_ok=True)
+
+    paths = [os.path.join(output_dir, "results.json")]
+    with ResultsStore(paths[0]) as store:
+        store.save("materiality", materiality)
+        store.save("components", components)
+        store.save("ratios", ratios)
+        store.save("competitor_ratios", competitor_ratios)
+        store.save("ledger_aggregates", ledger_aggregates)
+
+    for name, image in charts.items():
+        paths.append(os.path.join(chart_dir, f"{name}.png"))
+        with open(paths[-1], "wb") as file:
+            file.write(image)
+    return paths
+
+
+def report_pipeline(journal_paths: str = "data/parquet/financial_journal_*.parquet",
+                    report_path: str = "data/parquet/financial_reports.parquet",
+                    competitors_path: str = "data/parquet/competitors_fr.parquet",
+                    years: tuple = (2019, 2020, 2021, 2022, 2023), materiality_factor: float = 0.05,
+                    output_dir: str = "report", artifact_dir: str = "data/cache/pipeline",
+                    max_workers: Optional[int] = None) -> Pipeline:
+    """
+    Pipeline of the company report: journal and filings loading, materiality, components,
+    ratios, ledger aggregates, charts and `save_results` into `output_dir`.
+
+    The journal and the filings are loaded concurrently, and so are the stages that
+    only depend on them. A changed journal file re-runs the journal stages only.
+    """
+    years = list(years)
+    pipeline = Pipeline(artifact_dir, max_workers)
+    pipeline.add(Stage('load_journal', load_journal, outputs=('journal',), files=(journal_paths,),
+                       params={'journal_paths': journal_paths}))
+    pipeline.add(Stage('load_filings', load_filings, outputs=('filings', 'competitors'), files=(report_path, competitors_path),
+                       params={'report_path': report_path, 'competitors_path': competitors_path, 'years': years}))
+    pipeline.add(Stage('materiality', materiality, inputs=('filings',), params={'materiality_factor': materiality_factor}))
+    pipeline.add(Stage('components', components, inputs=('filings',)))
+    pipeline.add(Stage('ratios', ratios, inputs=('filings', 'competitors'), outputs=('ratios', 'competitor_ratios')))
+    pipeline.add(Stage('ledger_aggregates', ledger_aggregates, inputs=('journal',), params={'year': max(years)}))
+    pipeline.add(Stage('charts', charts, inputs=('filings', 'competitors', 'ratios', 'competitor_ratios')))
+    pipeline.add(Stage(
+        'save_results', save_results,
+        inputs=('materiality', 'components', 'ratios', 'competitor_ratios', 'ledger_aggregates', 'charts'),
+        targets=(os.path.join(output_dir, "results.json"),), params={'output_dir': output_dir},
+    ))
+    return pipeline
+
+
+# USAGE
+# pipeline = report_pipeline()
+# print(pipeline.run())  # first run executes every stage
+# print(pipeline.run())  # nothing changed: every stage is skipped
+# print(pipeline.load('ratios'))
+# pipeline.prune()  # delete artifacts of earlier runs
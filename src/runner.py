@@ -0,0 +1,212 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Optional
+
+import pandas as pd
+
+from components import ComponentsFR, ComponentsLedger, RatioAnalysis
+from journal import JournalDataset
+from materiality import MaterialityScreen
+from utilities import ResultsStore
+
+
+MANIFEST_COLUMNS = ('company', 'report_path', 'journal_path')
+LEDGER_GROUPS = {'inventory': '13', 'cash': '24', 'customers': list(ComponentsLedger.CUSTOMER_PREFIXES)}
+
+
+def load_manifest(manifest: str | pd.DataFrame | list) -> list[dict]:
+    """
+    Read a portfolio manifest.
+
+    Parameters:
+    - manifest: Path to a CSV/Parquet file, a DataFrame or a list of dicts with the columns
+      'company', 'report_path' and optionally 'journal_path' (a path or glob of journal Parquet files).
+
+    Returns:
+    - List of manifest entries as dicts.
+    """
+    if isinstance(manifest, str):
+        manifest = pd.read_parquet(manifest) if manifest.endswith('.parquet') else pd.read_csv(manifest, dtype=str)
+    if isinstance(manifest, list):
+        manifest = pd.DataFrame(manifest)
+
+    missing = [column for column in MANIFEST_COLUMNS[:2] if column not in manifest.columns]
+    if missing:
+        raise ValueError(f"Manifest is missing columns: {missing}.")
+    if 'journal_path' not in manifest.columns:
+        manifest = manifest.assign(journal_path=None)
+
+    entries = manifest[list(MANIFEST_COLUMNS)].to_dict(orient='records')
+    for entry in entries:
+        if not isinstance(entry['journal_path'], str):
+            entry['journal_path'] = None
+    return entries
+
+
+def analyse_company(entry: dict) -> dict[str, pd.DataFrame]:
+    """
+    Default per-company workload, the analysis of the demo notebook: components, ratios and
+    materiality from the report and, with a journal, ledger totals and customer activity.
+
+    Parameters:
+    - entry: Manifest entry with 'company', 'report_path' and optionally 'journal_path'.
+
+    Returns:
+    - Dictionary of result tables: 'components' (every registered component per year),
+      'ratios', 'thresholds' and 'material_positions' and, with a journal, 'ledger_monthly'
+      (per account class), 'ledger_aggregates' (monthly and weekly inventory, cash and
+      customer totals), 'customer_frequency' and 'customer_cohorts'.
+    """
+    report = pd.read_parquet(entry['report_path'])
+    comp_obj = ComponentsFR(report)
+    values = comp_obj.evaluate()
+    components = pd.DataFrame(
+        {name: values[name] for name in comp_obj.registry.formulas if name not in comp_obj.registry.ratios},
+        index=pd.Index(comp_obj.periods, name='year'),
+    )
+    screen = MaterialityScreen(report, company=entry['company'], fr_component_obj=comp_obj)
+
+    results = {
+        'components': components.reset_index(),
+        'ratios': RatioAnalysis(report, comp_obj).ratio_table().reset_index(),
+        'thresholds': screen.thresholds().drop(columns='company'),
+        'material_positions': screen.positions().drop(columns='company'),
+    }
+
+    if entry.get('journal_path'):
+        ledger = JournalDataset(entry['journal_path']).ledger(build_cube=True)
+        monthly = []
+        for account_class in map(str, range(10)):
+            totals = ledger.sum_account_data_by_period(account_class, 'month')
+            monthly.append(totals.assign(account_class=account_class))
+        results['ledger_monthly'] = pd.concat(monthly, ignore_index=True)
+
+        aggregates = []
+        for group, prefixes in LEDGER_GROUPS.items():
+            for by in ['month', 'week']:
+                totals = ledger.sum_account_data_by_period(prefixes, by).rename(columns={by: 'period'})
+                aggregates.append(totals.assign(group=group, by=by))
+        results['ledger_aggregates'] = pd.concat(aggregates, ignore_index=True)
+        results['customer_frequency'] = ledger.customer_frequency('month')
+        results['customer_cohorts'] = ledger.customer_cohorts('year').reset_index()
+
+    return results
+
+
+def _run_chunk(task: Callable, entries: list[dict]) -> list[tuple]:
+    """Run the task for each entry of a chunk; one company's failure does not affect the others."""
+    outcomes = []
+    for entry in entries:
+        try:
+            results = task(entry)
+            if not isinstance(results, dict) or not all(isinstance(table, pd.DataFrame) for table in results.values()):
+                raise TypeError(f"The task must return a dict of DataFrames, not {type(results).__name__}.")
+            outcomes.append((entry['company'], results, None))
+        except Exception:
+            outcomes.append((entry['company'], None, traceback.format_exc()))
+    return outcomes
+
+
+def _chunk_outcomes(future, entries: list[dict]) -> list[tuple]:
+    """Outcomes of a finished chunk; if the chunk itself failed (e.g. a crashed worker), every company in it failed."""
+    try:
+        outcomes = future.result()
+        if not isinstance(outcomes, list) or len(outcomes) != len(entries):
+            raise TypeError(f"The chunk returned {type(outcomes).__name__} instead of one outcome per company.")
+        return outcomes
+    except Exception:
+        error = traceback.format_exc()
+        return [(entry['company'], None, error) for entry in entries]
+
+
+class PortfolioRunner:
+    def __init__(self, max_workers: Optional[int] = None, chunk_size: int = 10,
+                 task: Callable[[dict], dict] = analyse_company, progress: Optional[Callable[[dict], None]] = None) -> None:
+        """
+        Run a per-company analysis for a whole portfolio over a process pool.
+
+        Parameters:
+        - max_workers: Number of worker processes. Default is the number of CPUs.
+        - chunk_size: Companies sent to a worker at once. Larger chunks amortize
+          process communication, smaller ones balance load better.
+        - task: Module-level function taking a manifest entry and returning a dict of DataFrames.
+        - progress: Optional callable receiving each row of the returned 'progress' table as
+          a dict when its chunk finishes, e.g. to log it. Default is None.
+        """
+        self.max_workers = max_workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.task = task
+        self.progress = progress
+
+    def run(self, manifest: str | pd.DataFrame | list, store: Optional[str | ResultsStore] = None) -> dict[str, pd.DataFrame]:
+        """
+        Shard the manifest across the pool and consolidate the per-company results.
+
+        Every result table gets a 'company' column. With `store`, each finished chunk is
+        saved straight to the results store as '<company>/<table>', so results are not
+        accumulated in memory. Failed companies, including every company of a chunk whose
+        worker crashed, are reported with their traceback instead of stopping the run.
+
+        Parameters:
+        - manifest: Manifest path, DataFrame or list of entries (see `load_manifest`).
+        - store: Optional `ResultsStore`, or the path of one opened and committed for this run.
+
+        Returns:
+        - Dictionary of consolidated tables (empty of result tables when saved to
+          `store`) plus 'failures' with the columns 'company' and 'error', and 'progress'
+          with one row per finished chunk: the companies 'processed' and 'failed' so far out
+          of 'companies', and the 'seconds' since the start.
+        """
+        if isinstance(store, str):
+            with ResultsStore(store) as results_store:
+                return self.run(manifest, results_store)
+
+        entries = load_manifest(manifest)
+        chunks = [entries[i:i + self.chunk_size] for i in range(0, len(entries), self.chunk_size)]
+
+        tables = {}
+        failures = []
+        progress = []
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(_run_chunk, self.task, chunk): chunk for chunk in chunks}
+
+            for future in as_completed(futures):
+                for company, results, error in _chunk_outcomes(future, futures[future]):
+                    if error is not None:
+                        failures.append({'company': company, 'error': error})
+                        continue
+                    for name, table in results.items():
+                        table = table.assign(company=company)
+                        if store is not None:
+                            store.save(f"{company}/{name}", table)
+                        else:
+                            tables.setdefault(name, []).append(table)
+
+                processed = (progress[-1]['processed'] if progress else 0) + len(futures[future])
+                progress.append({
+                    'processed': processed, 'companies': len(entries), 'failed': len(failures),
+                    'seconds': time.perf_counter() - start,
+                })
+                if self.progress:
+                    self.progress(progress[-1])
+
+        consolidated = {name: pd.concat(frames, ignore_index=True) for name, frames in tables.items()}
+        consolidated['failures'] = pd.DataFrame(failures, columns=['company', 'error'])
+        consolidated['progress'] = pd.DataFrame(progress, columns=['processed', 'companies', 'failed', 'seconds'])
+        return consolidated
+
+
+# USAGE
+# manifest = [
+#     {"company": "company", "report_path": "data/parquet/financial_reports.parquet",
+#      "journal_path": "data/parquet/financial_journal_*.parquet"},
+# ]
+# results = PortfolioRunner(max_workers=4, chunk_size=25, progress=print).run(manifest)
+# print(results['ratios'].head())
+# PortfolioRunner(max_workers=4).run(manifest, store="data/portfolio_results.db")
+# with ResultsStore("data/portfolio_results.db") as store:
+#     print(store.load("company/ratios"))
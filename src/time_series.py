@@ -0,0 +1,193 @@
+import warnings
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Rates are returned in percent. A change against a zero or missing value is NaN, never inf.
+
+
+def _as_array(values: pd.DataFrame | pd.Series | np.ndarray) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+
+def _wrap(result: np.ndarray, values: pd.DataFrame | pd.Series | np.ndarray) -> pd.DataFrame | pd.Series | np.ndarray:
+    """Give a result of the input's shape the input's index and columns."""
+    if isinstance(values, pd.DataFrame):
+        return pd.DataFrame(result, index=values.index, columns=values.columns)
+    if isinstance(values, pd.Series):
+        return pd.Series(result, index=values.index, name=values.name)
+    return result
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def _shift(values: np.ndarray, periods: int, axis: int) -> np.ndarray:
+    """Shift along an axis, filling the vacated positions with NaN."""
+    shifted = np.full_like(values, np.nan)
+    length = values.shape[axis]
+    if abs(periods) >= length:
+        return shifted
+
+    source = [slice(None)] * values.ndim
+    target = [slice(None)] * values.ndim
+    if periods >= 0:
+        source[axis], target[axis] = slice(0, length - periods), slice(periods, length)
+    else:
+        source[axis], target[axis] = slice(-periods, length), slice(0, length + periods)
+    shifted[tuple(target)] = values[tuple(source)]
+    return shifted
+
+
+def pct_change(values: pd.DataFrame | pd.Series | np.ndarray, periods: int = 1,
+               axis: int = 0) -> pd.DataFrame | pd.Series | np.ndarray:
+    """
+    Percentage change against the value `periods` positions earlier, for every series at once.
+
+    Parameters:
+    - values: Periods along `axis` (rows of a DataFrame by default), one series per column.
+    - periods: Distance to the compared period. Default is 1.
+    - axis: Period axis. Default is 0.
+
+    Returns:
+    - Changes in percent with the input's shape. The first `periods` positions and
+      changes against zero or NaN are NaN.
+    """
+    array = _as_array(values)
+    previous = _shift(array, periods, axis)
+    return _wrap(_divide(array - previous, previous) * 100, values)
+
+
+def base_index(values: pd.DataFrame | pd.Series | np.ndarray, base_position: int = 0,
+               base: float = 100.0, axis: int = 0) -> pd.DataFrame | pd.Series | np.ndarray:
+    """
+    Index every series to `base` at one period, e.g. 100 in the first year.
+
+    Parameters:
+    - values: Periods along `axis`, one series per column.
+    - base_position: Position of the base period. Default is 0.
+    - base: Index value of the base period. Default is 100.
+    - axis: Period axis. Default is 0.
+
+    Returns:
+    - Index values with the input's shape; series whose base value is zero or NaN are NaN.
+    """
+    array = _as_array(values)
+    base_values = np.take(array, [base_position], axis=axis)
+    return _wrap(_divide(array, base_values) * base, values)
+
+
+def cagr(values: pd.DataFrame | pd.Series | np.ndarray, periods: Optional[int] = None,
+         axis: int = 0) -> pd.Series | float | np.ndarray:
+    """
+    Compound annual growth rate from the first to the last period, in percent.
+
+    Parameters:
+    - values: Periods along `axis`, one series per column.
+    - periods: Number of years between the first and the last value. Default is the number of periods - 1.
+    - axis: Period axis. Default is 0.
+
+    Returns:
+    - One rate per series (a Series for a DataFrame). NaN where the first value is
+      zero, NaN or of a different sign than the last value.
+    """
+    array = _as_array(values)
+    first = np.take(array, 0, axis=axis)
+    last = np.take(array, -1, axis=axis)
+    years = array.shape[axis] - 1 if periods is None else periods
+
+    ratio = _divide(last, first)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = np.where((ratio >= 0) & (years > 0), (ratio ** (1 / max(years, 1)) - 1) * 100, np.nan)
+
+    if isinstance(values, pd.DataFrame):
+        return pd.Series(result, index=values.columns if axis == 0 else values.index, name='cagr')
+    if np.ndim(result) == 0:
+        return float(result)
+    return result
+
+
+def rolling(values: pd.DataFrame | pd.Series | np.ndarray, window: int,
+            func: Literal['mean', 'sum', 'min', 'max'] = 'mean', min_periods: Optional[int] = None,
+            axis: int = 0) -> pd.DataFrame | pd.Series | np.ndarray:
+    """
+    Trailing rolling-window statistic over every series at once, ignoring NaN values.
+
+    Parameters:
+    - values: Periods along `axis`, one series per column.
+    - window: Number of periods in the window.
+    - func: Statistic ('mean', 'sum', 'min' or 'max'). Default is 'mean'.
+    - min_periods: Non-NaN values needed for a result. Default is `window`.
+    - axis: Period axis. Default is 0.
+
+    Returns:
+    - Rolling values with the input's shape; NaN while the window has fewer than `min_periods` values.
+    """
+    reducers = {'mean': np.nanmean, 'sum': np.nansum, 'min': np.nanmin, 'max': np.nanmax}
+    if func not in reducers:
+        raise ValueError("The argument 'func' must be 'mean', 'sum', 'min', or 'max'.")
+    if window < 1:
+        raise ValueError("The argument 'window' must be at least 1.")
+    min_periods = window if min_periods is None else min_periods
+
+    array = np.moveaxis(_as_array(values), axis, -1)
+    padding = [(0, 0)] * (array.ndim - 1) + [(window - 1, 0)]
+    windows = np.lib.stride_tricks.sliding_window_view(np.pad(array, padding, constant_values=np.nan), window, axis=-1)
+
+    counts = np.sum(~np.isnan(windows), axis=-1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        result = reducers[func](windows, axis=-1)
+    result = np.where(counts >= max(min_periods, 1), result, np.nan)
+
+    return _wrap(np.moveaxis(result, -1, axis), values)
+
+
+def year_over_year(data: pd.DataFrame, value_columns: Optional[list] = None,
+                   by: Literal['month', 'week'] = 'month', year_column: str = 'year') -> pd.DataFrame:
+    """
+    Change of every period against the same month or ISO week of the previous year.
+
+    The input is the long output of `ComponentsLedger.sum_account_data_by_period`.
+    Missing periods are filled with 0 on a dense year x period grid (months 1-12,
+    weeks 1-53), so a period without entries counts as zero and not as a gap.
+
+    Parameters:
+    - data: DataFrame with the year column, the `by` column and value columns.
+    - value_columns: Columns to compare. Default is every column except year and period.
+    - by: Period column ('month' or 'week'). Default is 'month'.
+    - year_column: Year column. Default is 'year'.
+
+    Returns:
+    - DataFrame on the dense grid with year, period, the values and a '<column>_yoy'
+      change in percent per value column (NaN in the first year and against zero).
+    """
+    if by not in ['month', 'week']:
+        raise ValueError("The argument 'by' must be 'month' or 'week'.")
+    value_columns = [column for column in data.columns if column not in (year_column, by)] if value_columns is None else value_columns
+
+    years = np.arange(data[year_column].min(), data[year_column].max() + 1) if len(data) else np.array([], dtype=int)
+    periods = np.arange(1, 13 if by == 'month' else 54)
+    grid = pd.MultiIndex.from_product([years, periods], names=[year_column, by])
+
+    dense = data.groupby([year_column, by])[value_columns].sum().reindex(grid, fill_value=0)
+    values = dense.to_numpy(dtype=float).reshape(len(years), len(periods), len(value_columns))
+    changes = pct_change(values, axis=0).reshape(-1, len(value_columns))
+
+    result = dense.reset_index()
+    for i, column in enumerate(value_columns):
+        result[f'{column}_yoy'] = changes[:, i]
+    return result
+
+
+# USAGE
+# ledger = ComponentsLedger(df)
+# yearly = ledger.sum_account_data_by_period(['200', '201', '204', '205'], 'year').set_index('year')
+# print(pct_change(yearly), base_index(yearly), cagr(yearly))
+# monthly = ledger.sum_account_data_by_period('13', 'month')
+# print(year_over_year(monthly, ['debit']))
+# print(rolling(monthly[['debit', 'credit']], 3))
@@ -1,23 +1,69 @@
+import ast
+import glob
 import json
 import os
+import re
 import numpy as np
 import pandas as pd
 import duckdb
 import sqlite3
-from typing import Any
+from datetime import datetime
+from typing import Any, Optional
 
 
 class Utilities:
+    ACCOUNT_NOT_FOUND = "Konto nije pronađen"
+    _account_map_cache = {}
+
+    @staticmethod
+    def load_account_map(account_map_path: Optional[str] = None) -> dict:
+        """
+        Account map (3-digit account -> description), loaded once per process.
+
+        The file is re-read only when its modification time changes.
+        """
+        if account_map_path is None:
+            account_map_path = os.path.join(os.path.dirname(__file__), "../data/accounts_map.json")
+
+        mtime = os.path.getmtime(account_map_path)
+        cached = Utilities._account_map_cache.get(account_map_path)
+
+        if cached is None or cached[0] != mtime:
+            with open(account_map_path, "r", encoding="utf-8") as file:
+                cached = (mtime, json.load(file))
+            Utilities._account_map_cache[account_map_path] = cached
+
+        return cached[1]
 
     @staticmethod
     def get_account_description(account: str) -> str:
-        account_map_path = os.path.join(os.path.dirname(__file__), "../data/accounts_map.json")
-        account = account[:3]
+        account_map = Utilities.load_account_map()
+        return account_map.get(account[:3], Utilities.ACCOUNT_NOT_FOUND)
+
+    @staticmethod
+    def describe_accounts(accounts: pd.Series, account_map_path: Optional[str] = None) -> pd.Series:
+        """
+        Attach account descriptions to a whole account column in one pass.
+
+        Accounts are dictionary-encoded first, so the 3-digit prefix is looked up once
+        per distinct account instead of once per row.
 
-        with open(account_map_path, "r", encoding="utf-8") as file:
-            account_map = json.load(file)
+        Parameters:
+        - accounts: Series of account codes.
+        - account_map_path: Optional path to the account map JSON.
 
-        return account_map.get(account[:3], "Konto nije pronađen")
+        Returns:
+        - Categorical Series of descriptions with the same index as `accounts`.
+        """
+        account_map = Utilities.load_account_map(account_map_path)
+
+        codes, uniques = pd.factorize(accounts)
+        descriptions = pd.Index(uniques.astype(str)).str[:3].map(account_map).fillna(Utilities.ACCOUNT_NOT_FOUND)
+        description_codes, categories = pd.factorize(np.append(descriptions.to_numpy(dtype=object), Utilities.ACCOUNT_NOT_FOUND))
+
+        # Missing accounts (code -1) pick the trailing "not found" entry.
+        row_codes = description_codes[codes]
+        return pd.Series(pd.Categorical.from_codes(row_codes, categories), index=accounts.index, name='description')
     
     @staticmethod
     def convert_csv_to_parquet(csv_file_path):
@@ -36,17 +82,140 @@ class Utilities:
         return f"File {filename_without_ext} successfully converted to parquet format"
 
     @staticmethod
-    def save_results(database_fullname: str, description: str, result: dict):
-        result_converted = Utilities._convert_to_native_types(result)
-
-        conn = sqlite3.connect(database_fullname)
-        # Use INSERT OR REPLACE to update if description exists
-        conn.execute("""
-            INSERT OR REPLACE INTO results (description, result) 
-            VALUES (?, ?)
-        """, (description, str(result_converted)))
-        conn.commit()
+    def _csv_files(source: str | list) -> list:
+        """Expand a directory, a glob pattern or a list of them into a sorted list of CSV files."""
+        patterns = [source] if isinstance(source, str) else list(source)
+        files = []
+        for pattern in patterns:
+            if os.path.isdir(pattern):
+                pattern = os.path.join(pattern, "*.csv")
+            files.extend(glob.glob(pattern))
+
+        if not files:
+            raise ValueError(f"No CSV files found for {source}.")
+        return sorted(file.replace("\\", "/") for file in files)
+
+    @staticmethod
+    def convert_journal_csvs_to_parquet(source: str | list, output_dir: str, partition_by_account_class: bool = False,
+                                        amount_type: str = "DOUBLE", date_format: str = "%m/%d/%Y",
+                                        row_group_size: int = 122880, memory_limit: str = "2GB",
+                                        rejected_path: Optional[str] = None) -> str:
+        """
+        Bulk-convert journal CSVs into year-partitioned Parquet with an explicit schema.
+
+        DuckDB streams the CSVs in vector-sized chunks, spilling to disk above
+        `memory_limit`, so memory stays bounded whatever the input size. No type
+        inference is done. 'account' is read as text (leading zeros are kept), 'date'
+        as DATE (ISO dates, or `date_format`) and amounts as `amount_type`. Rows are sorted by account and date
+        within each partition, so row-group statistics prune prefix and date scans.
+
+        Each conversion appends new uniquely named files to the partitions, so later
+        drops of CSVs add to the earlier ones instead of replacing them. Rows whose date
+        cannot be parsed are not loaded; they are written with their source file to
+        `rejected_path` instead of failing the whole conversion.
+
+        Parameters:
+        - source: Directory, glob pattern or list of journal CSV files (columns date, account, debit, credit).
+        - output_dir: Target directory; files are written as output_dir/year=YYYY[/account_class=N]/*.parquet.
+        - partition_by_account_class: Also partition by the first digit of the account. Default is False.
+        - amount_type: DuckDB type for debit/credit, e.g. 'DOUBLE' or 'DECIMAL(18,2)'. Default is 'DOUBLE'.
+        - date_format: strptime format for dates that are not ISO formatted. Default is '%m/%d/%Y'.
+        - row_group_size: Rows per Parquet row group. Default is 122880.
+        - memory_limit: DuckDB memory limit for the conversion. Default is '2GB'.
+        - rejected_path: CSV file for rows with unparseable dates. Default is
+          output_dir/rejected/journal_rejected_<timestamp>.csv, only written when rows are rejected.
+
+        Returns:
+        - Status message.
+        """
+        if not re.fullmatch(r"DOUBLE|DECIMAL\(\d+,\s*\d+\)", amount_type):
+            raise ValueError("The argument 'amount_type' must be 'DOUBLE' or 'DECIMAL(p,s)'.")
+        if not re.fullmatch(r"\d+(\.\d+)?\s*[KMGT]i?B", memory_limit):
+            raise ValueError("The argument 'memory_limit' must look like '512MB' or '2GB'.")
+
+        csv_files = Utilities._csv_files(source)
+        default_rejected_path = rejected_path is None
+        if default_rejected_path:
+            rejected_path = os.path.join(output_dir, "rejected", f"journal_rejected_{datetime.now():%Y%m%d_%H%M%S_%f}.csv")
+        os.makedirs(os.path.dirname(rejected_path) or ".", exist_ok=True)
+        output_dir = output_dir.replace("\\", "/").replace("'", "''")
+        rejected_file = rejected_path.replace("\\", "/").replace("'", "''")
+        partitions = "year, account_class" if partition_by_account_class else "year"
+        account_class = ", left(account, 1) AS account_class" if partition_by_account_class else ""
+
+        conn = duckdb.connect()
+        conn.execute(f"SET memory_limit = '{memory_limit}'")
+        journal_rows = f"""
+            SELECT filename AS source, date AS raw_date,
+                   COALESCE(TRY_CAST(date AS DATE), CAST(TRY_STRPTIME(date, ?) AS DATE)) AS date, account, debit, credit
+            FROM read_csv(?, header = true, union_by_name = true, filename = true,
+                          columns = {{'date': 'VARCHAR', 'account': 'VARCHAR', 'debit': '{amount_type}', 'credit': '{amount_type}'}})
+        """
+        converted = conn.execute(f"""
+            COPY (
+                SELECT date, account, debit, credit, year(date) AS year{account_class}
+                FROM ({journal_rows})
+                WHERE date IS NOT NULL
+                ORDER BY account, date
+            )
+            TO '{output_dir}'
+            (FORMAT PARQUET, PARTITION_BY ({partitions}), ROW_GROUP_SIZE {int(row_group_size)},
+             APPEND true, FILENAME_PATTERN 'journal_{{uuid}}')
+        """, [date_format, csv_files]).fetchone()[0]
+        rejected = conn.execute(f"""
+            COPY (SELECT source, raw_date AS date, account, debit, credit FROM ({journal_rows}) WHERE date IS NULL)
+            TO '{rejected_file}' (HEADER, DELIMITER ',')
+        """, [date_format, csv_files]).fetchone()[0]
         conn.close()
+
+        message = f"{len(csv_files)} journal files successfully converted to parquet format in {output_dir} ({converted} rows)"
+        if rejected:
+            return message + f"; {rejected} rows with unparseable dates written to {rejected_path}"
+        os.remove(rejected_path)
+        if default_rejected_path and not os.listdir(os.path.dirname(rejected_path)):
+            os.rmdir(os.path.dirname(rejected_path))
+        return message
+
+    @staticmethod
+    def convert_report_csvs_to_parquet(source: str | list, output_dir: Optional[str] = None, aop_width: int = 4) -> str:
+        """
+        Bulk-convert financial report CSVs to Parquet, keeping AOP codes as zero-padded text.
+
+        Parameters:
+        - source: Directory, glob pattern or list of report CSV files (columns AOP, description, values...).
+        - output_dir: Target directory. Default is next to each CSV.
+        - aop_width: Width AOP codes are zero-padded to. Default is 4.
+
+        Returns:
+        - Status message.
+        """
+        csv_files = Utilities._csv_files(source)
+
+        conn = duckdb.connect()
+        for csv_file_path in csv_files:
+            directory_path = output_dir if output_dir is not None else os.path.dirname(csv_file_path)
+            filename_without_ext = os.path.splitext(os.path.basename(csv_file_path))[0]
+            parquet_file_path = os.path.join(directory_path, filename_without_ext + ".parquet").replace("\\", "/")
+
+            conn.execute(f"""
+                COPY (
+                    SELECT * REPLACE (lpad(AOP, {int(aop_width)}, '0') AS AOP)
+                    FROM read_csv(?, header = true, types = {{'AOP': 'VARCHAR', 'description': 'VARCHAR'}})
+                )
+                TO '{parquet_file_path.replace("'", "''")}'
+                (FORMAT PARQUET)
+            """, [csv_file_path])
+        conn.close()
+
+        return f"{len(csv_files)} report files successfully converted to parquet format"
+
+    @staticmethod
+    def save_results(database_fullname: str, description: str, result: dict):
+        """
+        Save a single result. For many results use `ResultsStore` directly, which commits them together.
+        """
+        with ResultsStore(database_fullname) as store:
+            store.save(description, result)
     # def save_results(database_fullname: str, description: str, result: dict):
     #     result_converted = Utilities._convert_to_native_types(result)
 
@@ -56,29 +225,315 @@ class Utilities:
     #     conn.commit()
     #     conn.close()
 
+    PANDAS_TAG = "__pandas__"
+
+    @staticmethod
+    def _column_to_native(values) -> list:
+        """
+        Convert a whole column or array to a list of native Python values in one vectorized step.
+
+        Missing and non-finite values (NaN, inf, NaT, None, pd.NA) become None, datetimes become ISO strings.
+        Only object columns are walked element by element, for nested values.
+        """
+        if isinstance(values, (pd.Series, pd.Index)) and not isinstance(values.dtype, np.dtype):
+            values = values.astype(object)
+        array = np.asarray(values)
+
+        if array.dtype.kind in "iub":
+            return array.tolist()
+        if array.dtype.kind == "f":
+            native = array.astype(object)
+            native[~np.isfinite(array)] = None
+            return native.tolist()
+        if array.dtype.kind == "M":
+            native = np.datetime_as_string(array, unit=np.datetime_data(array.dtype)[0]).astype(object)
+            native[np.isnat(array)] = None
+            return native.tolist()
+        if array.dtype.kind == "m":
+            native = (array / np.timedelta64(1, "s")).astype(object)
+            native[np.isnat(array)] = None
+            return native.tolist()
+        if array.dtype.kind in "US":
+            return array.tolist()
+
+        native = array.astype(object)
+        missing = pd.isna(native)
+        if missing.any():
+            native[missing] = None
+        return [Utilities._convert_to_native_types(value) for value in native.tolist()]
+
+    @staticmethod
+    def _index_to_native(index: pd.Index) -> Optional[dict]:
+        if isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1 and index.name is None:
+            return None
+        levels = [index.get_level_values(i) for i in range(index.nlevels)]
+        return {
+            "names": list(index.names),
+            "levels": [Utilities._column_to_native(level) for level in levels],
+            "dtypes": [str(level.dtype) for level in levels],
+        }
+
     @staticmethod
     def _convert_to_native_types(obj):
         """
         Convert numpy types, pandas types, and other non-native Python types to native Python types.
         This avoids issues with JSON serialization.
+
+        DataFrames, Series and arrays are encoded column by column as tagged dicts
+        (see `_restore_native_types` for the way back), without building a Python
+        object per row. Missing and non-finite values become None, so the output is valid JSON.
         """
-        if isinstance(obj, pd.Timestamp):
-            return obj.isoformat() 
-        elif isinstance(obj, (np.int64, np.int32)):  
-            return int(obj)
-        elif isinstance(obj, (np.float64, np.float32)): 
-            return float(obj)
-        elif isinstance(obj, pd.Series):  
-            return obj.tolist()
-        elif isinstance(obj, pd.DataFrame): 
-            return obj.to_dict(orient='records')
-        elif isinstance(obj, dict): 
-            return {k: Utilities._convert_to_native_types(v) for k, v in obj.items()}
+        if obj is None or isinstance(obj, (str, bool, int)):
+            return obj
+        elif isinstance(obj, float):
+            return obj if np.isfinite(obj) else None
+        elif isinstance(obj, (pd.Timestamp, np.datetime64)):
+            return None if pd.isna(obj) else pd.Timestamp(obj).isoformat()
+        elif isinstance(obj, np.generic):
+            value = obj.item()
+            return None if isinstance(value, float) and not np.isfinite(value) else value
+        elif obj is pd.NA or obj is pd.NaT:
+            return None
+        elif isinstance(obj, pd.DataFrame):
+            return {
+                Utilities.PANDAS_TAG: "DataFrame",
+                "columns": Utilities._column_to_native(obj.columns),
+                "index": Utilities._index_to_native(obj.index),
+                "data": [Utilities._column_to_native(obj.iloc[:, i]) for i in range(obj.shape[1])],
+                "dtypes": [str(dtype) for dtype in obj.dtypes],
+            }
+        elif isinstance(obj, pd.Series):
+            return {
+                Utilities.PANDAS_TAG: "Series",
+                "name": Utilities._convert_to_native_types(obj.name),
+                "index": Utilities._index_to_native(obj.index),
+                "data": Utilities._column_to_native(obj),
+                "dtype": str(obj.dtype),
+            }
+        elif isinstance(obj, np.ndarray):
+            return {
+                Utilities.PANDAS_TAG: "ndarray",
+                "shape": list(obj.shape),
+                "data": Utilities._column_to_native(obj.ravel()),
+                "dtype": str(obj.dtype),
+            }
+        elif isinstance(obj, dict):
+            return {Utilities._convert_to_native_types(k): Utilities._convert_to_native_types(v) for k, v in obj.items()}
+        elif isinstance(obj, (list, tuple)):
+            return [Utilities._convert_to_native_types(item) for item in obj]
         return obj 
 
+    @staticmethod
+    def _restore_column(data: list, dtype: str) -> pd.Series:
+        """Rebuild a column with its original dtype where the values allow it (e.g. no missing integers)."""
+        column = pd.Series(data, dtype=object)
+        try:
+            return column.astype(dtype)
+        except (TypeError, ValueError):
+            return pd.Series(data)
 
+    @staticmethod
+    def _restore_index(index: Optional[dict], length: int) -> pd.Index:
+        if index is None:
+            return pd.RangeIndex(length)
+        levels = [Utilities._restore_column(level, dtype) for level, dtype in zip(index["levels"], index["dtypes"])]
+        if len(levels) == 1:
+            return pd.Index(levels[0], name=index["names"][0])
+        return pd.MultiIndex.from_arrays(levels, names=index["names"])
 
-        conn.close()
+    @staticmethod
+    def _restore_native_types(obj):
+        """
+        Decode the output of `_convert_to_native_types` (after a JSON round trip) back to pandas/NumPy objects.
+        """
+        if isinstance(obj, list):
+            return [Utilities._restore_native_types(item) for item in obj]
+        if not isinstance(obj, dict):
+            return obj
+
+        kind = obj.get(Utilities.PANDAS_TAG)
+        if kind == "DataFrame":
+            columns = [Utilities._restore_column(data, dtype) for data, dtype in zip(obj["data"], obj["dtypes"])]
+            length = len(columns[0]) if columns else 0
+            df = pd.concat(columns, axis=1) if columns else pd.DataFrame(index=range(length))
+            df.columns = obj["columns"]
+            df.index = Utilities._restore_index(obj["index"], length)
+            return df
+        if kind == "Series":
+            series = Utilities._restore_column(obj["data"], obj["dtype"])
+            series.index = Utilities._restore_index(obj["index"], len(series))
+            series.name = obj["name"]
+            return series
+        if kind == "ndarray":
+            return np.array(obj["data"], dtype=obj["dtype"]).reshape(obj["shape"])
+
+        return {key: Utilities._restore_native_types(value) for key, value in obj.items()}
+
+    @staticmethod
+    def _json_default(obj):
+        """Fallback for `json.dumps` on NumPy scalars/arrays and timestamps left after conversion."""
+        if isinstance(obj, (np.generic, pd.Timestamp)):
+            return Utilities._convert_to_native_types(obj)
+        elif isinstance(obj, np.ndarray):
+            return Utilities._column_to_native(obj.ravel()) if obj.ndim == 1 else [Utilities._json_default(row) for row in obj]
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    LEGACY_NAMES = {"nan": float("nan"), "inf": float("inf"), "NaT": None, "True_": True, "False_": False}
+
+    @staticmethod
+    def _parse_legacy(text: str) -> Any:
+        """
+        Parse a result saved as the str() repr of a dict by the former `save_results`.
+
+        Like `ast.literal_eval`, but also accepts what those reprs contain besides literals:
+        nan, inf, NaT, Timestamp('...') and NumPy scalars such as np.float64(1.5).
+        """
+        def value(node: ast.AST) -> Any:
+            if isinstance(node, ast.Constant):
+                return node.value
+            if isinstance(node, ast.List):
+                return [value(item) for item in node.elts]
+            if isinstance(node, ast.Tuple):
+                return tuple(value(item) for item in node.elts)
+            if isinstance(node, ast.Set):
+                return {value(item) for item in node.elts}
+            if isinstance(node, ast.Dict):
+                return {value(key): value(item) for key, item in zip(node.keys, node.values)}
+            if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+                operand = value(node.operand)
+                return -operand if isinstance(node.op, ast.USub) else operand
+
+            name = node.attr if isinstance(node, ast.Attribute) else getattr(node, "id", None)
+            if name in Utilities.LEGACY_NAMES:
+                return Utilities.LEGACY_NAMES[name]
+            if isinstance(node, ast.Call) and len(node.args) == 1 and not node.keywords:
+                function = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, "id", "")
+                argument = value(node.args[0])
+                if function == "Timestamp":
+                    return pd.Timestamp(argument)
+                if hasattr(np, function) and isinstance(getattr(np, function), type) and issubclass(getattr(np, function), np.generic):
+                    return getattr(np, function)(argument).item()
+            raise ValueError(f"Unsupported value in legacy result: {ast.unparse(node)[:80]}")
+
+        return value(ast.parse(text.strip(), mode="eval").body)
+
+
+class ResultsStore:
+    def __init__(self, path: str, buffer_size: int = 1000) -> None:
+        """
+        Results store with one long-lived connection and a single transaction per run.
+
+        Results are buffered as JSON text and committed together by `commit` (or on
+        leaving the `with` block). Above `buffer_size` buffered results they are written
+        into the open transaction with `executemany`, without committing, so memory stays
+        bounded and a run still costs one commit. A path ending in '.json' uses a JSON
+        file instead of SQLite: it is read once at open and rewritten once per commit.
+
+        Parameters:
+        - path: SQLite database path, or a '.json' file path.
+        - buffer_size: Number of buffered results written into the open transaction at once. Default is 1000.
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = {}
+        self.is_json = path.endswith(".json")
+        self.conn = None
+        self.json_data = None
+        self.pending = {}
+
+        if self.is_json:
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as file:
+                    self.json_data = json.load(file, parse_constant=lambda constant: None)
+            else:
+                self.json_data = {}
+        else:
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS results (description TEXT PRIMARY KEY, result TEXT)")
+            self.conn.commit()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Commit the results if the block succeeded, roll them back otherwise, and close."""
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
+
+    @staticmethod
+    def _encode(result: Any) -> str:
+        return json.dumps(Utilities._convert_to_native_types(result), ensure_ascii=False, allow_nan=False,
+                          default=Utilities._json_default)
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        """JSON text, or the str() repr written by the former `Utilities.save_results`."""
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return Utilities._parse_legacy(text)
+
+    def save(self, description: str, result: Any) -> None:
+        """Buffer a result; an existing result with the same description is replaced on commit."""
+        self.buffer[description] = self._encode(result)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered results into the open transaction, without committing."""
+        if not self.buffer:
+            return
+
+        if self.is_json:
+            self.pending.update(self.buffer)
+        else:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO results (description, result) VALUES (?, ?)",
+                list(self.buffer.items()),
+            )
+        self.buffer.clear()
+
+    def commit(self) -> None:
+        """Write the buffered results and commit everything saved since the last commit."""
+        self.flush()
+        if self.is_json:
+            if not self.pending:
+                return
+            self.json_data.update({description: json.loads(result) for description, result in self.pending.items()})
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(self.json_data, file, indent=4, ensure_ascii=False, allow_nan=False)
+            os.replace(temp_path, self.path)
+            self.pending.clear()
+        else:
+            self.conn.commit()
+
+    def rollback(self) -> None:
+        """Discard everything saved since the last commit."""
+        self.buffer.clear()
+        self.pending.clear()
+        if self.conn is not None:
+            self.conn.rollback()
+
+    def load(self, description: str) -> Any:
+        """Read a saved result back, with DataFrames, Series and arrays restored; None if it does not exist."""
+        text = self.buffer.get(description, self.pending.get(description))
+        if text is None:
+            if self.is_json:
+                return Utilities._restore_native_types(self.json_data.get(description))
+            row = self.conn.execute("SELECT result FROM results WHERE description = ?", (description,)).fetchone()
+            text = row[0] if row else None
+        return Utilities._restore_native_types(self._decode(text)) if text is not None else None
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
 # database_name = "C:\\xxx.db"
 # description = "Sample description"
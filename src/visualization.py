@@ -4,6 +4,20 @@ import seaborn as sb
 
 
 class FinancialDataVisualization:
+    # Chart texts, also used by the headless ChartRenderer (chart_renderer.py).
+    LABELS = {
+        'company': "Kompanija",
+        'bar_labels': ['konkurent #1', 'konkurent #2', 'konkurent #3', 'konkurent #4', 'konkurent #5', 'kompanija'],
+        'last_year_comparison': "Poređenje poslednje godine sa konkurencijom",
+        'revenue': "prihodi",
+        'revenue_history': "Poređenje: {variable} i prihodi (poslednjih 5 godina poslovanja)",
+        'revenue_competitors': "Poređenje: {variable} i prihodi (konkurencija)",
+        'year': "Godina",
+        'relative_value': "Relativna vrednost",
+        'ratio_history': "Petogodišnji {ratio}",
+        'ratio_competitors': "{ratio} poređenje sa konkurencijom",
+        'competitors_company': "Konkurencija / kompanija",
+    }
 
     @staticmethod
     def aggregate_data_for_comparative_visualization(df_companys_fr: pd.DataFrame, df_competitors_fr: pd.DataFrame, aop_code: str, years: list):
@@ -46,7 +60,7 @@ class FinancialDataVisualization:
         years = [2019, 2020, 2021, 2022, 2023]
 
         plt.subplot(1, 2, 1)
-        plt.plot(years, df_company.loc[0].values, marker='o', color='MediumSeaGreen', label="Kompanija")
+        plt.plot(years, df_company.loc[0].values, marker='o', color='MediumSeaGreen', label=FinancialDataVisualization.LABELS['company'])
         # plt.title(f"Poređenje: {opis} tokom 5 godina", fontsize=10)
         plt.xlabel(opis, fontsize=8)
         plt.ylabel(opis, fontsize=8)
@@ -56,11 +70,11 @@ class FinancialDataVisualization:
 
         plt.subplot(1, 2, 2)
         # bar_labels = df_competitors.columns
-        bar_labels = ['konkurent #1', 'konkurent #2', 'konkurent #3', 'konkurent #4', 'konkurent #5', 'kompanija']
+        bar_labels = FinancialDataVisualization.LABELS['bar_labels']
         bar_values = df_competitors.loc[0]
         bar_colors = ['DarkGray'] * 5 + ['MediumSeaGreen']
         plt.bar(bar_labels, bar_values, color=bar_colors)
-        plt.title("Poređenje poslednje godine sa konkurencijom", fontsize=10)
+        plt.title(FinancialDataVisualization.LABELS['last_year_comparison'], fontsize=10)
         plt.ylabel(opis, fontsize=8)
         plt.xticks(rotation=45)
         plt.grid(axis='y', linestyle='--', alpha=0.6)
@@ -84,22 +98,22 @@ class FinancialDataVisualization:
 
         df_company_2row_normalized = df_company_2row.div(df_company_2row.max(axis=1), axis=0)
         axes[0].bar(df_company_2row_normalized.columns, df_company_2row_normalized.loc["bar_values"], color='CadetBlue', alpha=0.7, label=description_main_var)
-        axes[0].plot(df_company_2row_normalized.columns, df_company_2row_normalized.loc["line_values"], marker='o', color='IndianRed', label="prihodi")
-        axes[0].set_title(f"Poređenje: {description_main_var} i prihodi (poslednjih 5 godina poslovanja)", fontsize=10)
-        axes[0].set_xlabel("Godina", fontsize=10)
-        axes[0].set_ylabel("Relativna vrednost", fontsize=10)
+        axes[0].plot(df_company_2row_normalized.columns, df_company_2row_normalized.loc["line_values"], marker='o', color='IndianRed', label=FinancialDataVisualization.LABELS['revenue'])
+        axes[0].set_title(FinancialDataVisualization.LABELS['revenue_history'].format(variable=description_main_var), fontsize=10)
+        axes[0].set_xlabel(FinancialDataVisualization.LABELS['year'], fontsize=10)
+        axes[0].set_ylabel(FinancialDataVisualization.LABELS['relative_value'], fontsize=10)
         axes[0].legend()
         axes[0].grid(axis='y', linestyle='--', alpha=0.6)
         axes[0].set_xticks(df_company_2row_normalized.columns)
 
-        bar_labels = ['konkurent #1', 'konkurent #2', 'konkurent #3', 'konkurent #4', 'konkurent #5', 'kompanija']
+        bar_labels = FinancialDataVisualization.LABELS['bar_labels']
         df_competition_2rows.index = ["bar_values", "line_values"]
         df_competition_2row_normalized = df_competition_2rows.div(df_competition_2rows.max(axis=1), axis=0)
         bar_colors = ['DarkGray'] * 5 + ['MediumSeaGreen']
         axes[1].bar(df_competition_2row_normalized.columns, df_competition_2row_normalized.loc["line_values"], color=bar_colors, alpha=0.7, label=description_main_var)
-        axes[1].plot(df_competition_2row_normalized.columns, df_competition_2row_normalized.loc["bar_values"], marker='o', color='IndianRed', label="prihodi")
-        axes[1].set_title(f"Poređenje: {description_main_var} i prihodi (konkurencija)", fontsize=10)
-        axes[1].set_xlabel("Godina", fontsize=10)
+        axes[1].plot(df_competition_2row_normalized.columns, df_competition_2row_normalized.loc["bar_values"], marker='o', color='IndianRed', label=FinancialDataVisualization.LABELS['revenue'])
+        axes[1].set_title(FinancialDataVisualization.LABELS['revenue_competitors'].format(variable=description_main_var), fontsize=10)
+        axes[1].set_xlabel(FinancialDataVisualization.LABELS['year'], fontsize=10)
         axes[1].legend()
         axes[1].grid(axis='y', linestyle='--', alpha=0.6)
         # axes[1].set_xticks(bar_labels)
@@ -134,8 +148,8 @@ class FinancialDataVisualization:
         # fig.suptitle(f"Poređenje: {ratio_text} tokom 5 godina", fontsize=16)
         # Left plot
         sb.barplot(x=company_df.columns, y=company_df.iloc[0], ax=axes[0], color=(133/255, 145/255, 155/255, 1))
-        axes[0].set_title(f'Petogodišnji {ratio_text}', fontsize=10)
-        axes[0].set_xlabel('Godina', fontsize=9)
+        axes[0].set_title(FinancialDataVisualization.LABELS['ratio_history'].format(ratio=ratio_text), fontsize=10)
+        axes[0].set_xlabel(FinancialDataVisualization.LABELS['year'], fontsize=9)
         axes[0].set_ylabel(ratio_text, fontsize=9)
 
         # Right plot
@@ -146,9 +160,9 @@ class FinancialDataVisualization:
             if patch.get_x() == competitors_df.columns.get_loc('company') - 0.4: 
                 patch.set_facecolor(last_bar_color)
         
-        bar_labels = ['konkurent #1', 'konkurent #2', 'konkurent #3', 'konkurent #4', 'konkurent #5', 'kompanija']
-        axes[1].set_title(f"{ratio_text} poređenje sa konkurencijom", fontsize=10)
-        axes[1].set_xlabel('Konkurencija / kompanija', fontsize=9)
+        bar_labels = FinancialDataVisualization.LABELS['bar_labels']
+        axes[1].set_title(FinancialDataVisualization.LABELS['ratio_competitors'].format(ratio=ratio_text), fontsize=10)
+        axes[1].set_xlabel(FinancialDataVisualization.LABELS['competitors_company'], fontsize=9)
         axes[1].tick_params(axis='x', rotation=45)
         axes[1].set_ylabel(ratio_text, fontsize=9)
         axes[1].set_xticks(range(len(bar_labels)))
@@ -4,6 +4,20 @@ import seaborn as sb
 
 
 class FinancialDataVisualization:
+    # Chart texts, also used by the headless ChartRenderer (chart_renderer.py).
+    LABELS = {
+        'company': "Company",
+        'bar_labels': ['competitor_1', 'competitor_2', 'competitor_3', 'competitor_4', 'competitor_5', 'company'],
+        'last_year_comparison': "Comparison of the Last Year with Competitors",
+        'revenue': "revenue",
+        'revenue_history': "Comparison: {variable} and revenue (last 5 years)",
+        'revenue_competitors': "Comparison: {variable} and revenue (competitors)",
+        'year': "Year",
+        'relative_value': "Relative value",
+        'ratio_history': "5-year {ratio}",
+        'ratio_competitors': "{ratio} comparison with competitors",
+        'competitors_company': "Competitors / company",
+    }
 
     @staticmethod
     def aggregate_data_for_comparative_visualization(df_companys_fr: pd.DataFrame, df_competitors_fr: pd.DataFrame, aop_code: str, years: list):
@@ -45,7 +59,7 @@ class FinancialDataVisualization:
         years = [2019, 2020, 2021, 2022, 2023]
 
         plt.subplot(1, 2, 1)
-        plt.plot(years, df_company.loc[0].values, marker='o', color='MediumSeaGreen', label="Company")
+        plt.plot(years, df_company.loc[0].values, marker='o', color='MediumSeaGreen', label=FinancialDataVisualization.LABELS['company'])
         plt.xlabel(opis, fontsize=8)
         plt.ylabel(opis, fontsize=8)
         plt.grid(True, linestyle='--', alpha=0.6)
@@ -54,11 +68,11 @@ class FinancialDataVisualization:
 
         plt.subplot(1, 2, 2)
         # bar_labels = df_competitors.columns
-        bar_labels = ['competitor_1', 'competitor_2', 'competitor_3', 'competitor_4', 'competitor_5', 'company']
+        bar_labels = FinancialDataVisualization.LABELS['bar_labels']
         bar_values = df_competitors.loc[0]
         bar_colors = ['DarkGray'] * 5 + ['MediumSeaGreen']
         plt.bar(bar_labels, bar_values, color=bar_colors)
-        plt.title("Comparison of the Last Year with Competitors", fontsize=10)
+        plt.title(FinancialDataVisualization.LABELS['last_year_comparison'], fontsize=10)
         plt.ylabel(opis, fontsize=8)
         plt.xticks(rotation=45)
         plt.grid(axis='y', linestyle='--', alpha=0.6)
@@ -82,22 +96,22 @@ class FinancialDataVisualization:
 
         df_company_2row_normalized = df_company_2row.div(df_company_2row.max(axis=1), axis=0)
         axes[0].bar(df_company_2row_normalized.columns, df_company_2row_normalized.loc["bar_values"], color='CadetBlue', alpha=0.7, label=description_main_var)
-        axes[0].plot(df_company_2row_normalized.columns, df_company_2row_normalized.loc["line_values"], marker='o', color='IndianRed', label="revenue")
-        axes[0].set_title(f"Comparison: {description_main_var} and revenue (last 5 years)", fontsize=10)
-        axes[0].set_xlabel("Year", fontsize=10)
-        axes[0].set_ylabel("Relative value", fontsize=10)
+        axes[0].plot(df_company_2row_normalized.columns, df_company_2row_normalized.loc["line_values"], marker='o', color='IndianRed', label=FinancialDataVisualization.LABELS['revenue'])
+        axes[0].set_title(FinancialDataVisualization.LABELS['revenue_history'].format(variable=description_main_var), fontsize=10)
+        axes[0].set_xlabel(FinancialDataVisualization.LABELS['year'], fontsize=10)
+        axes[0].set_ylabel(FinancialDataVisualization.LABELS['relative_value'], fontsize=10)
         axes[0].legend()
         axes[0].grid(axis='y', linestyle='--', alpha=0.6)
         axes[0].set_xticks(df_company_2row_normalized.columns)
 
-        bar_labels = ['competitor_1', 'competitor_2', 'competitor_3', 'competitor_4', 'competitor_5', 'company']
+        bar_labels = FinancialDataVisualization.LABELS['bar_labels']
         df_competition_2rows.index = ["bar_values", "line_values"]
         df_competition_2row_normalized = df_competition_2rows.div(df_competition_2rows.max(axis=1), axis=0)
         bar_colors = ['DarkGray'] * 5 + ['MediumSeaGreen']
         axes[1].bar(df_competition_2row_normalized.columns, df_competition_2row_normalized.loc["line_values"], color=bar_colors, alpha=0.7, label=description_main_var)
-        axes[1].plot(df_competition_2row_normalized.columns, df_competition_2row_normalized.loc["bar_values"], marker='o', color='IndianRed', label="revenue")
-        axes[1].set_title(f"Comparison: {description_main_var} and revenue (competitors)", fontsize=10)
-        axes[1].set_xlabel("Year", fontsize=10)
+        axes[1].plot(df_competition_2row_normalized.columns, df_competition_2row_normalized.loc["bar_values"], marker='o', color='IndianRed', label=FinancialDataVisualization.LABELS['revenue'])
+        axes[1].set_title(FinancialDataVisualization.LABELS['revenue_competitors'].format(variable=description_main_var), fontsize=10)
+        axes[1].set_xlabel(FinancialDataVisualization.LABELS['year'], fontsize=10)
         axes[1].legend()
         axes[1].grid(axis='y', linestyle='--', alpha=0.6)
         # axes[1].set_xticks(bar_labels)
@@ -132,8 +146,8 @@ class FinancialDataVisualization:
         # fig.suptitle(f"Comparison: {ratio_text} last 5 years", fontsize=16)
         # Left plot
         sb.barplot(x=company_df.columns, y=company_df.iloc[0], ax=axes[0], color=(133/255, 145/255, 155/255, 1))
-        axes[0].set_title(f'5-year {ratio_text}', fontsize=10)
-        axes[0].set_xlabel('Year', fontsize=9)
+        axes[0].set_title(FinancialDataVisualization.LABELS['ratio_history'].format(ratio=ratio_text), fontsize=10)
+        axes[0].set_xlabel(FinancialDataVisualization.LABELS['year'], fontsize=9)
         axes[0].set_ylabel(ratio_text, fontsize=9)
 
         # Right plot
@@ -144,9 +158,9 @@ class FinancialDataVisualization:
             if patch.get_x() == competitors_df.columns.get_loc('company') - 0.4: 
                 patch.set_facecolor(last_bar_color)
         
-        bar_labels = ['competitor_1', 'competitor_2', 'competitor_3', 'competitor_4', 'competitor_5', 'company']
-        axes[1].set_title(f"{ratio_text} comparison with competitors", fontsize=10)
-        axes[1].set_xlabel('Competitors / company', fontsize=9)
+        bar_labels = FinancialDataVisualization.LABELS['bar_labels']
+        axes[1].set_title(FinancialDataVisualization.LABELS['ratio_competitors'].format(ratio=ratio_text), fontsize=10)
+        axes[1].set_xlabel(FinancialDataVisualization.LABELS['competitors_company'], fontsize=9)
         axes[1].tick_params(axis='x', rotation=45)
         axes[1].set_ylabel(ratio_text, fontsize=9)
         axes[1].set_xticks(range(len(bar_labels)))
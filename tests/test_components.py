@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import ComponentsFR
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'parquet')
+
+
+@pytest.fixture(scope='module')
+def financial_reports() -> pd.DataFrame:
+    return pd.read_parquet(os.path.join(DATA_DIR, 'financial_reports.parquet'))
+
+
+def test_missing_lead_operand_only_affects_its_formulas(financial_reports):
+    complete = ComponentsFR(financial_reports)
+    without_0034 = ComponentsFR(financial_reports[financial_reports['AOP'] != '0034'].reset_index(drop=True))
+
+    np.testing.assert_allclose(without_0034.evaluate('current_ratio'), complete.evaluate('current_ratio'))
+    np.testing.assert_allclose(without_0034.evaluate('inventory_turnover'), complete.evaluate('inventory_turnover'))
+    with pytest.raises(ValueError, match='0034'):
+        without_0034.evaluate('prosecne_zalihe_robe')
+
+
+def test_missing_lead_operand_in_stacked_filings(financial_reports):
+    stacked = ComponentsFR.stack_filings(financial_reports, company='A')
+    stacked = stacked[stacked['AOP'] != '0034']
+    results = ComponentsFR(stacked).evaluate()
+
+    assert np.isnan(np.asarray(results['goods_turnover'], dtype=float)).all()
+    assert np.isfinite(np.asarray(results['current_ratio'], dtype=float)).all()
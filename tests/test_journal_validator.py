@@ -0,0 +1,80 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+
+from journal_validator import JournalValidator
+
+
+def batch(dates: list, accounts: list, debit: list, credit: list, amount_type: pa.DataType = pa.float64(),
+          date_type: pa.DataType = pa.date32()) -> pa.RecordBatch:
+    return pa.record_batch({
+        'date': pa.array(dates, date_type),
+        'account': pa.array(accounts, pa.string()).dictionary_encode(),
+        'debit': pa.array(debit, amount_type),
+        'credit': pa.array(credit, amount_type),
+    })
+
+
+def test_rows_without_an_account_form_the_missing_class():
+    day = datetime.date(2023, 1, 2)
+    validator = JournalValidator()
+    validator.update(batch([day] * 4, ['1300', None, 'x', '2410'], [10.0, 0.0, 5.0, 0.0], [0.0, 7.0, 0.0, 8.0]))
+    result = validator.result()
+
+    trial_balance = result['trial_balance'].set_index('account_class')
+    assert trial_balance.loc['missing', ['credit', 'rows']].to_list() == [7.0, 1]
+    assert trial_balance.loc['invalid', ['debit', 'rows']].to_list() == [5.0, 1]
+    assert trial_balance.loc['1', ['debit', 'rows']].to_list() == [10.0, 1]
+    assert trial_balance.loc['2', ['credit', 'rows']].to_list() == [8.0, 1]
+
+    summary = result['summary'].iloc[0]
+    assert summary['missing_values'] == 1
+    assert summary['invalid_account'] == 1
+    assert set(result['issues']['issue']) == {'missing_values', 'invalid_account'}
+
+
+def test_amount_scale_follows_the_layout():
+    day, moment = datetime.date(2023, 1, 2), datetime.datetime(2023, 1, 2)
+    plain = JournalValidator()
+    plain.update(batch([moment] * 2, ['1300', '2410'], [125, 0], [0, 125], amount_type=pa.int64(), date_type=pa.timestamp('ns')))
+    compact = JournalValidator()
+    compact.update(batch([day] * 2, ['1300', '2410'], [125, 0], [0, 125], amount_type=pa.int64()))
+    explicit = JournalValidator(amount_scale=1)
+    explicit.update(batch([day] * 2, ['1300', '2410'], [125, 0], [0, 125], amount_type=pa.int64()))
+
+    assert plain.result()['summary'].loc[0, 'debit'] == 125.0
+    assert compact.result()['summary'].loc[0, 'debit'] == 1.25
+    assert explicit.result()['summary'].loc[0, 'debit'] == 125.0
+
+
+def test_undated_rows_count_in_the_totals_and_balances():
+    validator = JournalValidator()
+    validator.update(batch(
+        ['2023-01-02', '2023-01-02', 'not a date', '2023-02-01', '2023-02-01'],
+        ['1300', '2410', '1300', '4350', '6040'],
+        [10.0, 0.0, 3.0, 4.0, 0.0], [0.0, 10.0, 0.0, 0.0, 4.5],
+        date_type=pa.string(),
+    ))
+    result = validator.result()
+    summary = result['summary'].iloc[0]
+
+    assert summary['undated_rows'] == 1
+    assert summary['invalid_date'] == 1
+    assert summary['debit'] == pytest.approx(17.0)
+    assert summary['difference'] == pytest.approx(2.5)
+    assert not summary['balanced']
+    assert summary['unbalanced_days'] == 1
+    assert summary['unbalanced_periods'] == 1
+    assert result['days']['balanced'].to_list() == [True, False]
+    assert result['periods']['difference'].to_list() == [0.0, -0.5]
+
+
+def test_tolerance_accepts_rounding_differences():
+    day = datetime.date(2023, 1, 2)
+    validator = JournalValidator(tolerance=0.01)
+    validator.update(batch([day] * 2, ['1300', '2410'], [10.004, 0.0], [0.0, 9.995]))
+
+    summary = validator.result()['summary'].iloc[0]
+    assert summary['difference'] == pytest.approx(0.01)
+    assert summary['balanced']
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import ComponentsLedger
+
+
+@pytest.fixture(scope='module')
+def journal() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    rows = 4000
+    accounts = np.array(['1300', '1320', '2410', '20000-0001', '20000-0002', '20100-0003', '20490-0004', '4350', '6040'])
+    amounts = np.round(rng.uniform(1, 1000, rows), 2)
+    is_debit = rng.random(rows) < 0.5
+    dates = pd.Timestamp('2022-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 730, rows)), unit='D')
+    return pd.DataFrame({
+        'date': dates,
+        'account': rng.choice(accounts, rows),
+        'debit': np.where(is_debit, amounts, 0.0),
+        'credit': np.where(is_debit, 0.0, amounts),
+    })
+
+
+def assert_same_aggregates(ledger: ComponentsLedger, expected: ComponentsLedger) -> None:
+    for account in ['1', '13', '2', '200', ['200', '201'], '']:
+        for by in ['year', 'month', 'week']:
+            pd.testing.assert_frame_equal(
+                ledger.sum_account_data_by_period(account, by), expected.sum_account_data_by_period(account, by),
+                check_dtype=False,
+            )
+    for by in ['month', 'week']:
+        pd.testing.assert_frame_equal(ledger.customer_frequency(by), expected.customer_frequency(by), check_dtype=False)
+        pd.testing.assert_frame_equal(
+            ledger.customer_account_frequency(by), expected.customer_account_frequency(by), check_dtype=False,
+        )
+    pd.testing.assert_frame_equal(ledger.customer_cohorts('month'), expected.customer_cohorts('month'))
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_append_and_seal_match_a_full_rebuild(journal, compact):
+    late = pd.DataFrame({'date': [pd.Timestamp('2024-01-03')] * 2, 'account': ['20000-0009', '9999'],
+                         'debit': [10.0, 0.0], 'credit': [0.0, 10.0]})
+    full = pd.concat([journal, late], ignore_index=True)
+    expected = ComponentsLedger(full, build_cube=True, compact=compact)
+
+    first = journal['date'].searchsorted(pd.Timestamp('2022-06-15'), side='right')
+    ledger = ComponentsLedger(journal.iloc[:first], build_cube=True, compact=compact)
+    ledger.build_customer_activity()
+    ledger.seal('2022-06-15')
+
+    second = journal['date'].searchsorted(pd.Timestamp('2023-03-31'), side='right')
+    ledger.append(journal.iloc[first:second])
+    ledger.seal('2023-03-31')
+    ledger.append(journal.iloc[second:])
+    ledger.append(late)
+
+    assert len(ledger.sealed_parts) == 2
+    assert_same_aggregates(ledger, expected)
+
+    ledger.build_cube()
+    ledger.build_customer_activity()
+    assert_same_aggregates(ledger, expected)
+
+
+def test_sealed_parts_are_read_only_and_closed_to_appends(journal):
+    ledger = ComponentsLedger(journal, build_cube=True)
+    ledger.seal('2022-12-31')
+    part = ledger.sealed_parts[0]
+    cube = part['cube'].copy()
+
+    with pytest.raises(ValueError):
+        part['cube'].iloc[0, part['cube'].columns.get_loc('debit')] = 1.0
+    with pytest.raises(ValueError, match='sealed'):
+        ledger.append(journal.iloc[:1])
+    with pytest.raises(ValueError, match='reopened'):
+        ledger.seal('2022-06-30')
+
+    ledger.append(journal.tail(10).assign(date=pd.Timestamp('2024-02-01')))
+    pd.testing.assert_frame_equal(part['cube'], cube)
+    assert (part['cube']['year'] <= 2022).all()
+    assert (ledger.cube['year'] >= 2023).all()
+
+
+def test_customer_frequency_is_dense_and_rolls_up_the_customer_view(journal):
+    ledger = ComponentsLedger(journal)
+    for by, periods in [('month', 12), ('week', 53)]:
+        frequency = ledger.customer_frequency(by)
+        per_customer = ledger.customer_account_frequency(by)
+
+        assert list(frequency.columns) == ['year', by, 'invoices', 'customers', 'debit', 'avg_value', 'invoices_per_customer']
+        assert len(frequency) == 2 * periods
+        assert list(frequency.loc[frequency['year'] == 2022, by]) == list(range(1, periods + 1))
+
+        rolled = per_customer.groupby(['year', by]).agg(invoices=('invoices', 'sum'), customers=('account', 'nunique'))
+        dense = frequency.set_index(['year', by])
+        assert (dense.loc[rolled.index, ['invoices', 'customers']].to_numpy() == rolled.to_numpy()).all()
+        assert (dense.drop(rolled.index)[['invoices', 'customers', 'avg_value']] == 0).all().all()
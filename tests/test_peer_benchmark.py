@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from peer_benchmark import PeerBenchmark
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'parquet')
+
+
+@pytest.fixture(scope='module')
+def benchmark() -> PeerBenchmark:
+    financial_reports = pd.read_parquet(os.path.join(DATA_DIR, 'financial_reports.parquet'))
+    competitors_fr = pd.read_parquet(os.path.join(DATA_DIR, 'competitors_fr.parquet'))
+    return PeerBenchmark.from_reports(financial_reports, competitors_fr)
+
+
+def test_periods_without_peer_filings_have_no_peers(benchmark):
+    table = benchmark.aop_benchmark(['1001'])
+
+    early = table.loc['1001'].loc[['year_1', 'year_2', 'year_3', 'year_4']]
+    assert (early['peers'] == 0).all()
+    assert early['percentile_rank'].isna().all()
+    assert early['median'].isna().all()
+    assert early['value'].notna().all()
+
+
+def test_filed_period_ranks_against_every_competitor(benchmark):
+    competitors_fr = pd.read_parquet(os.path.join(DATA_DIR, 'competitors_fr.parquet'))
+    peers = competitors_fr.set_index('AOP').loc['1001', [f'competitor_{i}' for i in range(1, 6)]].to_numpy(dtype=float)
+
+    row = benchmark.aop_benchmark(['1001'], years=['year_5']).loc[('1001', 'year_5')]
+    assert row['peers'] == 5
+    assert row['median'] == pytest.approx(np.median(peers))
+    below, ties = (peers < row['value']).sum(), (peers == row['value']).sum()
+    assert row['percentile_rank'] == pytest.approx((below + 0.5 * ties) / len(peers) * 100)
+
+
+def test_tied_peers_count_as_half():
+    filings = pd.DataFrame({
+        'company': ['A', 'B', 'C', 'D', 'E'],
+        'AOP': ['1001'] * 5,
+        'year': [2023] * 5,
+        'value': [20.0, 10.0, 20.0, 20.0, 30.0],
+    })
+    row = PeerBenchmark(filings, 'A').aop_benchmark(['1001']).loc[('1001', 2023)]
+
+    assert row['peers'] == 4
+    assert row['percentile_rank'] == pytest.approx((1 + 0.5 * 2) / 4 * 100)
+
+
+def test_missing_position_is_left_out_of_the_peers():
+    filings = pd.DataFrame({
+        'company': ['A', 'B', 'C', 'A', 'B'],
+        'AOP': ['1001', '1001', '1001', '0002', '0002'],
+        'year': [2023] * 5,
+        'value': [10.0, 20.0, 30.0, 5.0, 1.0],
+    })
+    table = PeerBenchmark(filings, 'A').aop_benchmark(['0002'])
+
+    assert table.loc[('0002', 2023), 'peers'] == 1
+    assert table.loc[('0002', 2023), 'percentile_rank'] == 100
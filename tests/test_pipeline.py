@@ -0,0 +1,89 @@
+import os
+
+import pandas as pd
+
+import pipeline
+from pipeline import Pipeline, Stage
+
+
+SCALE = {'factor': 2}
+
+
+def source(path: str) -> pd.DataFrame:
+    return pd.read_csv(path)
+
+
+def scaled(source: pd.DataFrame) -> pd.DataFrame:
+    return source * SCALE['factor']
+
+
+def shifted(scaled: pd.DataFrame, offset: int) -> pd.DataFrame:
+    return scaled + offset
+
+
+def build(artifact_dir: str, path: str, offset: int = 1) -> Pipeline:
+    pipe = Pipeline(artifact_dir)
+    pipe.add(Stage('source', source, files=(path,), params={'path': path}))
+    pipe.add(Stage('scaled', scaled, inputs=('source',)))
+    pipe.add(Stage('shifted', shifted, inputs=('scaled',), params={'offset': offset}))
+    return pipe
+
+
+def statuses(report: pd.DataFrame) -> dict:
+    return dict(zip(report['stage'], report['status']))
+
+
+def test_unchanged_stages_are_skipped_and_changes_rerun_dependents(tmp_path):
+    path = str(tmp_path / 'values.csv')
+    pd.DataFrame({'value': [1, 2, 3]}).to_csv(path, index=False)
+    artifact_dir = str(tmp_path / 'cache')
+
+    assert set(statuses(build(artifact_dir, path).run()).values()) == {'ran'}
+    assert set(statuses(build(artifact_dir, path).run()).values()) == {'skipped'}
+
+    assert statuses(build(artifact_dir, path, offset=5).run()) == {'source': 'skipped', 'scaled': 'skipped', 'shifted': 'ran'}
+    assert build(artifact_dir, path, offset=5).load('shifted')['value'].to_list() == [7, 9, 11]
+
+    pd.DataFrame({'value': [1, 2, 4]}).to_csv(path, index=False)
+    assert set(statuses(build(artifact_dir, path, offset=5).run()).values()) == {'ran'}
+
+
+def test_rerun_with_identical_output_keeps_dependents_fresh(tmp_path):
+    path = str(tmp_path / 'values.csv')
+    pd.DataFrame({'value': [1, 2, 3]}).to_csv(path, index=False)
+    artifact_dir = str(tmp_path / 'cache')
+    build(artifact_dir, path).run()
+
+    pd.DataFrame({'value': [1, 2, 3]}).to_csv(path, index=False, lineterminator='\r\n')
+    assert statuses(build(artifact_dir, path).run()) == {'source': 'ran', 'scaled': 'skipped', 'shifted': 'skipped'}
+
+
+def test_module_globals_used_by_a_stage_are_part_of_its_key(tmp_path, monkeypatch):
+    path = str(tmp_path / 'values.csv')
+    pd.DataFrame({'value': [1, 2, 3]}).to_csv(path, index=False)
+    artifact_dir = str(tmp_path / 'cache')
+    build(artifact_dir, path).run()
+
+    monkeypatch.setitem(SCALE, 'factor', 3)
+    assert statuses(build(artifact_dir, path).run()) == {'source': 'skipped', 'scaled': 'ran', 'shifted': 'ran'}
+
+    ratios = pipeline._code_hash(pipeline.charts)
+    monkeypatch.delitem(pipeline.REPORT_RATIOS, 'current_ratio')
+    assert pipeline._code_hash(pipeline.charts) != ratios
+
+
+def test_prune_deletes_artifacts_of_earlier_runs(tmp_path):
+    path = str(tmp_path / 'values.csv')
+    pd.DataFrame({'value': [1, 2, 3]}).to_csv(path, index=False)
+    artifact_dir = str(tmp_path / 'cache')
+    build(artifact_dir, path).run()
+    earlier = build(artifact_dir, path).manifest['shifted']['outputs']['shifted']
+
+    pipe = build(artifact_dir, path, offset=5)
+    pipe.run()
+    removed = pipe.prune()
+
+    assert removed == [pipe._artifact_path(earlier['hash'], earlier['kind'])]
+    assert not os.path.exists(removed[0])
+    assert set(statuses(build(artifact_dir, path, offset=5).run()).values()) == {'skipped'}
+    assert pipe.prune() == []
@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+
+from runner import PortfolioRunner
+
+
+def table_task(entry: dict) -> dict:
+    return {'values': pd.DataFrame({'value': [len(entry['company'])]})}
+
+
+def crashing_task(entry: dict) -> dict:
+    if entry['company'] == 'crash':
+        os._exit(1)
+    return table_task(entry)
+
+
+def scalar_task(entry: dict) -> dict:
+    return {'values': 1} if entry['company'] == 'scalar' else table_task(entry)
+
+
+def manifest(*companies: str) -> list[dict]:
+    return [{'company': company, 'report_path': ''} for company in companies]
+
+
+def test_failed_chunk_is_recorded_and_the_run_continues():
+    results = PortfolioRunner(max_workers=1, chunk_size=1, task=crashing_task).run(manifest('a', 'crash', 'b'))
+
+    assert 'crash' in results['failures']['company'].tolist()
+    assert 'a' in results['values']['company'].tolist()
+    assert results['progress']['processed'].iloc[-1] == 3
+
+
+def test_task_returning_no_dataframes_fails_only_its_company():
+    progress = []
+    results = PortfolioRunner(max_workers=2, chunk_size=2, task=scalar_task, progress=progress.append).run(manifest('a', 'scalar', 'b'))
+
+    assert results['failures']['company'].tolist() == ['scalar']
+    assert sorted(results['values']['company']) == ['a', 'b']
+    assert [row['processed'] for row in progress] == results['progress']['processed'].tolist()
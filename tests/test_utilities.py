@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities import ResultsStore, Utilities
+
+
+def round_trip(value):
+    text = json.dumps(Utilities._convert_to_native_types(value), allow_nan=False)
+    return Utilities._restore_native_types(json.loads(text))
+
+
+def test_dataframe_round_trip_keeps_dtypes_missing_values_and_index():
+    frame = pd.DataFrame({
+        'account': ['200-A', '435', None],
+        'year': np.array([2022, 2023, 2023], dtype=np.int32),
+        'debit': [1.5, np.nan, np.inf],
+        'date': pd.to_datetime(['2023-01-02 10:00:00.125', None, '2023-12-31 00:00:00'], format='ISO8601'),
+        'closed': [True, False, True],
+    }, index=pd.MultiIndex.from_arrays([['a', 'b', 'c'], [1, 2, 3]], names=['company', 'row']))
+
+    restored = round_trip(frame)
+
+    assert restored.index.equals(frame.index)
+    assert list(restored.dtypes.astype(str)) == list(frame.dtypes.astype(str))
+    assert restored['date'].iloc[0] == pd.Timestamp('2023-01-02 10:00:00.125')
+    assert restored['date'].isna().iloc[1] and restored['account'].isna().iloc[2]
+    assert np.isnan(restored['debit'].iloc[1]) and np.isnan(restored['debit'].iloc[2])
+    pd.testing.assert_series_equal(restored['year'], frame['year'])
+
+
+def test_nested_values_round_trip():
+    value = {
+        'series': pd.Series([1.0, 2.0], index=['year_1', 'year_2'], name='ratio'),
+        'matrix': np.arange(6, dtype=np.int16).reshape(2, 3),
+        'items': [np.float32(1.5), (np.int64(2), None), float('nan')],
+    }
+
+    restored = round_trip(value)
+
+    pd.testing.assert_series_equal(restored['series'], value['series'])
+    np.testing.assert_array_equal(restored['matrix'], value['matrix'])
+    assert restored['matrix'].dtype == np.int16
+    assert restored['items'] == [1.5, [2, None], None]
+
+
+@pytest.mark.parametrize('name', ['results.db', 'results.json'])
+def test_results_store_round_trip(tmp_path, name):
+    frame = pd.DataFrame({'year': [2022, 2023], 'value': [1.25, np.nan]})
+    with ResultsStore(str(tmp_path / name)) as store:
+        store.save('company/ratios', frame)
+
+    with ResultsStore(str(tmp_path / name)) as store:
+        pd.testing.assert_frame_equal(store.load('company/ratios'), frame)